@@ -0,0 +1,121 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread safe in-process cache with LRU and TTL eviction.
+
+    Entries are evicted in the least recently used order once the cache
+    holds `maxsize` entries or their total size exceeds `maxbytes`, and
+    expire `ttl` seconds after they were stored. Sizes of the values are
+    measured with `sizeof`. Hits and misses are counted so they can be
+    exposed as metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        maxbytes: Optional[int] = None,
+        sizeof: Callable[[V], int] = sys.getsizeof,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._data: OrderedDict[K, Tuple[float, int, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Get value from the cache.
+
+        :param key: key of the value.
+        :return: cached value or None if it is missing or expired.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, _, value = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """
+        Store value in the cache, evicting the least recently used entries.
+
+        Values larger than `maxbytes` are not stored.
+
+        :param key: key of the value.
+        :param value: value to store.
+        """
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = (time.monotonic(), size, value)
+            self.size += size
+            while self._data and (
+                (self.maxsize is not None and len(self._data) > self.maxsize)
+                or (self.maxbytes is not None and self.size > self.maxbytes)
+            ):
+                self._pop(next(iter(self._data)))
+
+    def items(self) -> List[Tuple[K, V]]:
+        """
+        Get all entries which are not expired, without updating their recency.
+
+        :return: pairs of key and value, the least recently used first.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [
+                (key, value)
+                for key, (stored_at, _, value) in self._data.items()
+                if self.ttl is None or now - stored_at <= self.ttl
+            ]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get usage statistics of the cache.
+
+        :return: hits, misses, number of entries and their total size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._data),
+            "bytes": self.size,
+        }
+
+    def _pop(self, key: K) -> None:
+        _, size, _ = self._data.pop(key)
+        self.size -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,76 @@
+from typing import Dict, List, Mapping, Sequence
+
+from fastapi import Depends
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dependencies import get_db_session
+from scaledp_chat.db.models.chunk_embedding import ChunkEmbeddingModel
+
+
+class ChunkEmbeddingDAO:
+    """Class for accessing chunk embedding cache table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
+        self.session = session
+
+    async def get_many(
+        self,
+        model: str,
+        text_hashes: Sequence[str],
+    ) -> Dict[str, List[float]]:
+        """
+        Get cached embeddings of chunk texts with a single query.
+
+        Args:
+            model: Name of the embedding model
+            text_hashes: SHA-256 hashes of the chunk texts
+
+        Returns:
+            Dict[str, List[float]]: Embeddings by text hash, texts without a
+            cached embedding are missing
+        """
+        if not text_hashes:
+            return {}
+        rows = await self.session.execute(
+            select(ChunkEmbeddingModel.text_hash, ChunkEmbeddingModel.embedding).where(
+                ChunkEmbeddingModel.model == model,
+                ChunkEmbeddingModel.text_hash
+                == any_(bindparam("hashes", list(text_hashes))),
+            ),
+        )
+        return {row.text_hash: row.embedding.tolist() for row in rows}
+
+    async def put_many(
+        self,
+        model: str,
+        embeddings: Mapping[str, Sequence[float]],
+    ) -> None:
+        """
+        Store embeddings of chunk texts, keeping already cached ones.
+
+        Rows are inserted in the order of their hashes, so concurrent
+        transactions storing the same texts wait for each other instead of
+        deadlocking.
+
+        Args:
+            model: Name of the embedding model
+            embeddings: Embeddings by SHA-256 hash of the chunk text
+        """
+        if not embeddings:
+            return
+        await self.session.execute(
+            insert(ChunkEmbeddingModel)
+            .values(
+                [
+                    {
+                        "model": model,
+                        "text_hash": text_hash,
+                        "embedding": list(embeddings[text_hash]),
+                    }
+                    for text_hash in sorted(embeddings)
+                ],
+            )
+            .on_conflict_do_nothing(),
+        )
@@ -1,10 +1,15 @@
 import uuid
+from typing import Dict, List, Sequence, Tuple
 
 from fastapi import Depends
+from sqlalchemy import Uuid, any_, bindparam, delete, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from scaledp_chat.db.dependencies import get_db_session
 from scaledp_chat.db.models.document_index import DocumentFileModel
+from scaledp_chat.indexer.changes import content_hash
+from scaledp_chat.indexer.tokens import line_token_offsets
 
 
 class DocumentFileDAO:
@@ -23,6 +28,10 @@ class DocumentFileDAO:
         """
         Add single DocumentFileModel to session.
 
+        Token counts of the file lines are computed here, so the context of
+        an answer is packed without tokenizing files, along with the content
+        hash the incremental indexer compares files by.
+
         Args:
             content: The content of the document file
             filepath: The path to the document file
@@ -40,6 +49,80 @@ class DocumentFileDAO:
                 filepath=filepath,
                 file_type=file_type,
                 file_metadata=file_metadata,
+                token_offsets=line_token_offsets(content),
+                content_hash=content_hash(content),
             ),
         )
         return id
+
+    async def get_sources(self) -> List[Tuple[str, str]]:
+        """
+        Get paths and contents of all document files.
+
+        Returns:
+            List[Tuple[str, str]]: Pairs of file path and file content
+        """
+        rows = await self.session.execute(
+            select(DocumentFileModel.filepath, DocumentFileModel.content),
+        )
+        return [(row.filepath, row.content) for row in rows]
+
+    async def get_hashes(self) -> Dict[str, str]:
+        """
+        Get content hashes of all document files.
+
+        Returns:
+            Dict[str, str]: Content hash by file path, empty for files indexed
+            before hashes were stored
+        """
+        rows = await self.session.execute(
+            select(DocumentFileModel.filepath, DocumentFileModel.content_hash),
+        )
+        return {row.filepath: row.content_hash or "" for row in rows}
+
+    async def delete_paths(self, filepaths: Sequence[str]) -> int:
+        """
+        Delete document files by their paths.
+
+        Symbols of the files are deleted by the database with them.
+
+        Args:
+            filepaths: Paths of the document files
+
+        Returns:
+            int: Number of deleted document files
+        """
+        if not filepaths:
+            return 0
+        result = await self.session.execute(
+            delete(DocumentFileModel).where(
+                DocumentFileModel.filepath == any_(bindparam("paths", list(filepaths))),
+            ),
+        )
+        return result.rowcount  # type: ignore
+
+    async def get_many(self, ids: Sequence[str]) -> List[DocumentFileModel]:
+        """
+        Get document files by their IDs with a single query.
+
+        The IDs are sent as one array parameter, so the statement is the same
+        for any number of files.
+
+        Args:
+            ids: IDs of the document files, duplicates are skipped
+
+        Returns:
+            List[DocumentFileModel]: Found document files in the order of the
+            first occurrence of their IDs
+        """
+        unique_ids = list(dict.fromkeys(str(file_id) for file_id in ids))
+        if not unique_ids:
+            return []
+        rows = await self.session.scalars(
+            select(DocumentFileModel).where(
+                DocumentFileModel.id
+                == any_(bindparam("ids", unique_ids, type_=ARRAY(Uuid(as_uuid=False)))),
+            ),
+        )
+        files = {str(file.id): file for file in rows}
+        return [files[file_id] for file_id in unique_ids if file_id in files]
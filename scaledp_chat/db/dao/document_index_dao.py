@@ -0,0 +1,269 @@
+import re
+from typing import List, Optional, Sequence
+
+from fastapi import Depends
+from langchain_core.documents import Document
+from langchain_postgres.v2.indexes import DistanceStrategy
+from sqlalchemy import RowMapping, any_, bindparam, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dependencies import get_db_session
+from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.db.vector_index import get_distance_strategy
+
+WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+# Columns a Document is built from
+COLUMNS = "langchain_id, content, langchain_metadata, source, file_id"
+# Key documents are deduplicated on, chunks without a source are kept apart
+SOURCE_KEY = "coalesce(source, CAST(langchain_id AS text))"
+
+
+def to_tsquery_text(query: str) -> Optional[str]:
+    """
+    Convert text to a full-text query matching any of its words.
+
+    Words are split the same way as the indexed content_tsv column, so
+    show_image is searched as "show | image".
+
+    Args:
+        query: Text to search for
+
+    Returns:
+        Optional[str]: tsquery text or None if the text has no words
+    """
+    words = dict.fromkeys(word.lower() for word in WORD_RE.findall(query))
+    return " | ".join(words) or None
+
+
+def distinct_sources(documents: Sequence[Document], k: int) -> List[Document]:
+    """
+    Keep the first chunk of every source, like the DISTINCT ON of the searches.
+
+    Args:
+        documents: Chunks sorted by relevance
+        k: Number of documents to return
+
+    Returns:
+        List[Document]: Most relevant chunk of up to `k` distinct sources,
+        chunks without a source are kept apart
+    """
+    seen = set()
+    results: List[Document] = []
+    for document in documents:
+        key = document.metadata.get("source") or document.id
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append(document)
+        if len(results) == k:
+            break
+    return results
+
+
+class DocumentIndexDAO:
+    """Class for accessing document index table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
+        self.session = session
+
+    async def similarity_search_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        fetch_k: Optional[int] = None,
+        distance_strategy: Optional[DistanceStrategy] = None,
+    ) -> List[List[Document]]:
+        """
+        Run top-k similarity search for several query vectors in one query.
+
+        Every query vector is joined laterally with its own top `fetch_k`
+        search, so each of them is able to use the vector index, while the
+        whole batch costs a single round trip to the database. The candidates
+        are deduplicated by source with DISTINCT ON, so every file is
+        represented by its nearest chunk.
+
+        Args:
+            embeddings: Query vectors to search for
+            k: Number of files to return for every query vector
+            fetch_k: Number of nearest chunks taken as candidates for every
+                query vector, defaults to `k`
+            distance_strategy: Distance strategy used to rank documents,
+                defaults to the one from settings
+
+        Returns:
+            List[List[Document]]: Documents for every query vector in the order
+            of the given embeddings, each list sorted by distance
+        """
+        if not embeddings:
+            return []
+
+        table = DocumentIndexModel.__tablename__
+        operator = (distance_strategy or get_distance_strategy()).operator
+        stmt = text(
+            f"""
+            SELECT q.ord, d.*
+            FROM unnest(CAST(:embeddings AS text[])) WITH ORDINALITY AS q(embedding, ord)
+            CROSS JOIN LATERAL (
+                SELECT * FROM (
+                    SELECT DISTINCT ON ({SOURCE_KEY}) *
+                    FROM (
+                        SELECT
+                            {COLUMNS},
+                            embedding {operator} CAST(q.embedding AS vector) AS distance
+                        FROM {table}
+                        ORDER BY embedding {operator} CAST(q.embedding AS vector)
+                        LIMIT :fetch_k
+                    ) AS candidates
+                    ORDER BY {SOURCE_KEY}, distance
+                ) AS nearest
+                ORDER BY distance
+                LIMIT :k
+            ) AS d
+            ORDER BY q.ord, d.distance
+            """,  # noqa: S608, E501
+        )
+        rows = await self.session.execute(
+            stmt,
+            {
+                "embeddings": _to_vector_literals(embeddings),
+                "k": k,
+                "fetch_k": max(fetch_k or k, k),
+            },
+        )
+
+        results: List[List[Document]] = [[] for _ in embeddings]
+        for row in rows.mappings():
+            results[row["ord"] - 1].append(_to_document(row))
+        return results
+
+    async def hybrid_search(
+        self,
+        query: str,
+        embeddings: List[List[float]],
+        k: int,
+        fetch_k: int,
+        rrf_k: int = 60,
+        distance_strategy: Optional[DistanceStrategy] = None,
+    ) -> List[Document]:
+        """
+        Run full-text and vector search in one query and fuse their ranks.
+
+        Full-text search matches any word of the query against the content_tsv
+        column. Every query vector gets its own top `fetch_k` vector search.
+        The rankings are combined with reciprocal rank fusion: every document
+        scores sum(1 / (rrf_k + rank)) over all rankings it appears in. Only
+        the best scored chunk of every source is returned.
+
+        Args:
+            query: Text for the full-text search
+            embeddings: Query vectors for the vector search
+            k: Number of documents to return
+            fetch_k: Number of candidates taken from every ranking
+            rrf_k: Reciprocal rank fusion constant, higher values reduce the
+                weight of the top ranks
+            distance_strategy: Distance strategy used to rank documents,
+                defaults to the one from settings
+
+        Returns:
+            List[Document]: Documents sorted by the fused score
+        """
+        table = DocumentIndexModel.__tablename__
+        operator = (distance_strategy or get_distance_strategy()).operator
+        stmt = text(
+            f"""
+            WITH vector_ranks AS (
+                SELECT
+                    d.langchain_id,
+                    row_number() OVER (PARTITION BY q.ord ORDER BY d.distance) AS rank
+                FROM unnest(CAST(:embeddings AS text[]))
+                    WITH ORDINALITY AS q(embedding, ord)
+                CROSS JOIN LATERAL (
+                    SELECT
+                        langchain_id,
+                        embedding {operator} CAST(q.embedding AS vector) AS distance
+                    FROM {table}
+                    ORDER BY embedding {operator} CAST(q.embedding AS vector)
+                    LIMIT :fetch_k
+                ) AS d
+            ),
+            text_ranks AS (
+                SELECT
+                    langchain_id,
+                    row_number() OVER (
+                        ORDER BY ts_rank_cd(content_tsv, query) DESC
+                    ) AS rank
+                FROM {table}, to_tsquery('english', :tsquery) AS query
+                WHERE content_tsv @@ query
+                ORDER BY ts_rank_cd(content_tsv, query) DESC
+                LIMIT :fetch_k
+            ),
+            fused AS (
+                SELECT langchain_id, sum(1.0 / (:rrf_k + rank)) AS score
+                FROM (
+                    SELECT langchain_id, rank FROM vector_ranks
+                    UNION ALL
+                    SELECT langchain_id, rank FROM text_ranks
+                ) AS ranks
+                GROUP BY langchain_id
+            )
+            SELECT * FROM (
+                SELECT DISTINCT ON ({SOURCE_KEY}) {COLUMNS}, fused.score
+                FROM fused
+                JOIN {table} USING (langchain_id)
+                ORDER BY {SOURCE_KEY}, fused.score DESC, langchain_id
+            ) AS best
+            ORDER BY score DESC, langchain_id
+            LIMIT :k
+            """,  # noqa: S608
+        )
+        rows = await self.session.execute(
+            stmt,
+            {
+                "embeddings": _to_vector_literals(embeddings),
+                "tsquery": to_tsquery_text(query),
+                "k": k,
+                "fetch_k": fetch_k,
+                "rrf_k": rrf_k,
+            },
+        )
+        return [_to_document(row) for row in rows.mappings()]
+
+    async def delete_sources(self, sources: Sequence[str]) -> int:
+        """
+        Delete all chunks of the given source files.
+
+        Chunks are matched by source rather than file_id, so chunks left by
+        an interrupted indexing run are deleted as well.
+
+        Args:
+            sources: Paths of the source files
+
+        Returns:
+            int: Number of deleted chunks
+        """
+        if not sources:
+            return 0
+        result = await self.session.execute(
+            delete(DocumentIndexModel).where(
+                DocumentIndexModel.source == any_(bindparam("sources", list(sources))),
+            ),
+        )
+        return result.rowcount  # type: ignore
+
+
+def _to_vector_literals(embeddings: List[List[float]]) -> List[str]:
+    return [str([float(value) for value in embedding]) for embedding in embeddings]
+
+
+def _to_document(row: RowMapping) -> Document:
+    metadata = dict(row["langchain_metadata"] or {})
+    if row["source"] is not None:
+        metadata["source"] = row["source"]
+    if row["file_id"] is not None:
+        metadata["file_id"] = str(row["file_id"])
+    return Document(
+        page_content=row["content"],
+        metadata=metadata,
+        id=str(row["langchain_id"]),
+    )
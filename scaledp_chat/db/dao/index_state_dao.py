@@ -0,0 +1,82 @@
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dependencies import get_db_session
+from scaledp_chat.db.models.index_state import IndexStateModel
+
+# ID of the single row of the index state table
+STATE_ID = 1
+
+
+class IndexStateDAO:
+    """Class for accessing index state table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
+        self.session = session
+
+    async def get_version(self) -> int:
+        """
+        Get version of the document index.
+
+        Returns:
+            int: Index version, 0 if the index was never versioned
+        """
+        version = await self.session.scalar(
+            select(IndexStateModel.version).where(IndexStateModel.id == STATE_ID),
+        )
+        return version or 0
+
+    async def bump_version(self) -> int:
+        """
+        Increment version of the document index.
+
+        Returns:
+            int: New index version
+        """
+        stmt = (
+            insert(IndexStateModel)
+            .values(id=STATE_ID, version=1)
+            .on_conflict_do_update(
+                index_elements=[IndexStateModel.id],
+                set_={
+                    "version": IndexStateModel.version + 1,
+                    "updated_at": func.now(),
+                },
+            )
+            .returning(IndexStateModel.version)
+        )
+        return (await self.session.execute(stmt)).scalar_one()
+
+    async def get_commit(self) -> Optional[str]:
+        """
+        Get SHA of the last indexed commit.
+
+        Returns:
+            Optional[str]: Commit SHA or None if no commit was recorded
+        """
+        return await self.session.scalar(
+            select(IndexStateModel.commit_sha).where(IndexStateModel.id == STATE_ID),
+        )
+
+    async def set_commit(self, commit_sha: str) -> None:
+        """
+        Record SHA of the indexed commit.
+
+        The version is left as is, so caches are kept when the commit
+        changed none of the indexed files.
+
+        Args:
+            commit_sha: SHA of the indexed commit
+        """
+        await self.session.execute(
+            insert(IndexStateModel)
+            .values(id=STATE_ID, version=0, commit_sha=commit_sha)
+            .on_conflict_do_update(
+                index_elements=[IndexStateModel.id],
+                set_={"commit_sha": commit_sha, "updated_at": func.now()},
+            ),
+        )
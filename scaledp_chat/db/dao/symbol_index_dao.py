@@ -0,0 +1,165 @@
+from typing import Dict, List, Sequence
+
+from fastapi import Depends
+from langchain_core.documents import Document
+from sqlalchemy import Uuid, any_, bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dependencies import get_db_session
+from scaledp_chat.db.models.document_index import DocumentFileModel
+from scaledp_chat.db.models.symbol_index import SymbolIndexModel
+from scaledp_chat.indexer.symbols import Symbol
+
+
+class SymbolIndexDAO:
+    """Class for accessing symbol index table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)) -> None:
+        self.session = session
+
+    async def create(self, file_id: str, symbols: List[Symbol]) -> None:
+        """
+        Add symbols defined in a document file to session.
+
+        Args:
+            file_id: The ID of the document file
+            symbols: Symbols defined in the file
+        """
+        self.session.add_all(
+            [
+                SymbolIndexModel(
+                    name=symbol.name,
+                    short_name=symbol.short_name,
+                    kind=symbol.kind,
+                    file_id=file_id,
+                    start_line=symbol.start_line,
+                    end_line=symbol.end_line,
+                )
+                for symbol in symbols
+            ],
+        )
+
+    async def lookup(
+        self,
+        terms: List[str],
+        limit: int = 10,
+    ) -> Dict[str, List[Document]]:
+        """
+        Resolve search terms to symbol definitions with one indexed query.
+
+        A term matches a symbol when it is equal to its short or fully
+        qualified name, or when it is a prefix of the qualified name ending
+        at a dot, e.g. a module or class name matches all of its members.
+        Every term resolves to at most `limit` symbols: exact qualified
+        names first, then exact short names, then members by their depth
+        below the term, so a package name or a common short name like
+        __init__ doesn't pull in every file of the repository.
+
+        Args:
+            terms: Search terms, e.g. ScaleDPSession or scaledp.pipeline
+            limit: Maximum number of symbols matched by a term
+
+        Returns:
+            Dict[str, List[Document]]: Matched definitions for every resolved
+            term, best matches first. Documents carry the file source, file_id
+            and line span of the definition in their metadata.
+        """
+        if not terms:
+            return {}
+
+        stmt = text(
+            f"""
+            WITH terms AS (
+                SELECT term COLLATE "C" AS term
+                FROM unnest(CAST(:terms AS text[])) AS t(term)
+            ),
+            matches AS (
+                SELECT
+                    terms.term,
+                    s.name,
+                    s.kind,
+                    s.file_id,
+                    s.start_line,
+                    s.end_line,
+                    row_number() OVER (
+                        PARTITION BY terms.term
+                        ORDER BY
+                            CASE
+                                WHEN s.name = terms.term THEN 0
+                                WHEN s.short_name = terms.term THEN 1
+                                ELSE 2
+                            END,
+                            length(s.name) - length(replace(s.name, '.', '')),
+                            s.name
+                    ) AS rank
+                FROM terms
+                JOIN {SymbolIndexModel.__tablename__} AS s
+                    ON s.short_name = terms.term
+                    OR s.name = terms.term
+                    OR (s.name >= terms.term || '.' AND s.name < terms.term || '/')
+            )
+            SELECT
+                matches.term,
+                matches.name,
+                matches.kind,
+                matches.file_id,
+                matches.start_line,
+                matches.end_line,
+                f.filepath
+            FROM matches
+            JOIN {DocumentFileModel.__tablename__} AS f ON f.id = matches.file_id
+            WHERE matches.rank <= :limit
+            ORDER BY matches.term, matches.rank
+            """,  # noqa: S608
+        )
+        rows = await self.session.execute(stmt, {"terms": terms, "limit": limit})
+
+        results: Dict[str, List[Document]] = {}
+        for row in rows.mappings():
+            results.setdefault(row["term"], []).append(
+                Document(
+                    page_content=f"{row['kind']} {row['name']}",
+                    metadata={
+                        "source": row["filepath"],
+                        "file_id": str(row["file_id"]),
+                        "symbol": row["name"],
+                        "start_line": row["start_line"],
+                        "end_line": row["end_line"],
+                    },
+                ),
+            )
+        return results
+
+    async def get_symbols(self, file_ids: Sequence[str]) -> Dict[str, List[Symbol]]:
+        """
+        Get symbols defined in several document files with one query.
+
+        Args:
+            file_ids: IDs of the document files
+
+        Returns:
+            Dict[str, List[Symbol]]: Symbols of every file that defines any,
+            keyed by the file ID
+        """
+        unique_ids = list(dict.fromkeys(str(file_id) for file_id in file_ids))
+        if not unique_ids:
+            return {}
+        rows = await self.session.scalars(
+            select(SymbolIndexModel).where(
+                SymbolIndexModel.file_id
+                == any_(bindparam("ids", unique_ids, type_=ARRAY(Uuid(as_uuid=False)))),
+            ),
+        )
+        results: Dict[str, List[Symbol]] = {}
+        for row in rows:
+            results.setdefault(str(row.file_id), []).append(
+                Symbol(
+                    name=row.name,
+                    short_name=row.short_name,
+                    kind=row.kind,
+                    start_line=row.start_line,
+                    end_line=row.end_line,
+                ),
+            )
+        return results
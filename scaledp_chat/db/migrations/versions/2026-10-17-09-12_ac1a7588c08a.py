@@ -0,0 +1,62 @@
+"""Add symbol index.
+
+Revision ID: ac1a7588c08a
+Revises: 9a6155f8c232
+Create Date: 2026-10-17 09:12:41.318052
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "ac1a7588c08a"
+down_revision = "9a6155f8c232"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.create_table(
+        "symbol_index",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(collation="C"), nullable=False),
+        sa.Column("short_name", sa.String(collation="C"), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("file_id", sa.Uuid(), nullable=False),
+        sa.Column("start_line", sa.Integer(), nullable=False),
+        sa.Column("end_line", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["document_file.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_symbol_index_name"),
+        "symbol_index",
+        ["name"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_symbol_index_short_name"),
+        "symbol_index",
+        ["short_name"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_symbol_index_file_id"),
+        "symbol_index",
+        ["file_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_index(op.f("ix_symbol_index_file_id"), table_name="symbol_index")
+    op.drop_index(op.f("ix_symbol_index_short_name"), table_name="symbol_index")
+    op.drop_index(op.f("ix_symbol_index_name"), table_name="symbol_index")
+    op.drop_table("symbol_index")
@@ -0,0 +1,47 @@
+"""Add full-text search column to document index.
+
+Revision ID: ec2c66522030
+Revises: ac1a7588c08a
+Create Date: 2026-10-17 11:34:05.917214
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "ec2c66522030"
+down_revision = "ac1a7588c08a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.add_column(
+        "document_index",
+        sa.Column(
+            "content_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('english', "
+                "regexp_replace(content, '[^[:alnum:]]+', ' ', 'g'))",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_document_index_content_tsv",
+        "document_index",
+        ["content_tsv"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_index("ix_document_index_content_tsv", table_name="document_index")
+    op.drop_column("document_index", "content_tsv")
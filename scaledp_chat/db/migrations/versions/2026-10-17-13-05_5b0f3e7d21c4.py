@@ -0,0 +1,39 @@
+"""Rebuild vector index with the cosine operator class.
+
+Revision ID: 5b0f3e7d21c4
+Revises: ec2c66522030
+Create Date: 2026-10-17 13:05:41.208731
+
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "5b0f3e7d21c4"
+down_revision = "ec2c66522030"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.execute(text("DROP INDEX IF EXISTS document_index_embedding_idx"))
+    op.execute(
+        text(
+            "CREATE INDEX document_index_embedding_idx ON document_index "
+            "USING hnsw (embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.execute(text("DROP INDEX IF EXISTS document_index_embedding_idx"))
+    op.execute(
+        text(
+            "CREATE INDEX document_index_embedding_idx ON document_index "
+            "USING hnsw (embedding vector_l2_ops)",
+        ),
+    )
@@ -0,0 +1,54 @@
+"""Add source and file_id columns to document index.
+
+Revision ID: d83e1f5a9b67
+Revises: 5b0f3e7d21c4
+Create Date: 2026-10-17 14:20:12.634190
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "d83e1f5a9b67"
+down_revision = "5b0f3e7d21c4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.add_column("document_index", sa.Column("source", sa.String(), nullable=True))
+    op.add_column("document_index", sa.Column("file_id", sa.Uuid(), nullable=True))
+    op.execute(
+        text(
+            "UPDATE document_index SET "
+            "source = langchain_metadata->>'source', "
+            "file_id = CASE "
+            "WHEN langchain_metadata->>'file_id' ~* "
+            "'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' "
+            "THEN CAST(langchain_metadata->>'file_id' AS uuid) "
+            "END",
+        ),
+    )
+    op.create_index(
+        op.f("ix_document_index_source"),
+        "document_index",
+        ["source"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_document_index_file_id"),
+        "document_index",
+        ["file_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_index(op.f("ix_document_index_file_id"), table_name="document_index")
+    op.drop_index(op.f("ix_document_index_source"), table_name="document_index")
+    op.drop_column("document_index", "file_id")
+    op.drop_column("document_index", "source")
@@ -0,0 +1,30 @@
+"""Add token offsets to document file.
+
+Revision ID: 7c41e9b0a3f5
+Revises: d83e1f5a9b67
+Create Date: 2026-10-17 15:02:37.481920
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "7c41e9b0a3f5"
+down_revision = "d83e1f5a9b67"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.add_column(
+        "document_file",
+        sa.Column("token_offsets", postgresql.ARRAY(sa.Integer()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_column("document_file", "token_offsets")
@@ -0,0 +1,37 @@
+"""Add index state.
+
+Revision ID: f2a6c8d4e913
+Revises: 7c41e9b0a3f5
+Create Date: 2026-10-17 16:11:53.027645
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2a6c8d4e913"
+down_revision = "7c41e9b0a3f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.create_table(
+        "index_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_table("index_state")
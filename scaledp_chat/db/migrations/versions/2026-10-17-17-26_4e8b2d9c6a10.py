@@ -0,0 +1,70 @@
+"""Add chat checkpoints.
+
+Revision ID: 4e8b2d9c6a10
+Revises: f2a6c8d4e913
+Create Date: 2026-10-17 17:26:08.551723
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4e8b2d9c6a10"
+down_revision = "f2a6c8d4e913"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.create_table(
+        "chat_checkpoint",
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("checkpoint_ns", sa.String(), nullable=False),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("parent_checkpoint_id", sa.String(), nullable=True),
+        sa.Column("checkpoint_type", sa.String(), nullable=False),
+        sa.Column("checkpoint", sa.LargeBinary(), nullable=False),
+        sa.Column("metadata_type", sa.String(), nullable=False),
+        sa.Column("checkpoint_metadata", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id"),
+    )
+    op.create_index(
+        op.f("ix_chat_checkpoint_created_at"),
+        "chat_checkpoint",
+        ["created_at"],
+        unique=False,
+    )
+    op.create_table(
+        "chat_checkpoint_write",
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("checkpoint_ns", sa.String(), nullable=False),
+        sa.Column("checkpoint_id", sa.String(), nullable=False),
+        sa.Column("task_id", sa.String(), nullable=False),
+        sa.Column("idx", sa.Integer(), nullable=False),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("value_type", sa.String(), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.Column("task_path", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "thread_id",
+            "checkpoint_ns",
+            "checkpoint_id",
+            "task_id",
+            "idx",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_table("chat_checkpoint_write")
+    op.drop_index(op.f("ix_chat_checkpoint_created_at"), table_name="chat_checkpoint")
+    op.drop_table("chat_checkpoint")
@@ -0,0 +1,45 @@
+"""Add content hashes of document files and the indexed commit.
+
+Revision ID: b71f3a5c2e84
+Revises: 4e8b2d9c6a10
+Create Date: 2026-10-17 18:05:27.913604
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = "b71f3a5c2e84"
+down_revision = "4e8b2d9c6a10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.add_column(
+        "document_file",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.execute(
+        text(
+            "UPDATE document_file SET "
+            "content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')",
+        ),
+    )
+    op.create_index(
+        op.f("ix_document_file_filepath"),
+        "document_file",
+        ["filepath"],
+        unique=False,
+    )
+    op.add_column("index_state", sa.Column("commit_sha", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_column("index_state", "commit_sha")
+    op.drop_index(op.f("ix_document_file_filepath"), table_name="document_file")
+    op.drop_column("document_file", "content_hash")
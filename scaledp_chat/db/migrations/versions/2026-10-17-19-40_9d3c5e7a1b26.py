@@ -0,0 +1,43 @@
+"""Add chunk embedding cache.
+
+Revision ID: 9d3c5e7a1b26
+Revises: b71f3a5c2e84
+Create Date: 2026-10-17 19:40:12.306481
+
+"""
+
+import pgvector
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9d3c5e7a1b26"
+down_revision = "b71f3a5c2e84"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Run the migration."""
+    op.create_table(
+        "chunk_embedding_cache",
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("text_hash", sa.String(length=64), nullable=False),
+        sa.Column(
+            "embedding",
+            pgvector.sqlalchemy.vector.VECTOR(dim=768),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("model", "text_hash"),
+    )
+
+
+def downgrade() -> None:
+    """Undo the migration."""
+    op.drop_table("chunk_embedding_cache")
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.sqltypes import DateTime, Integer, LargeBinary, String
+
+from scaledp_chat.db.base import Base
+
+
+class ChatCheckpointModel(Base):
+    """
+    Chat checkpoint model.
+
+    Serialized LangGraph checkpoint of a chat session. Only the latest
+    checkpoint of a session is kept.
+    """
+
+    __tablename__ = "chat_checkpoint"
+
+    thread_id: Mapped[str] = mapped_column(String, primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(String, primary_key=True)
+    checkpoint_id: Mapped[str] = mapped_column(String, primary_key=True)
+    parent_checkpoint_id: Mapped[Optional[str]] = mapped_column(
+        String,
+        nullable=True,
+    )
+    checkpoint_type: Mapped[str] = mapped_column(String)
+    checkpoint: Mapped[bytes] = mapped_column(LargeBinary)
+    metadata_type: Mapped[str] = mapped_column(String)
+    checkpoint_metadata: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+    )
+
+
+class ChatCheckpointWriteModel(Base):
+    """Chat checkpoint write model, pending write of a graph task."""
+
+    __tablename__ = "chat_checkpoint_write"
+
+    thread_id: Mapped[str] = mapped_column(String, primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(String, primary_key=True)
+    checkpoint_id: Mapped[str] = mapped_column(String, primary_key=True)
+    task_id: Mapped[str] = mapped_column(String, primary_key=True)
+    idx: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel: Mapped[str] = mapped_column(String)
+    value_type: Mapped[str] = mapped_column(String)
+    value: Mapped[bytes] = mapped_column(LargeBinary)
+    task_path: Mapped[str] = mapped_column(String, default="")
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.sqltypes import DateTime, String
+
+from scaledp_chat.db.base import Base
+from scaledp_chat.settings import settings
+
+
+class ChunkEmbeddingModel(Base):
+    """
+    Chunk embedding cache model.
+
+    Embeddings of chunk texts keyed by the embedding model and the SHA-256
+    of the text, so the indexer embeds every distinct text once per model,
+    across files and runs.
+    """
+
+    __tablename__ = "chunk_embedding_cache"
+
+    model: Mapped[str] = mapped_column(String, primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[np.array] = mapped_column(  # type: ignore
+        Vector(settings.embeddings_vector_size),  # type: ignore
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
@@ -1,11 +1,18 @@
+from typing import Optional
+
 import numpy as np
 from pgvector.sqlalchemy import Vector
+from sqlalchemy import Computed, Index, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql.sqltypes import JSON, String, Text, Uuid
 
 from scaledp_chat.db.base import Base
 from scaledp_chat.settings import settings
 
+# Metadata keys stored in their own columns instead of langchain_metadata
+METADATA_COLUMNS = ["source", "file_id"]
+
 
 class DocumentIndexModel(Base):
     """Document index model."""
@@ -17,8 +24,31 @@ class DocumentIndexModel(Base):
     embedding: Mapped[np.array] = mapped_column(  # type: ignore
         Vector(settings.embeddings_vector_size),  # type: ignore
     )
-    document_id: Mapped[str] = mapped_column(Uuid)
+    document_id: Mapped[Optional[str]] = mapped_column(Uuid, nullable=True)
     langchain_metadata: Mapped[JSON] = mapped_column(JSON)
+    # Typed copies of the metadata used for filtering and deduplication,
+    # filled by the vector store as its metadata columns
+    source: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    file_id: Mapped[Optional[str]] = mapped_column(Uuid, nullable=True, index=True)
+    # Full-text search vector of the content. Punctuation, dots and underscores
+    # are replaced with spaces, so code identifiers are split into words.
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('english', "
+            "regexp_replace(content, '[^[:alnum:]]+', ' ', 'g'))",
+            persisted=True,
+        ),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_document_index_content_tsv",
+            "content_tsv",
+            postgresql_using="gin",
+        ),
+    )
 
 
 class DocumentFileModel(Base):
@@ -28,6 +58,13 @@ class DocumentFileModel(Base):
 
     id: Mapped[str] = mapped_column(Uuid, primary_key=True)
     content: Mapped[str] = mapped_column(Text)
-    filepath: Mapped[str] = mapped_column(String)
+    filepath: Mapped[str] = mapped_column(String, index=True)
     file_type: Mapped[str] = mapped_column(String)
     file_metadata: Mapped[dict[str, str]] = mapped_column(JSON)
+    # Cumulative token counts by line, computed when the file is indexed
+    token_offsets: Mapped[Optional[list[int]]] = mapped_column(
+        ARRAY(Integer),
+        nullable=True,
+    )
+    # SHA-256 of the content, compared with the repository to find changed files
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
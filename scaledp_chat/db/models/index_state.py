@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.sqltypes import DateTime, Integer, String
+
+from scaledp_chat.db.base import Base
+
+
+class IndexStateModel(Base):
+    """
+    Index state model.
+
+    Holds a single row with the version of the document index. The indexer
+    increments the version whenever it rewrites document files, so caches
+    of their contents know when to drop stale entries. The SHA of the last
+    indexed commit is the base of the next incremental re-index.
+    """
+
+    __tablename__ = "index_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+    commit_sha: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
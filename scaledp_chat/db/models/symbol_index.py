@@ -0,0 +1,31 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.sqltypes import Integer, String, Uuid
+
+from scaledp_chat.db.base import Base
+
+
+class SymbolIndexModel(Base):
+    """
+    Symbol index model.
+
+    Maps classes, functions and methods of the indexed repository to the
+    document file and line span where they are defined. Names use the "C"
+    collation, so their btree indexes serve both exact and prefix lookups.
+    """
+
+    __tablename__ = "symbol_index"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Fully qualified name, e.g. scaledp.pipeline.Pipeline.transform
+    name: Mapped[str] = mapped_column(String(collation="C"), index=True)
+    # Name without module and class prefix, e.g. transform
+    short_name: Mapped[str] = mapped_column(String(collation="C"), index=True)
+    kind: Mapped[str] = mapped_column(String)
+    file_id: Mapped[str] = mapped_column(
+        Uuid,
+        ForeignKey("document_file.id", ondelete="CASCADE"),
+        index=True,
+    )
+    start_line: Mapped[int] = mapped_column(Integer)
+    end_line: Mapped[int] = mapped_column(Integer)
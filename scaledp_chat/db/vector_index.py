@@ -0,0 +1,202 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_postgres.v2.indexes import (
+    BaseIndex,
+    DistanceStrategy,
+    HNSWIndex,
+    IVFFlatIndex,
+)
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.settings import VectorDistance, VectorIndexType, settings
+
+VECTOR_INDEX_NAME = "document_index_embedding_idx"
+
+DISTANCE_STRATEGIES = {
+    VectorDistance.COSINE: DistanceStrategy.COSINE_DISTANCE,
+    VectorDistance.EUCLIDEAN: DistanceStrategy.EUCLIDEAN,
+    VectorDistance.INNER_PRODUCT: DistanceStrategy.INNER_PRODUCT,
+}
+
+
+@dataclass
+class VectorIndexCheck:
+    """Result of the vector index check."""
+
+    # Definitions of all indexes on the embedding column
+    definitions: List[str]
+    # Whether an index uses the operator class of the distance strategy
+    matches_strategy: bool
+    # Whether the planner uses the index for similarity search
+    used_by_search: bool
+    # Plan of the similarity search
+    plan: str
+
+
+def get_distance_strategy() -> DistanceStrategy:
+    """
+    Get distance strategy configured in settings.
+
+    :return: distance strategy of the vector store.
+    """
+    return DISTANCE_STRATEGIES[settings.vector_distance]
+
+
+def get_vector_index() -> BaseIndex:
+    """
+    Get vector index configured in settings.
+
+    :return: HNSW or IVFFlat index matching the distance strategy.
+    """
+    if settings.vector_index_type == VectorIndexType.IVFFLAT:
+        return IVFFlatIndex(
+            name=VECTOR_INDEX_NAME,
+            distance_strategy=get_distance_strategy(),
+            lists=settings.vector_index_lists,
+        )
+    return HNSWIndex(
+        name=VECTOR_INDEX_NAME,
+        distance_strategy=get_distance_strategy(),
+        m=settings.vector_index_m,
+        ef_construction=settings.vector_index_ef_construction,
+    )
+
+
+def get_server_settings() -> Dict[str, str]:
+    """
+    Get per-query vector search parameters as connection settings.
+
+    The parameters are sent by asyncpg when a connection is opened,
+    so unlike `SET LOCAL` they don't cost a round trip per query.
+
+    :return: server settings for asyncpg connect_args.
+    """
+    return {
+        "hnsw.ef_search": str(settings.vector_hnsw_ef_search),
+        "ivfflat.probes": str(settings.vector_ivfflat_probes),
+    }
+
+
+async def get_index_definitions(conn: AsyncConnection) -> Dict[str, str]:
+    """
+    Get vector indexes of the document index table.
+
+    :param conn: connection to the database.
+    :return: definitions of indexes on the embedding column by their names.
+    """
+    rows = await conn.execute(
+        text(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = :table_name "
+            "AND (indexdef LIKE '%USING hnsw%' OR indexdef LIKE '%USING ivfflat%')",
+        ),
+        {"table_name": DocumentIndexModel.__tablename__},
+    )
+    return {row.indexname: row.indexdef for row in rows}
+
+
+async def explain_search(conn: AsyncConnection) -> str:
+    """
+    Get plan of the similarity search query.
+
+    Sequential scans are disabled for the query, so the plan shows whether
+    the planner is able to use an index for the configured distance
+    operator, regardless of the table size.
+
+    :param conn: connection to the database.
+    :return: query plan.
+    """
+    operator = get_distance_strategy().operator
+    query_embedding = str([1.0] * settings.embeddings_vector_size)
+    stmt = text(
+        f"""
+        EXPLAIN SELECT langchain_id FROM {DocumentIndexModel.__tablename__}
+        ORDER BY embedding {operator} CAST(:embedding AS vector) LIMIT 3
+        """,  # noqa: S608
+    )
+    # Savepoint is rolled back to reset the local setting
+    savepoint = await conn.begin_nested()
+    try:
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = await conn.execute(stmt, {"embedding": query_embedding})
+        return "\n".join(row[0] for row in rows)
+    finally:
+        await savepoint.rollback()
+
+
+async def check_vector_index(conn: AsyncConnection) -> VectorIndexCheck:
+    """
+    Check that similarity search is served by a vector index.
+
+    :param conn: connection to the database.
+    :return: result of the check.
+    """
+    index_function = get_distance_strategy().index_function
+    definitions = await get_index_definitions(conn)
+    plan = await explain_search(conn)
+    return VectorIndexCheck(
+        definitions=list(definitions.values()),
+        matches_strategy=any(
+            index_function in definition for definition in definitions.values()
+        ),
+        used_by_search=any(f"Index Scan using {name}" in plan for name in definitions),
+        plan=plan,
+    )
+
+
+async def drop_vector_indexes(conn: AsyncConnection) -> List[str]:
+    """
+    Drop all HNSW and IVFFlat indexes of the document index table.
+
+    Bulk loads of many rows are faster without the index, which is built
+    once afterwards instead of being updated for every row.
+
+    :param conn: connection to the database.
+    :return: names of the dropped indexes.
+    """
+    names = list(await get_index_definitions(conn))
+    for name in names:
+        await conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    return names
+
+
+async def create_vector_index(
+    conn: AsyncConnection,
+    index: Optional[BaseIndex] = None,
+) -> None:
+    """
+    Replace vector indexes of the document index table.
+
+    All existing HNSW and IVFFlat indexes on the table are dropped, and the
+    index configured in settings is built.
+
+    :param conn: connection to the database.
+    :param index: index to create, defaults to the one from settings.
+    """
+    index = index or get_vector_index()
+    await drop_vector_indexes(conn)
+    await conn.execute(
+        text(
+            f'CREATE INDEX "{index.name}" ON {DocumentIndexModel.__tablename__} '
+            f"USING {index.index_type} (embedding {index.get_index_function()}) "
+            f"WITH {index.index_options()}",
+        ),
+    )
+
+
+async def ensure_vector_index(conn: AsyncConnection, rebuild: bool = False) -> bool:
+    """
+    Create vector index unless an index matching the distance strategy exists.
+
+    :param conn: connection to the database.
+    :param rebuild: rebuild the index even if it matches.
+    :return: whether the index was (re)built.
+    """
+    check = await check_vector_index(conn)
+    if check.matches_strategy and check.used_by_search and not rebuild:
+        return False
+    await create_vector_index(conn)
+    return True
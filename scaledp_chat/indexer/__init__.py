@@ -0,0 +1 @@
+"""Indexing of the ScaleDP repository."""
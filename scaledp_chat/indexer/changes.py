@@ -0,0 +1,192 @@
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from git import Blob, GitCommandError, Repo
+from gitdb.exc import ODBError
+from langchain_core.documents import Document
+
+FileFilter = Callable[[str], bool]
+
+
+@dataclass(frozen=True)
+class IndexChanges:
+    """Files of the repository which differ from the indexed ones."""
+
+    # Paths of added and modified files, to be indexed again
+    changed: List[str]
+    # Paths of files removed from the repository
+    removed: List[str]
+
+    @property
+    def stale(self) -> List[str]:
+        """Paths of the files whose indexed rows must be deleted."""
+        return self.changed + self.removed
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.removed)
+
+
+def content_hash(content: str) -> str:
+    """
+    Hash content of a file.
+
+    Args:
+        content: Content of the file
+
+    Returns:
+        str: Hex SHA-256 of the UTF-8 encoded content
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def diff_hashes(
+    indexed: Dict[str, str],
+    current: Dict[str, str],
+    paths: Optional[Iterable[str]] = None,
+) -> IndexChanges:
+    """
+    Compare content hashes of the indexed files with the repository.
+
+    Args:
+        indexed: Content hashes of the indexed files by path
+        current: Content hashes of the repository files by path
+        paths: Paths to compare, defaults to all indexed and current files.
+            Files missing from `current` are treated as removed, so it must
+            hold every existing file of the compared paths.
+
+    Returns:
+        IndexChanges: Changed and removed files, sorted by path
+    """
+    compared = set(indexed) | set(current) if paths is None else set(paths)
+    return IndexChanges(
+        changed=sorted(
+            path
+            for path in compared
+            if path in current and indexed.get(path) != current[path]
+        ),
+        removed=sorted(
+            path for path in compared if path in indexed and path not in current
+        ),
+    )
+
+
+def open_repo(repo_path: str, clone_url: str, branch: str) -> Repo:
+    """
+    Clone the repository or update an existing clone to the branch head.
+
+    Args:
+        repo_path: Local path of the repository
+        clone_url: URL the repository is cloned from
+        branch: Branch to check out
+
+    Returns:
+        Repo: Repository checked out at the latest commit of the branch
+
+    Raises:
+        ValueError: If a different repository is cloned at the path
+    """
+    if not (Path(repo_path) / ".git").is_dir():
+        return Repo.clone_from(clone_url, repo_path, branch=branch)
+    repo = Repo(repo_path)
+    if repo.remotes.origin.url != clone_url:
+        raise ValueError("A different repository is already cloned at this path.")
+    repo.git.checkout(branch)
+    repo.remotes.origin.pull(branch)
+    return repo
+
+
+def changed_paths(
+    repo: Repo,
+    since: Optional[str],
+    file_filter: FileFilter,
+) -> Optional[Set[str]]:
+    """
+    Find files changed between an indexed commit and the HEAD.
+
+    Args:
+        repo: Indexed repository
+        since: SHA of the last indexed commit
+        file_filter: Filter of the indexed file paths
+
+    Returns:
+        Optional[Set[str]]: Paths of the added, modified, removed and renamed
+        files, or None if the indexed commit is unknown, e.g. it was never
+        recorded or the history was rewritten
+    """
+    if since is None:
+        return None
+    try:
+        diffs = repo.commit(since).diff(repo.head.commit)
+    except (GitCommandError, ODBError, ValueError):
+        return None
+    return {
+        path
+        for diff in diffs
+        for path in (diff.a_path, diff.b_path)
+        if path and file_filter(path)
+    }
+
+
+def load_files(
+    repo: Repo,
+    file_filter: FileFilter,
+    paths: Optional[Set[str]] = None,
+) -> Iterator[Document]:
+    """
+    Read files of the HEAD commit.
+
+    Files are read from the commit, not the working tree, so their content
+    matches the commit recorded as indexed. Files which are not UTF-8 text
+    are skipped.
+
+    Args:
+        repo: Indexed repository
+        file_filter: Filter of the indexed file paths
+        paths: Paths to read, defaults to all files passing the filter
+
+    Yields:
+        Document: Content of a file with the same metadata as GitLoader
+    """
+    for item in repo.head.commit.tree.traverse():
+        if not isinstance(item, Blob):
+            continue
+        path = str(item.path)
+        if not file_filter(path) or (paths is not None and path not in paths):
+            continue
+        try:
+            content = item.data_stream.read().decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        yield Document(
+            page_content=content,
+            metadata={
+                "source": path,
+                "file_path": path,
+                "file_name": item.name,
+                "file_type": PurePosixPath(item.name).suffix,
+            },
+        )
+
+
+def file_hashes(
+    repo: Repo,
+    file_filter: FileFilter,
+    paths: Optional[Set[str]] = None,
+) -> Dict[str, str]:
+    """
+    Hash files of the HEAD commit without keeping their contents.
+
+    Args:
+        repo: Indexed repository
+        file_filter: Filter of the indexed file paths
+        paths: Paths to hash, defaults to all files passing the filter
+
+    Returns:
+        Dict[str, str]: Content hashes by file path
+    """
+    return {
+        document.metadata["file_path"]: content_hash(document.page_content)
+        for document in load_files(repo, file_filter, paths)
+    }
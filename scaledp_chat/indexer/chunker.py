@@ -0,0 +1,288 @@
+import ast
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+
+from scaledp_chat.indexer.symbols import FunctionNode, definition_span, module_name
+from scaledp_chat.indexer.tokens import (
+    count_tokens,
+    line_token_offsets,
+    split_tokens,
+    truncate_tokens,
+)
+
+DefinitionNode = Union[FunctionNode, ast.ClassDef]
+# 1-based inclusive line span
+Span = Tuple[int, int]
+
+# Fits into the 512 token input of BERT-like embedding models
+DEFAULT_MAX_TOKENS = 400
+
+
+@dataclass(frozen=True)
+class CodeChunk:
+    """Chunk of a python file."""
+
+    # Qualified name of the definition or module the code belongs to
+    symbol: str
+    # One of "module", "class", "function" or "method"
+    kind: str
+    # Header naming the definition, followed by the code
+    text: str
+    # 1-based line span of the code in the file
+    start_line: int
+    end_line: int
+
+
+class _SourceChunker:
+    """Chunks of a single python source."""
+
+    def __init__(self, source: str, max_tokens: int) -> None:
+        self.lines = source.split("\n")
+        self.offsets = line_token_offsets(source)
+        self.max_tokens = max_tokens
+        self.chunks: List[CodeChunk] = []
+
+    def tokens(self, span: Span) -> int:
+        return self.offsets[span[1]] - self.offsets[span[0] - 1]
+
+    def text(self, span: Span) -> str:
+        return "\n".join(self.lines[span[0] - 1 : span[1]])
+
+    def strip(self, span: Span) -> Optional[Span]:
+        """Drop blank lines around the span, None if all of them are blank."""
+        start, end = span
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        return (start, end) if start <= end else None
+
+    def windows(self, span: Span, budget: int) -> Iterator[Span]:
+        """Split the span into runs of lines with at most `budget` tokens."""
+        start = span[0]
+        for line in range(span[0] + 1, span[1] + 1):
+            if self.tokens((start, line)) > budget:
+                yield start, line - 1
+                start = line
+        yield start, span[1]
+
+    def add(self, symbol: str, kind: str, header: str, spans: List[Span]) -> bool:
+        """
+        Add code spans under a header.
+
+        Adjacent spans are merged while they fit into the chunk together
+        with the header, spans which don't fit alone are split by lines and
+        lines which don't fit alone are split by tokens.
+
+        :return: whether any chunk was added.
+        """
+        # Headers take at most half of the chunk, only overlong names are cut
+        header = truncate_tokens(header, self.max_tokens // 2)
+        budget = self.max_tokens - count_tokens(header)
+        groups: List[Span] = []
+        for span in spans:
+            if (
+                groups
+                and span[0] == groups[-1][1] + 1
+                and self.tokens((groups[-1][0], span[1])) <= budget
+            ):
+                groups[-1] = (groups[-1][0], span[1])
+            else:
+                groups.append(span)
+
+        added = False
+        for group in groups:
+            for window in self.windows(group, budget):
+                stripped = self.strip(window)
+                if stripped is None:
+                    continue
+                text = self.text(stripped)
+                parts = [text]
+                if self.tokens(stripped) > budget:
+                    # Single line longer than the chunk
+                    parts = split_tokens(text, budget)
+                self.chunks.extend(
+                    CodeChunk(
+                        symbol=symbol,
+                        kind=kind,
+                        text=f"{header}\n{part}",
+                        start_line=stripped[0],
+                        end_line=stripped[1],
+                    )
+                    for part in parts
+                )
+                added = True
+        return added
+
+    def body(
+        self,
+        body: List[ast.stmt],
+        span: Span,
+        symbol: str,
+        kind: str,
+        header: str,
+    ) -> bool:
+        """
+        Add code of a module or class body and chunks of its definitions.
+
+        Every line of the span outside of the definitions belongs to the
+        code of the body, so comments are kept with the statements below
+        them.
+
+        :return: whether any code of the body was added.
+        """
+        code: List[Span] = []
+        definitions: List[DefinitionNode] = []
+        position = span[0]
+        for node in body:
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                start, end = definition_span(node)
+                if start > position:
+                    code.append((position, start - 1))
+                definitions.append(node)
+            else:
+                end = node.end_lineno or node.lineno
+                if end < position:
+                    # Docstring in the header
+                    continue
+                code.append((position, end))
+            position = end + 1
+        if position <= span[1]:
+            code.append((position, span[1]))
+
+        added = self.add(symbol, kind, header, code)
+        for definition in definitions:
+            self.definition(definition, symbol, in_class=kind == "class")
+        return added
+
+    def definition(self, node: DefinitionNode, prefix: str, in_class: bool) -> None:
+        """Add chunks of a class, function or method."""
+        name = f"{prefix}.{node.name}"
+        start, end = definition_span(node)
+        first = node.body[0]
+        signature_end = max(first.lineno - 1, node.lineno)
+        header_end = signature_end
+        if ast.get_docstring(node, clean=False) is not None:
+            header_end = first.end_lineno or first.lineno
+        header = f"# {name}\n{self.text((start, header_end))}"
+        if count_tokens(header) > self.max_tokens // 2:
+            # Long docstrings are chunked as code
+            header_end = signature_end
+            header = f"# {name}\n{self.text((start, header_end))}"
+        if count_tokens(header) > self.max_tokens // 2:
+            # And so are long signatures, under the name alone
+            header_end = start - 1
+            header = f"# {name}"
+
+        if isinstance(node, ast.ClassDef):
+            if not self.body(node.body, (header_end + 1, end), name, "class", header):
+                # Class with methods only is represented by its header
+                self.chunks.append(CodeChunk(name, "class", header, start, header_end))
+            return
+
+        kind = "method" if in_class else "function"
+        if self.tokens((start, end)) + count_tokens(name) < self.max_tokens:
+            self.chunks.append(
+                CodeChunk(
+                    name,
+                    kind,
+                    f"# {name}\n{self.text((start, end))}",
+                    start,
+                    end,
+                ),
+            )
+            return
+        # Nested definitions stay in the statements of the function
+        statements: List[Span] = []
+        position = header_end + 1
+        for statement in node.body:
+            statement_end = statement.end_lineno or statement.lineno
+            if statement_end >= position:
+                statements.append((position, statement_end))
+                position = statement_end + 1
+        self.add(name, kind, header, statements or [(start, end)])
+
+
+def chunk_python(
+    source: str,
+    filepath: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> List[CodeChunk]:
+    """
+    Split python source into chunks along its definitions.
+
+    Every class, function and method is a chunk of its own, nested
+    functions stay in their parent. Code outside of definitions, like
+    imports and constants, is chunked by statements. Every chunk starts
+    with the qualified name of its definition. Definitions longer than
+    `max_tokens` are split between statements of their body, and every
+    part is headed by the signature and docstring of the definition.
+    Classes are chunked as their header and attributes, their methods
+    are chunks of their own. Sources which are not valid python are split
+    by lines.
+
+    Args:
+        source: Content of the python file
+        filepath: Path of the file relative to the repository root
+        max_tokens: Maximum number of tokens of a chunk, header included,
+            longer single lines are split
+
+    Returns:
+        List[CodeChunk]: Chunks of the source
+    """
+    module = module_name(filepath)
+    chunker = _SourceChunker(source, max_tokens)
+    span = (1, len(chunker.lines))
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        chunker.add(module, "module", f"# {module}", [span])
+    else:
+        chunker.body(tree.body, span, module, "module", f"# {module}")
+    return sorted(chunker.chunks, key=lambda chunk: chunk.start_line)
+
+
+class PythonChunker:
+    """Splitter of python documents into chunks along their definitions."""
+
+    def __init__(self, max_tokens: int = DEFAULT_MAX_TOKENS) -> None:
+        self.max_tokens = max_tokens
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """
+        Split python files into chunks.
+
+        Args:
+            documents: Files with their path in the file_path or source
+                metadata
+
+        Returns:
+            List[Document]: Chunks with the metadata of their file, the
+            symbol and kind of the chunk and its start_line and end_line
+        """
+        chunks: List[Document] = []
+        for document in documents:
+            filepath = document.metadata.get(
+                "file_path",
+                document.metadata.get("source", ""),
+            )
+            chunks.extend(
+                Document(
+                    page_content=chunk.text,
+                    metadata={
+                        **document.metadata,
+                        "symbol": chunk.symbol,
+                        "kind": chunk.kind,
+                        "start_line": chunk.start_line,
+                        "end_line": chunk.end_line,
+                    },
+                )
+                for chunk in chunk_python(
+                    document.page_content,
+                    filepath,
+                    self.max_tokens,
+                )
+            )
+        return chunks
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from scaledp_chat.db.dao.chunk_embedding_dao import ChunkEmbeddingDAO
+from scaledp_chat.indexer.changes import content_hash
+from scaledp_chat.indexer.pipeline import Vectors
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Texts embedded through the cache."""
+
+    texts: int = 0
+    # Distinct texts found in the cache
+    hits: int = 0
+    # Distinct texts sent to the embedding model
+    misses: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        """Texts repeated within their batch."""
+        return self.texts - self.hits - self.misses
+
+
+class CachedEmbedder:
+    """
+    Embeddings of chunk texts cached in the database.
+
+    Texts are keyed by the embedding model and their SHA-256, so license
+    headers, imports and other boilerplate are embedded once, and a
+    re-index of unchanged files embeds nothing. Texts repeated within a
+    batch are embedded once, cached embeddings of a batch are fetched with
+    one query and only the misses are sent to the model.
+
+    Every lookup and store runs in its own short transaction, so concurrent
+    embedding workers can share the cache, and embeddings are kept even if
+    the indexing run fails later.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        embed: Callable[[List[str]], Awaitable[Vectors]],
+        model: str,
+    ) -> None:
+        """
+        Create the cache.
+
+        :param session_factory: factory of the sessions of the cache.
+        :param embed: embed texts with the model.
+        :param model: name of the embedding model, the cache of every model
+            is separate.
+        """
+        self.session_factory = session_factory
+        self.embed = embed
+        self.model = model
+        self.stats = EmbeddingCacheStats()
+
+    async def aembed_documents(self, texts: List[str]) -> Vectors:
+        """
+        Embed texts, computing only embeddings missing from the cache.
+
+        :param texts: texts to embed.
+        :return: embeddings of the texts.
+        """
+        hashes = [content_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+        async with self.session_factory() as session:
+            vectors = await ChunkEmbeddingDAO(session).get_many(
+                self.model,
+                list(unique),
+            )
+        hits = len(vectors)
+
+        missing = [text_hash for text_hash in unique if text_hash not in vectors]
+        if missing:
+            embedded: Dict[str, List[float]] = dict(
+                zip(missing, await self.embed([unique[key] for key in missing])),
+            )
+            async with self.session_factory() as session, session.begin():
+                await ChunkEmbeddingDAO(session).put_many(self.model, embedded)
+            vectors.update(embedded)
+
+        self.stats.texts += len(texts)
+        self.stats.hits += hits
+        self.stats.misses += len(missing)
+        return [vectors[text_hash] for text_hash in hashes]
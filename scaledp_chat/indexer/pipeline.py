@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+Vectors = List[List[float]]
+Batch = List[Document]
+
+# Embedding model of a worker process, created by the initializer of the pool
+_worker: Dict[str, Embeddings] = {}
+
+
+def _init_worker(factory: Callable[[], Embeddings], threads: int) -> None:
+    # Math libraries read the number of threads when they are imported, so
+    # the workers share the cores instead of each of them using all of them
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    _worker["embeddings"] = factory()
+
+
+def _embed_documents(texts: List[str]) -> Vectors:
+    return _worker["embeddings"].embed_documents(texts)
+
+
+class ProcessPoolEmbedder(Embeddings):
+    """
+    Embeddings computed by a pool of worker processes.
+
+    Every worker creates its own model with `factory`, so a local model
+    embeds several batches at once on all CPU cores instead of running in
+    one python thread. The factory must be picklable, e.g. a partial of the
+    embeddings class, as the workers are spawned fresh processes.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], workers: int) -> None:
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(factory, max((os.cpu_count() or 1) // workers, 1)),
+        )
+
+    def embed_documents(self, texts: List[str]) -> Vectors:
+        """
+        Embed texts in a worker process.
+
+        :param texts: texts to embed.
+        :return: embeddings of the texts.
+        """
+        return self.executor.submit(_embed_documents, texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query in a worker process.
+
+        :param text: query to embed.
+        :return: embedding of the query.
+        """
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> Vectors:
+        """
+        Embed texts in a worker process without blocking the event loop.
+
+        :param texts: texts to embed.
+        :return: embeddings of the texts.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _embed_documents, texts)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "ProcessPoolEmbedder":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+@dataclass
+class StageStats:
+    """Throughput of a pipeline stage."""
+
+    name: str
+    unit: str
+    items: int = 0
+    # Time spent on the items, without waiting for the neighbouring stages,
+    # summed over the concurrent workers of the stage
+    busy: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def add(self, items: int, started: float) -> None:
+        """Count items processed since `started`."""
+        self.items += items
+        self.busy += time.monotonic() - started
+
+    def finish(self) -> None:
+        """Mark the stage as finished and log its throughput."""
+        self.finished = time.monotonic()
+        logging.info(f"Finished {self}")
+
+    @property
+    def elapsed(self) -> float:
+        """Time since the pipeline started, until the stage finished."""
+        return (self.finished or time.monotonic()) - self.started
+
+    def __str__(self) -> str:
+        rate = self.items / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.name}: {self.items} {self.unit} in {self.elapsed:.1f}s "
+            f"({rate:.1f}/s, busy {self.busy:.1f}s)"
+        )
+
+
+class IndexingPipeline:
+    """
+    Indexing of files with concurrent load, split, embed and write stages.
+
+    The stages are connected with bounded queues, so a stage waits when the
+    next one falls behind and only a few batches are held in memory at any
+    time, however large the repository is. Chunks are embedded in batches
+    of `batch_size` by `workers` concurrent calls of `embed`. The throughput
+    of every stage is logged every `log_interval` seconds and when it
+    finishes.
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[Document], Awaitable[Optional[Document]]],
+        split: Callable[[Document], List[Document]],
+        embed: Callable[[List[str]], Awaitable[Vectors]],
+        write: Callable[[Batch, Vectors], Awaitable[Any]],
+        batch_size: int = 64,
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        log_interval: float = 10.0,
+    ) -> None:
+        """
+        Create the pipeline.
+
+        :param prepare: store a file and return the document to split, or
+            None to skip the file.
+        :param split: split a document into chunks.
+        :param embed: embed texts of a batch of chunks.
+        :param write: store a batch of chunks with their embeddings.
+        :param batch_size: number of chunks embedded and written at once.
+        :param workers: number of batches embedded concurrently.
+        :param queue_size: capacity of the queues between the stages,
+            defaults to two items per worker.
+        :param log_interval: seconds between the progress logs.
+        """
+        self.prepare = prepare
+        self.split = split
+        self.embed = embed
+        self.write = write
+        self.batch_size = batch_size
+        self.workers = workers
+        self.queue_size = queue_size or 2 * workers
+        self.log_interval = log_interval
+
+    async def run(self, files: Iterable[Document]) -> List[StageStats]:
+        """
+        Index the files.
+
+        :param files: files to index, read lazily in a thread.
+        :return: throughput of the stages in the pipeline order.
+        """
+        loaded: "asyncio.Queue[Optional[Document]]" = asyncio.Queue(self.queue_size)
+        batches: "asyncio.Queue[Optional[Batch]]" = asyncio.Queue(self.queue_size)
+        embedded: "asyncio.Queue[Optional[Tuple[Batch, Vectors]]]" = asyncio.Queue(
+            self.queue_size,
+        )
+        stats = [
+            StageStats("load", "files"),
+            StageStats("split", "chunks"),
+            StageStats("embed", "chunks"),
+            StageStats("write", "chunks"),
+        ]
+        stages = [
+            self._load(files, loaded, stats[0]),
+            self._split(loaded, batches, stats[1]),
+            self._embed(batches, embedded, stats[2]),
+            self._write(embedded, stats[3]),
+        ]
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        reporter = asyncio.ensure_future(
+            self._report(stats, [loaded, batches, embedded]),
+        )
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # Cancel all stages when any of them fails, so none is left
+            # waiting on a queue nobody consumes
+            for task in [*tasks, reporter]:
+                task.cancel()
+            await asyncio.gather(*tasks, reporter, return_exceptions=True)
+        return stats
+
+    async def _load(
+        self,
+        files: Iterable[Document],
+        loaded: "asyncio.Queue[Optional[Document]]",
+        stats: StageStats,
+    ) -> None:
+        iterator = iter(files)
+        while True:
+            started = time.monotonic()
+            file = await asyncio.to_thread(next, iterator, None)
+            if file is None:
+                break
+            stats.add(1, started)
+            await loaded.put(file)
+        await loaded.put(None)
+        stats.finish()
+
+    async def _split(
+        self,
+        loaded: "asyncio.Queue[Optional[Document]]",
+        batches: "asyncio.Queue[Optional[Batch]]",
+        stats: StageStats,
+    ) -> None:
+        batch: Batch = []
+        while (file := await loaded.get()) is not None:
+            started = time.monotonic()
+            document = await self.prepare(file)
+            chunks = self.split(document) if document else []
+            stats.add(len(chunks), started)
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    await batches.put(batch)
+                    batch = []
+        if batch:
+            await batches.put(batch)
+        # Every embedding worker stops at its own end marker
+        for _ in range(self.workers):
+            await batches.put(None)
+        stats.finish()
+
+    async def _embed(
+        self,
+        batches: "asyncio.Queue[Optional[Batch]]",
+        embedded: "asyncio.Queue[Optional[Tuple[Batch, Vectors]]]",
+        stats: StageStats,
+    ) -> None:
+        async def worker() -> None:
+            while (batch := await batches.get()) is not None:
+                started = time.monotonic()
+                vectors = await self.embed([chunk.page_content for chunk in batch])
+                stats.add(len(batch), started)
+                await embedded.put((batch, vectors))
+
+        await asyncio.gather(*(worker() for _ in range(self.workers)))
+        await embedded.put(None)
+        stats.finish()
+
+    async def _write(
+        self,
+        embedded: "asyncio.Queue[Optional[Tuple[Batch, Vectors]]]",
+        stats: StageStats,
+    ) -> None:
+        while (item := await embedded.get()) is not None:
+            started = time.monotonic()
+            await self.write(*item)
+            stats.add(len(item[0]), started)
+        stats.finish()
+
+    async def _report(
+        self,
+        stats: List[StageStats],
+        queues: "List[asyncio.Queue[Any]]",
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.log_interval)
+            logging.info(
+                "Indexing "
+                + "; ".join(str(stage) for stage in stats)
+                + f"; queued {[queue.qsize() for queue in queues]}",
+            )
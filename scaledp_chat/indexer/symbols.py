@@ -0,0 +1,91 @@
+import ast
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import List, Union
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+@dataclass(frozen=True)
+class Symbol:
+    """Class, function or method defined in a python module."""
+
+    # Fully qualified name, e.g. scaledp.pipeline.Pipeline.transform
+    name: str
+    # Name without module and class prefix, e.g. transform
+    short_name: str
+    # One of "class", "function" or "method"
+    kind: str
+    # 1-based line span of the definition, decorators included
+    start_line: int
+    end_line: int
+
+
+def module_name(filepath: str) -> str:
+    """
+    Convert path of a python file to a dotted module name.
+
+    Args:
+        filepath: Path of the file relative to the repository root
+
+    Returns:
+        str: Module name, e.g. scaledp/models/__init__.py -> scaledp.models
+    """
+    path = PurePosixPath(filepath.replace("\\", "/")).with_suffix("")
+    parts = list(path.parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def definition_span(node: Union[FunctionNode, ast.ClassDef]) -> tuple[int, int]:
+    """
+    Get line span of a definition.
+
+    Args:
+        node: Class or function definition
+
+    Returns:
+        tuple[int, int]: 1-based inclusive line span, decorators included
+    """
+    start_line = min(
+        [node.lineno] + [decorator.lineno for decorator in node.decorator_list],
+    )
+    return start_line, node.end_lineno or node.lineno
+
+
+def extract_symbols(source: str, filepath: str) -> List[Symbol]:
+    """
+    Extract classes, functions and methods defined in a python source.
+
+    Args:
+        source: Content of the python file
+        filepath: Path of the file relative to the repository root
+
+    Returns:
+        List[Symbol]: Symbols in the order of their definition, nested
+        definitions included. Files which are not valid python return no
+        symbols.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    symbols: List[Symbol] = []
+
+    def visit(body: List[ast.stmt], prefix: str, in_class: bool) -> None:
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+            else:
+                continue
+            name = f"{prefix}.{node.name}" if prefix else node.name
+            start_line, end_line = definition_span(node)
+            symbols.append(Symbol(name, node.name, kind, start_line, end_line))
+            visit(node.body, name, in_class=kind == "class")
+
+    visit(tree.body, module_name(filepath), in_class=False)
+    return symbols
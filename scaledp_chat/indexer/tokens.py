@@ -0,0 +1,77 @@
+import re
+from typing import List
+
+# Word pieces of up to four characters and single punctuation characters,
+# which is close to the BPE tokenization of python code
+TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate number of LLM tokens in the text.
+
+    Args:
+        text: Text to count tokens of
+
+    Returns:
+        int: Number of tokens
+    """
+    return len(TOKEN_RE.findall(text))
+
+
+def line_token_offsets(content: str) -> List[int]:
+    """
+    Count tokens of a file cumulatively by line.
+
+    Args:
+        content: Content of the file
+
+    Returns:
+        List[int]: Number of tokens before every line, followed by the total,
+        so lines start..end (1-based) have offsets[end] - offsets[start - 1]
+        tokens
+    """
+    offsets = [0]
+    for line in content.split("\n"):
+        offsets.append(offsets[-1] + count_tokens(line))
+    return offsets
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut the text after the given number of tokens.
+
+    Args:
+        text: Text to cut
+        max_tokens: Number of tokens to keep
+
+    Returns:
+        str: Beginning of the text with at most max_tokens tokens
+    """
+    if max_tokens <= 0:
+        return ""
+    for index, match in enumerate(TOKEN_RE.finditer(text)):
+        if index == max_tokens - 1:
+            return text[: match.end()]
+    return text
+
+
+def split_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    Split the text into parts of at most the given number of tokens.
+
+    Args:
+        text: Text to split
+        max_tokens: Number of tokens of a part, at least one
+
+    Returns:
+        List[str]: Consecutive parts which join into the text
+    """
+    parts = []
+    start = 0
+    for index, match in enumerate(TOKEN_RE.finditer(text)):
+        if index and index % max_tokens == 0:
+            parts.append(text[start : match.start()])
+            start = match.start()
+    parts.append(text[start:])
+    return parts
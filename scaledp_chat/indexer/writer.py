@@ -0,0 +1,217 @@
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple, cast
+
+from asyncpg import Connection
+from langchain_core.documents import Document
+from pgvector.asyncpg import register_vector
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.models.document_index import (
+    METADATA_COLUMNS,
+    DocumentFileModel,
+    DocumentIndexModel,
+)
+from scaledp_chat.db.models.symbol_index import SymbolIndexModel
+from scaledp_chat.indexer.changes import content_hash
+from scaledp_chat.indexer.symbols import Symbol
+from scaledp_chat.indexer.tokens import line_token_offsets
+
+FILE_COLUMNS = (
+    "id",
+    "content",
+    "filepath",
+    "file_type",
+    "file_metadata",
+    "token_offsets",
+    "content_hash",
+)
+SYMBOL_COLUMNS = ("name", "short_name", "kind", "file_id", "start_line", "end_line")
+CHUNK_COLUMNS = (
+    "langchain_id",
+    "content",
+    "embedding",
+    "langchain_metadata",
+    *METADATA_COLUMNS,
+)
+
+
+@dataclass
+class CopyStats:
+    """Rows copied into a table."""
+
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Copied rows per second."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class BulkWriter:
+    """
+    Writer of document files, symbols and chunks with COPY.
+
+    Rows are streamed to the tables with the binary COPY protocol of
+    asyncpg, a round trip per batch instead of per row, and embeddings are
+    sent in the binary pgvector format instead of text. Files and their
+    symbols are buffered and copied every `file_batch_size` files, chunks
+    are copied in the batches they are written in.
+
+    COPY runs on the connection of the session, inside its transaction, so
+    the written rows are committed or rolled back with the session. The
+    connection is shared by the concurrent stages of the indexer, so the
+    copies are serialized with a lock.
+    """
+
+    def __init__(self, connection: Connection, file_batch_size: int = 256) -> None:
+        self.connection = connection
+        self.file_batch_size = file_batch_size
+        self.files: List[Tuple[Any, ...]] = []
+        self.symbols: List[Tuple[Any, ...]] = []
+        self.stats: Dict[str, CopyStats] = {}
+        self._lock = asyncio.Lock()
+
+    async def add_file(
+        self,
+        content: str,
+        filepath: str,
+        file_type: str,
+        file_metadata: Dict[str, str],
+        symbols: Sequence[Symbol],
+    ) -> str:
+        """
+        Add a document file with its symbols.
+
+        The file is copied with the next batch of files, its token counts
+        and content hash are computed here like in DocumentFileDAO.
+
+        :param content: content of the file.
+        :param filepath: path of the file.
+        :param file_type: type of the file.
+        :param file_metadata: additional metadata about the file.
+        :param symbols: symbols defined in the file.
+        :return: ID of the document file.
+        """
+        file_id = str(uuid.uuid4())
+        self.files.append(
+            (
+                file_id,
+                content,
+                filepath,
+                file_type,
+                json.dumps(file_metadata),
+                line_token_offsets(content),
+                content_hash(content),
+            ),
+        )
+        self.symbols.extend(
+            (
+                symbol.name,
+                symbol.short_name,
+                symbol.kind,
+                file_id,
+                symbol.start_line,
+                symbol.end_line,
+            )
+            for symbol in symbols
+        )
+        if len(self.files) >= self.file_batch_size:
+            await self.flush()
+        return file_id
+
+    async def add_chunks(
+        self,
+        chunks: Sequence[Document],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        """
+        Copy chunks with their embeddings.
+
+        Metadata keys stored in their own columns are left out of the
+        metadata JSON, the same way the vector store stores them.
+
+        :param chunks: chunks to store.
+        :param embeddings: embeddings of the chunks.
+        """
+        records = []
+        for chunk, embedding in zip(chunks, embeddings):
+            extra = {
+                key: value
+                for key, value in chunk.metadata.items()
+                if key not in METADATA_COLUMNS
+            }
+            records.append(
+                (
+                    chunk.id or str(uuid.uuid4()),
+                    chunk.page_content,
+                    embedding,
+                    json.dumps(extra),
+                    *(chunk.metadata.get(column) for column in METADATA_COLUMNS),
+                ),
+            )
+        await self._copy(DocumentIndexModel.__tablename__, CHUNK_COLUMNS, records)
+
+    async def flush(self) -> None:
+        """Copy buffered files and their symbols."""
+        files, self.files = self.files, []
+        symbols, self.symbols = self.symbols, []
+        # Files go first, as symbols reference them
+        await self._copy(DocumentFileModel.__tablename__, FILE_COLUMNS, files)
+        await self._copy(SymbolIndexModel.__tablename__, SYMBOL_COLUMNS, symbols)
+
+    async def _copy(
+        self,
+        table: str,
+        columns: Sequence[str],
+        records: List[Tuple[Any, ...]],
+    ) -> None:
+        if not records:
+            return
+        async with self._lock:
+            started = time.monotonic()
+            await self.connection.copy_records_to_table(
+                table,
+                records=records,
+                columns=list(columns),
+            )
+            stats = self.stats.setdefault(table, CopyStats())
+            stats.rows += len(records)
+            stats.seconds += time.monotonic() - started
+
+
+@asynccontextmanager
+async def bulk_writer(
+    session: AsyncSession,
+    file_batch_size: int = 256,
+) -> AsyncIterator[BulkWriter]:
+    """
+    Open a bulk writer on the connection of the session.
+
+    Buffered files are copied when the context exits without an error.
+
+    :param session: session whose transaction the rows are written in.
+    :param file_batch_size: number of files copied at once.
+    :yield: bulk writer.
+    """
+    connection = await session.connection()
+    # The session starts its transaction lazily, with its first statement
+    await connection.exec_driver_sql("SELECT 1")
+    driver_connection = cast(
+        Connection,
+        (await connection.get_raw_connection()).driver_connection,
+    )
+    # Binary vector codec is registered only while the writer is open, as
+    # queries of SQLAlchemy send vectors as text
+    await register_vector(driver_connection)
+    try:
+        writer = BulkWriter(driver_connection, file_batch_size)
+        yield writer
+        await writer.flush()
+    finally:
+        await driver_connection.reset_type_codec("vector", schema="public")
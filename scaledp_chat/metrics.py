@@ -0,0 +1,213 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+# Latency buckets in seconds, from a fast query to a long LLM answer
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_value(value: float) -> str:
+    """Format a sample value in the Prometheus text format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Format labels of a sample in the Prometheus text format."""
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric(ABC):
+    """
+    Metric exposed in the Prometheus text format.
+
+    Metrics are kept in the process, so with several workers every worker
+    exposes its own values.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """Samples of the metric as suffix, labels and value."""
+
+    def render(self) -> str:
+        """
+        Render the metric in the Prometheus text format.
+
+        :return: help and type comments followed by the samples.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{format_labels(labels)} {format_value(value)}"
+            for suffix, labels, value in self.samples()
+        )
+        return "\n".join(lines) + "\n"
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        # A counter without labels is exposed from the start
+        self.values: Dict[LabelValues, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increase the counter.
+
+        :param amount: non-negative increment.
+        :param labels: values of all labels of the counter.
+        """
+        key = self._label_values(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        """Samples of the metric as suffix, labels and value."""
+        with self._lock:
+            values = list(self.values.items())
+        for key, value in values:
+            yield "", dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = [*sorted(buckets), math.inf]
+        # Observations per bucket, sum and count by label values
+        self.values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Observe a value.
+
+        :param value: observed value.
+        :param labels: values of all labels of the histogram.
+        """
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total, count = self.values.get(
+                key,
+                ([0] * len(self.buckets), 0.0, 0),
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Iterator[Sample]:
+        """Samples of the metric as suffix, labels and value."""
+        with self._lock:
+            values = [(key, (list(c), s, n)) for key, (c, s, n) in self.values.items()]
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", {**labels, "le": format_value(bound)}, cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+
+class CallbackMetric(Metric):
+    """Metric reading its values from a callback when it is rendered."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        kind: str = "gauge",
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        """Samples of the metric as suffix, labels and value."""
+        for key, value in self.callback().items():
+            yield "", dict(zip(self.labelnames, key)), value
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    """Collection of the metrics exposed by the application."""
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        """
+        Add a metric to the registry.
+
+        :param metric: metric with a name unique in the registry.
+        :return: registered metric.
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format.
+
+        :return: exposition text.
+        """
+        return "".join(metric.render() for metric in self.metrics.values())
+
+
+registry = Registry()
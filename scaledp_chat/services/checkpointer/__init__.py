@@ -0,0 +1 @@
+"""Persistent checkpointer of chat sessions."""
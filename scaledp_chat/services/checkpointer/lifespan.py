@@ -0,0 +1,59 @@
+import asyncio
+import contextlib
+import logging
+
+from fastapi import FastAPI
+
+from scaledp_chat.services.checkpointer.saver import PostgresCheckpointSaver
+from scaledp_chat.settings import settings
+
+
+async def sweep_sessions(
+    checkpointer: PostgresCheckpointSaver,
+    ttl: float,
+    interval: float,
+) -> None:
+    """
+    Delete expired chat sessions every `interval` seconds.
+
+    :param checkpointer: checkpointer storing the sessions.
+    :param ttl: time to live of a session in seconds.
+    :param interval: pause between sweeps in seconds.
+    """
+    while True:
+        try:
+            deleted = await checkpointer.asweep(ttl)
+        except Exception:
+            logging.exception("Failed to sweep expired chat sessions")
+        else:
+            if deleted:
+                logging.info(f"Deleted {deleted} expired chat sessions")
+        await asyncio.sleep(interval)
+
+
+def init_checkpointer(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Create checkpointer of chat sessions and start the session sweeper.
+
+    :param app: current FastAPI application.
+    """
+    checkpointer = PostgresCheckpointSaver(app.state.db_session_factory)
+    app.state.checkpointer = checkpointer
+    app.state.session_sweeper = asyncio.create_task(
+        sweep_sessions(
+            checkpointer,
+            ttl=settings.session_ttl,
+            interval=settings.session_sweep_interval,
+        ),
+    )
+
+
+async def shutdown_checkpointer(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stop the session sweeper.
+
+    :param app: current application.
+    """
+    app.state.session_sweeper.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.session_sweeper
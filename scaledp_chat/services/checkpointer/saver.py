@@ -0,0 +1,329 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import and_, delete, exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from scaledp_chat.db.models.chat_checkpoint import (
+    ChatCheckpointModel,
+    ChatCheckpointWriteModel,
+)
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer storing chat sessions in Postgres.
+
+    Checkpoints are stored with the SQLAlchemy engine of the application,
+    every operation runs in its own short transaction. Only the latest
+    checkpoint of a session is kept, so the storage of a session is bounded
+    by the size of its state. Sessions not updated for a while are removed
+    with `asweep`.
+
+    Only the async methods are implemented, as the graph is run with
+    `astream`.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.session_factory = session_factory
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get the checkpoint of the config, or the latest one of the thread.
+
+        :param config: config with the thread id and optional checkpoint id.
+        :return: checkpoint tuple or None if the thread has no checkpoints.
+        """
+        stmt = select(ChatCheckpointModel).where(
+            ChatCheckpointModel.thread_id == config["configurable"]["thread_id"],
+            ChatCheckpointModel.checkpoint_ns
+            == config["configurable"].get("checkpoint_ns", ""),
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            stmt = stmt.where(ChatCheckpointModel.checkpoint_id == checkpoint_id)
+        else:
+            stmt = stmt.order_by(ChatCheckpointModel.checkpoint_id.desc()).limit(1)
+
+        async with self.session_factory() as session:
+            row = await session.scalar(stmt)
+            if row is None:
+                return None
+            writes = await self._get_writes(session, row)
+        return self._to_tuple(row, writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """
+        List checkpoints, the latest first.
+
+        :param config: config with the thread id to list checkpoints of.
+        :param filter: metadata values the checkpoints must have.
+        :param before: list only checkpoints created before this one.
+        :param limit: maximum number of checkpoints.
+        :yield: checkpoint tuples.
+        """
+        stmt = select(ChatCheckpointModel).order_by(
+            ChatCheckpointModel.checkpoint_id.desc(),
+        )
+        if config:
+            stmt = stmt.where(
+                ChatCheckpointModel.thread_id == config["configurable"]["thread_id"],
+            )
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                stmt = stmt.where(ChatCheckpointModel.checkpoint_ns == checkpoint_ns)
+        if before and (before_id := get_checkpoint_id(before)):
+            stmt = stmt.where(ChatCheckpointModel.checkpoint_id < before_id)
+
+        async with self.session_factory() as session:
+            rows = (await session.scalars(stmt)).all()
+            tuples = [
+                self._to_tuple(row, await self._get_writes(session, row))
+                for row in rows
+            ]
+
+        count = 0
+        for checkpoint_tuple in tuples:
+            if filter and any(
+                checkpoint_tuple.metadata.get(key) != value
+                for key, value in filter.items()
+            ):
+                continue
+            yield checkpoint_tuple
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Store a checkpoint and remove the older checkpoints of its thread.
+
+        :param config: config of the parent checkpoint.
+        :param checkpoint: checkpoint to store.
+        :param metadata: metadata of the checkpoint.
+        :param new_versions: new versions of the channels.
+        :return: config of the stored checkpoint.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata),
+        )
+        values = {
+            "parent_checkpoint_id": get_checkpoint_id(config),
+            "checkpoint_type": checkpoint_type,
+            "checkpoint": checkpoint_data,
+            "metadata_type": metadata_type,
+            "checkpoint_metadata": metadata_data,
+        }
+        stmt = insert(ChatCheckpointModel).values(
+            thread_id=thread_id,
+            checkpoint_ns=checkpoint_ns,
+            checkpoint_id=checkpoint["id"],
+            **values,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["thread_id", "checkpoint_ns", "checkpoint_id"],
+            set_=values,
+        )
+
+        async with self.session_factory() as session, session.begin():
+            await session.execute(stmt)
+            for model in (ChatCheckpointModel, ChatCheckpointWriteModel):
+                await session.execute(
+                    delete(model).where(
+                        model.thread_id == thread_id,
+                        model.checkpoint_ns == checkpoint_ns,
+                        model.checkpoint_id < checkpoint["id"],
+                    ),
+                )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            },
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Store pending writes of a task.
+
+        :param config: config of the checkpoint the task started from.
+        :param writes: channels and values written by the task.
+        :param task_id: id of the task.
+        :param task_path: path of the task.
+        """
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_data = self.serde.dumps_typed(value)
+            rows.append(
+                {
+                    "thread_id": config["configurable"]["thread_id"],
+                    "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                    "checkpoint_id": config["configurable"]["checkpoint_id"],
+                    "task_id": task_id,
+                    "idx": WRITES_IDX_MAP.get(channel, idx),
+                    "channel": channel,
+                    "value_type": value_type,
+                    "value": value_data,
+                    "task_path": task_path,
+                },
+            )
+        if not rows:
+            return
+
+        stmt = insert(ChatCheckpointWriteModel).values(rows)
+        # Special writes like errors replace the previous ones, regular writes
+        # of a task are stored once
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    "thread_id",
+                    "checkpoint_ns",
+                    "checkpoint_id",
+                    "task_id",
+                    "idx",
+                ],
+                set_={
+                    "channel": stmt.excluded.channel,
+                    "value_type": stmt.excluded.value_type,
+                    "value": stmt.excluded.value,
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing()
+
+        async with self.session_factory() as session, session.begin():
+            await session.execute(stmt)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        Delete all checkpoints and writes of a thread.
+
+        :param thread_id: id of the thread.
+        """
+        async with self.session_factory() as session, session.begin():
+            for model in (ChatCheckpointModel, ChatCheckpointWriteModel):
+                await session.execute(delete(model).where(model.thread_id == thread_id))
+
+    async def asweep(self, ttl: float) -> int:
+        """
+        Delete sessions which were not updated for `ttl` seconds.
+
+        Writes left without their checkpoint are deleted as well.
+
+        :param ttl: time to live of a session in seconds.
+        :return: number of deleted checkpoints.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+        async with self.session_factory() as session, session.begin():
+            result = await session.execute(
+                delete(ChatCheckpointModel).where(
+                    ChatCheckpointModel.created_at < cutoff,
+                ),
+            )
+            await session.execute(
+                delete(ChatCheckpointWriteModel).where(
+                    ~exists().where(
+                        and_(
+                            ChatCheckpointModel.thread_id
+                            == ChatCheckpointWriteModel.thread_id,
+                            ChatCheckpointModel.checkpoint_ns
+                            == ChatCheckpointWriteModel.checkpoint_ns,
+                            ChatCheckpointModel.checkpoint_id
+                            == ChatCheckpointWriteModel.checkpoint_id,
+                        ),
+                    ),
+                ),
+            )
+        return result.rowcount  # type: ignore
+
+    async def _get_writes(
+        self,
+        session: AsyncSession,
+        row: ChatCheckpointModel,
+    ) -> Iterable[ChatCheckpointWriteModel]:
+        return await session.scalars(
+            select(ChatCheckpointWriteModel)
+            .where(
+                ChatCheckpointWriteModel.thread_id == row.thread_id,
+                ChatCheckpointWriteModel.checkpoint_ns == row.checkpoint_ns,
+                ChatCheckpointWriteModel.checkpoint_id == row.checkpoint_id,
+            )
+            .order_by(ChatCheckpointWriteModel.task_id, ChatCheckpointWriteModel.idx),
+        )
+
+    def _to_tuple(
+        self,
+        row: ChatCheckpointModel,
+        writes: Iterable[ChatCheckpointWriteModel],
+    ) -> CheckpointTuple:
+        def make_config(checkpoint_id: str) -> RunnableConfig:
+            return {
+                "configurable": {
+                    "thread_id": row.thread_id,
+                    "checkpoint_ns": row.checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                },
+            }
+
+        return CheckpointTuple(
+            config=make_config(row.checkpoint_id),
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed(
+                (row.metadata_type, row.checkpoint_metadata),
+            ),
+            parent_config=(
+                make_config(row.parent_checkpoint_id)
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (
+                    write.task_id,
+                    write.channel,
+                    self.serde.loads_typed((write.value_type, write.value)),
+                )
+                for write in writes
+            ],
+        )
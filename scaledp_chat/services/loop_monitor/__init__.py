@@ -0,0 +1 @@
+"""Event loop stall monitor."""
@@ -0,0 +1,27 @@
+from fastapi import FastAPI
+
+from scaledp_chat.services.loop_monitor.monitor import LoopStallMonitor
+from scaledp_chat.settings import settings
+
+
+async def init_loop_monitor(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Start event loop stall monitor.
+
+    :param app: current FastAPI application.
+    """
+    monitor = LoopStallMonitor(
+        threshold=settings.loop_monitor_threshold,
+        interval=settings.loop_monitor_interval,
+    )
+    await monitor.start()
+    app.state.loop_monitor = monitor
+
+
+async def shutdown_loop_monitor(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Stop event loop stall monitor.
+
+    :param app: current application.
+    """
+    await app.state.loop_monitor.stop()
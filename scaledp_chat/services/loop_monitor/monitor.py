@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from scaledp_chat.metrics import Counter, registry
+
+loop_stalls = registry.register(
+    Counter(
+        "event_loop_stalls_total",
+        "Callbacks detected blocking the event loop.",
+    ),
+)
+loop_stalled_seconds = registry.register(
+    Counter(
+        "event_loop_stalled_seconds_total",
+        "Time the event loop was blocked by the detected stalls in seconds.",
+    ),
+)
+
+
+class LoopStallMonitor:
+    """
+    Detects callbacks that block the event loop.
+
+    A heartbeat task running on the monitored loop wakes up every `interval`
+    seconds and measures how late it was woken up. A lag longer than
+    `threshold` means that some callback kept the loop busy, so the stall
+    is logged and counted, also in the metrics of the worker.
+
+    A watchdog thread checks the heartbeat at the same pace. When the
+    heartbeat is overdue it captures the stack of the loop thread while the
+    loop is still blocked, so the log points at the offending code.
+    """
+
+    def __init__(self, threshold: float, interval: float) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        # Quantity of detected stalls
+        self.stalls = 0
+        # Total and longest time the loop was blocked, in seconds
+        self.stalled_seconds = 0.0
+        self.max_stall = 0.0
+        # Stack of the loop thread captured during the last stall
+        self.last_stack: Optional[str] = None
+
+        self._last_beat = time.monotonic()
+        self._captured_beat: Optional[float] = None
+        self._pending_stack: Optional[str] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        """Start monitoring the running event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            name="loop-stall-monitor",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._heartbeat
+            self._heartbeat = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    async def _beat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._last_beat - self.interval
+            if lag >= self.threshold:
+                self._record(lag)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            if last_beat == self._captured_beat:
+                continue
+            if time.monotonic() - last_beat - self.interval < self.threshold:
+                continue
+            self._captured_beat = last_beat
+            frame = sys._current_frames().get(  # noqa: SLF001
+                self._loop_thread_id,  # type: ignore
+            )
+            if frame is not None:
+                self._pending_stack = "".join(traceback.format_stack(frame))
+
+    def _record(self, lag: float) -> None:
+        self.stalls += 1
+        self.stalled_seconds += lag
+        self.max_stall = max(self.max_stall, lag)
+        loop_stalls.inc()
+        loop_stalled_seconds.inc(lag)
+        self.last_stack = self._pending_stack
+        self._pending_stack = None
+        logging.warning(
+            f"Event loop was blocked for {lag:.3f}s, "
+            f"blocking stack:\n{self.last_stack or 'not captured'}",
+        )
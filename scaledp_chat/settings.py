@@ -21,6 +21,32 @@ class LogLevel(str, enum.Enum):
     FATAL = "FATAL"
 
 
+class RetrievalMode(str, enum.Enum):
+    """Possible document retrieval modes."""
+
+    # One embedding call and one query per search term
+    SEQUENTIAL = "sequential"
+    # One embedding call and one query for all search terms
+    BATCHED = "batched"
+    # Batched vector search fused with full-text search in one query
+    HYBRID = "hybrid"
+
+
+class VectorDistance(str, enum.Enum):
+    """Possible distances between embeddings."""
+
+    COSINE = "cosine"
+    EUCLIDEAN = "euclidean"
+    INNER_PRODUCT = "inner_product"
+
+
+class VectorIndexType(str, enum.Enum):
+    """Possible vector index types."""
+
+    HNSW = "hnsw"
+    IVFFLAT = "ivfflat"
+
+
 class Settings(BaseSettings):
     """
     Application settings.
@@ -62,6 +88,19 @@ class Settings(BaseSettings):
     sentry_dsn: Optional[str] = None
     sentry_sample_rate: float = 1.0
 
+    # Event loop stall monitor
+    loop_monitor_enabled: bool = False
+    # callbacks blocking the event loop longer than this (seconds) are reported
+    loop_monitor_threshold: float = 0.1
+    # how often (seconds) the event loop heartbeat runs
+    loop_monitor_interval: float = 0.05
+
+    # Readiness probe
+    # pools with a larger share of connections in use fail readiness
+    ready_max_pool_saturation: float = 0.9
+    # timeout (seconds) of the database query of the readiness probe
+    ready_db_timeout: float = 1.0
+
     # Embeddings
     # https://huggingface.co/BAAI/bge-base-en-v1.5
     embeddings_vector_size: int = 768
@@ -69,6 +108,64 @@ class Settings(BaseSettings):
 
     togetherai_embeddings_model: str = "BAAI/bge-base-en-v1.5"
     togetherai_embeddings_api_key: SecretStr | None = None
+    # quantity of cached query embeddings and their time to live (seconds)
+    embeddings_cache_size: int = 1024
+    embeddings_cache_ttl: float = 3600
+
+    # Vector index, its distance must match the one used by searches
+    vector_distance: VectorDistance = VectorDistance.COSINE
+    vector_index_type: VectorIndexType = VectorIndexType.HNSW
+    # HNSW build parameters
+    vector_index_m: int = 16
+    vector_index_ef_construction: int = 64
+    # IVFFlat build parameter
+    vector_index_lists: int = 100
+    # per-query search parameters, higher values trade latency for recall
+    vector_hnsw_ef_search: int = 40
+    vector_ivfflat_probes: int = 1
+
+    # Retrieval
+    # extract search terms with the repository symbol table instead of the LLM
+    local_term_extraction: bool = True
+    # resolve class and function names with the symbol index, not vector search
+    symbol_lookup: bool = True
+    # quantity of symbols a name resolves to, exact matches ranked first
+    symbol_lookup_limit: int = 10
+    retrieval_mode: RetrievalMode = RetrievalMode.BATCHED
+    # quantity of documents retrieved for every search term
+    retrieval_k: int = 3
+    # nearest chunks searched for every term before deduplication by source
+    retrieval_fetch_k: int = 10
+    # hybrid retrieval: quantity of returned documents, candidates taken from
+    # every ranking and reciprocal rank fusion constant
+    retrieval_hybrid_k: int = 10
+    retrieval_hybrid_fetch_k: int = 20
+    retrieval_rrf_k: int = 60
+    # maximum number of tokens of the code passed to the LLM as context
+    context_token_budget: int = 4000
+    # maximum number of input tokens of the generator, the latest question and
+    # the RAG prompt are always kept and earlier turns are trimmed to the rest
+    history_token_budget: int = 6000
+    # total size of cached document files (bytes) and how often the index
+    # version is checked to invalidate them (seconds)
+    file_cache_maxbytes: int = 64 * 1024 * 1024
+    index_version_ttl: float = 30
+    # semantic cache of answers to single-turn questions, answers are reused
+    # for questions with cosine similarity of embeddings above the threshold
+    answer_cache_enabled: bool = False
+    answer_cache_size: int = 512
+    answer_cache_ttl: float = 3600
+    answer_cache_threshold: float = 0.95
+    # chat sessions stored in the database: maximum number of kept messages,
+    # time to live of an idle session and pause between sweeps (seconds)
+    session_max_messages: int = 20
+    session_ttl: float = 7 * 24 * 3600
+    session_sweep_interval: float = 3600
+    # coalesce consecutive tokens of the streamed answer into one frame, sent
+    # once it holds the given bytes or waited for the given seconds
+    stream_coalesce: bool = True
+    stream_coalesce_bytes: int = 1024
+    stream_coalesce_delay: float = 0.016
 
     repo_url: str = "https://github.com/StabRise/ScaleDP.git"
 
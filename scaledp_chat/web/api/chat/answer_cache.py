@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.cache import LRUCache
+from scaledp_chat.settings import settings
+from scaledp_chat.web.api.chat.index_version import IndexVersion, index_version
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """Answer to a question with the sources it was generated from."""
+
+    question: str
+    # Normalized embedding of the question
+    embedding: npt.NDArray[np.float32]
+    sources: List[str]
+    answer: str
+
+
+def normalize(embedding: List[float]) -> npt.NDArray[np.float32]:
+    """Scale the embedding to unit length, so dot product is cosine."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Semantic cache of answers to single-turn questions.
+
+    A question is answered from the cache when the cosine similarity of its
+    embedding and the embedding of a cached question is at least
+    `threshold`. Answers are evicted in the LRU order, expire after `ttl`
+    seconds and are dropped when the index version changes.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        threshold: float,
+        index_version: IndexVersion,
+    ) -> None:
+        self.answers: LRUCache[str, CachedAnswer] = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.threshold = threshold
+        self.index_version = index_version
+        # Index version the cached answers belong to
+        self.version: Optional[int] = None
+
+    async def acheck_version(self, db_session: AsyncSession) -> None:
+        """
+        Drop cached answers if the index version changed.
+
+        Args:
+            db_session (AsyncSession): SQLAlchemy async database session
+        """
+        version = await self.index_version.aget(db_session)
+        if version != self.version:
+            self.answers.clear()
+            self.version = version
+
+    def lookup(self, embedding: List[float]) -> Optional[CachedAnswer]:
+        """
+        Find the answer to the most similar cached question.
+
+        Args:
+            embedding (List[float]): Embedding of the question
+
+        Returns:
+            Optional[CachedAnswer]: Cached answer or None if no cached
+            question is similar enough
+        """
+        items = self.answers.items()
+        if not items:
+            self.answers.misses += 1
+            return None
+        similarities = np.stack([answer.embedding for _, answer in items]) @ (
+            normalize(embedding)
+        )
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.answers.misses += 1
+            return None
+        # Counts the hit and marks the answer as recently used
+        return self.answers.get(items[best][0])
+
+    def store(
+        self,
+        question: str,
+        embedding: List[float],
+        sources: List[str],
+        answer: str,
+    ) -> None:
+        """
+        Store answer to the question.
+
+        Args:
+            question (str): Question text
+            embedding (List[float]): Embedding of the question
+            sources (List[str]): Sources of the retrieved context
+            answer (str): Generated answer
+        """
+        self.answers.set(
+            question,
+            CachedAnswer(
+                question=question,
+                embedding=normalize(embedding),
+                sources=sources,
+                answer=answer,
+            ),
+        )
+
+
+answer_cache = AnswerCache(
+    maxsize=settings.answer_cache_size,
+    ttl=settings.answer_cache_ttl,
+    threshold=settings.answer_cache_threshold,
+    index_version=index_version,
+)
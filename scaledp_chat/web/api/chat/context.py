@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from scaledp_chat.db.models.document_index import DocumentFileModel
+from scaledp_chat.indexer.symbols import Symbol
+from scaledp_chat.indexer.tokens import line_token_offsets
+
+# 1-based inclusive line span
+Span = Tuple[int, int]
+
+
+@dataclass
+class FileContext:
+    """Document file the context is packed from."""
+
+    source: str
+    content: str
+    lines: List[str]
+    # Cumulative token counts by line, see line_token_offsets
+    token_offsets: List[int]
+    symbols: List[Symbol]
+
+    @classmethod
+    def from_model(
+        cls,
+        document_file: DocumentFileModel,
+        symbols: Optional[List[Symbol]] = None,
+    ) -> "FileContext":
+        """
+        Create file context from the document file model.
+
+        Args:
+            document_file: Document file loaded from the database
+            symbols: Symbols defined in the file
+
+        Returns:
+            FileContext: File context, token counts are computed only for
+            files indexed without them
+        """
+        content = document_file.content
+        return cls(
+            source=document_file.filepath,
+            content=content,
+            lines=content.split("\n"),
+            token_offsets=document_file.token_offsets or line_token_offsets(content),
+            symbols=symbols or [],
+        )
+
+    def tokens(self, span: Span) -> int:
+        """Number of tokens of the line span."""
+        return self.token_offsets[span[1]] - self.token_offsets[span[0] - 1]
+
+    def chunk_span(self, doc: Document) -> Span:
+        """
+        Get line span of a retrieved document.
+
+        Symbol documents carry their line span, chunks carry the offset of
+        their first character.
+        """
+        if "start_line" in doc.metadata:
+            start, end = doc.metadata["start_line"], doc.metadata["end_line"]
+        else:
+            start_index = doc.metadata.get("start_index")
+            if start_index is None:
+                start_index = max(self.content.find(doc.page_content), 0)
+            start = self.content.count("\n", 0, start_index) + 1
+            end = start + doc.page_content.count("\n")
+        return max(start, 1), min(end, len(self.lines))
+
+    def enclosing_span(self, span: Span) -> Optional[Span]:
+        """
+        Get span of the innermost class or function containing the span.
+
+        Returns:
+            Optional[Span]: Span of the definition or None if the span is
+            not inside of any definition
+        """
+        enclosing = [
+            (symbol.start_line, min(symbol.end_line, len(self.lines)))
+            for symbol in self.symbols
+            if symbol.start_line <= span[0] and symbol.end_line >= span[1]
+        ]
+        if not enclosing:
+            return None
+        return min(enclosing, key=lambda item: item[1] - item[0])
+
+
+def merge_spans(spans: List[Span]) -> List[Span]:
+    """
+    Merge overlapping and adjacent line spans.
+
+    Args:
+        spans: Line spans in any order
+
+    Returns:
+        List[Span]: Disjoint line spans sorted by their start
+    """
+    merged: List[Span] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def pack_context(
+    docs: Sequence[Document],
+    files: Dict[str, FileContext],
+    budget: int,
+) -> str:
+    """
+    Pack source code of retrieved documents into a token budget.
+
+    Documents are taken in the order of their rank. Every document is
+    expanded to the innermost class or function enclosing it, or kept as is
+    when the definition doesn't fit into the remaining budget. Spans of the
+    same file are merged, so shared lines are counted once. Documents which
+    don't fit at all are skipped, so smaller ones of lower rank may still
+    be packed.
+
+    Args:
+        docs: Retrieved documents sorted by relevance
+        files: Files of the documents keyed by file ID
+        budget: Maximum number of tokens of the packed code
+
+    Returns:
+        str: Packed spans grouped by file in the order of their best rank,
+        each headed by the file path and line numbers
+    """
+    packed: Dict[str, List[Span]] = {}
+    remaining = budget
+    for doc in docs:
+        file_id = str(doc.metadata.get("file_id"))
+        file = files.get(file_id)
+        if file is None:
+            continue
+
+        chunk = file.chunk_span(doc)
+        spans = packed.get(file_id, [])
+        used = sum(file.tokens(span) for span in spans)
+        for candidate in (file.enclosing_span(chunk), chunk):
+            if candidate is None:
+                continue
+            merged = merge_spans([*spans, candidate])
+            cost = sum(file.tokens(span) for span in merged) - used
+            if cost <= remaining:
+                packed[file_id] = merged
+                remaining -= cost
+                break
+
+    blocks = []
+    for file_id, spans in packed.items():
+        file = files[file_id]
+        for start, end in spans:
+            code = "\n".join(file.lines[start - 1 : end])
+            blocks.append(f"# {file.source}, lines {start}-{end}\n{code}")
+    return "\n\n".join(blocks)
@@ -0,0 +1,22 @@
+from langgraph.graph.graph import CompiledGraph
+from starlette.requests import Request
+
+
+def get_graph(request: Request) -> CompiledGraph:
+    """
+    Get the RAG graph compiled at startup.
+
+    :param request: current request.
+    :return: compiled graph.
+    """
+    return request.app.state.graph
+
+
+def get_session_graph(request: Request) -> CompiledGraph:
+    """
+    Get the RAG graph compiled at startup with the session checkpointer.
+
+    :param request: current request.
+    :return: compiled graph.
+    """
+    return request.app.state.session_graph
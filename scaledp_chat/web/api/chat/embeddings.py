@@ -0,0 +1,155 @@
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_together import TogetherEmbeddings
+
+from scaledp_chat.cache import LRUCache
+
+
+class BatchTogetherEmbeddings(TogetherEmbeddings):
+    """
+    TogetherEmbeddings that embeds a list of texts with a single request.
+
+    The upstream implementation sends one HTTP request per text. The Together
+    embeddings endpoint is OpenAI compatible and accepts a list of inputs, so
+    all texts are sent at once and the vectors are returned in input order.
+    """
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of texts with one request.
+
+        Args:
+            texts: The list of texts to embed.
+
+        Returns:
+            List of embeddings, one for each text.
+        """
+        if not texts:
+            return []
+        response = self.client.create(input=texts, **self._invocation_params)
+        if not isinstance(response, dict):
+            response = response.model_dump()
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously embed a list of texts with one request.
+
+        Args:
+            texts: The list of texts to embed.
+
+        Returns:
+            List of embeddings, one for each text.
+        """
+        if not texts:
+            return []
+        response = await self.async_client.create(
+            input=texts,
+            **self._invocation_params,
+        )
+        if not isinstance(response, dict):
+            response = response.model_dump()
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches vectors of already embedded texts.
+
+    Vectors are cached by (model, text), so repeated texts cost no calls to
+    the embedding model. Texts missing from the cache are embedded with one
+    call to the wrapped embeddings.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        cache: LRUCache[Tuple[str, str], List[float]],
+    ) -> None:
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def _lookup(self, texts: List[str]) -> Tuple[Dict[str, List[float]], List[str]]:
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for text in texts:
+            if text in found or text in missing:
+                continue
+            vector = self.cache.get((self.model, text))
+            if vector is None:
+                missing.append(text)
+            else:
+                found[text] = vector
+        return found, missing
+
+    def _store(
+        self,
+        found: Dict[str, List[float]],
+        texts: List[str],
+        vectors: List[List[float]],
+    ) -> None:
+        for text, vector in zip(texts, vectors):
+            self.cache.set((self.model, text), vector)
+            found[text] = vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, calling the wrapped embeddings only for cache misses.
+
+        Args:
+            texts: The list of texts to embed.
+
+        Returns:
+            List of embeddings, one for each text.
+        """
+        found, missing = self._lookup(texts)
+        if missing:
+            self._store(found, missing, self.embeddings.embed_documents(missing))
+        return [found[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed query text, calling the wrapped embeddings on a cache miss.
+
+        Args:
+            text: The text to embed.
+
+        Returns:
+            Embedding for the text.
+        """
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously embed texts, calling the wrapped embeddings only for
+        cache misses.
+
+        Args:
+            texts: The list of texts to embed.
+
+        Returns:
+            List of embeddings, one for each text.
+        """
+        found, missing = self._lookup(texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(missing)
+            self._store(found, missing, vectors)
+        return [found[text] for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """
+        Asynchronously embed query text, calling the wrapped embeddings on a
+        cache miss.
+
+        Args:
+            text: The text to embed.
+
+        Returns:
+            Embedding for the text.
+        """
+        return (await self.aembed_documents([text]))[0]
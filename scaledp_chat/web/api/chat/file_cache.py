@@ -0,0 +1,87 @@
+import sys
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.cache import LRUCache
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.db.dao.symbol_index_dao import SymbolIndexDAO
+from scaledp_chat.settings import settings
+from scaledp_chat.web.api.chat.context import FileContext
+from scaledp_chat.web.api.chat.index_version import IndexVersion, index_version
+
+
+def file_size(file: FileContext) -> int:
+    """Approximate memory size of the file context in bytes."""
+    return (
+        2 * sys.getsizeof(file.content)
+        + sys.getsizeof(file.token_offsets)
+        + 100 * len(file.symbols)
+    )
+
+
+class DocumentFileCache:
+    """
+    In-process cache of document files used to build the answer context.
+
+    Files are cached together with their symbols and token counts in a
+    LRU cache bounded by the total size of the files. The cache is cleared
+    when the index version changes, and as the version is checked without
+    a query most of the time, hot files usually cost no database queries.
+    """
+
+    def __init__(self, maxbytes: int, index_version: IndexVersion) -> None:
+        self.files: LRUCache[str, FileContext] = LRUCache(
+            maxbytes=maxbytes,
+            sizeof=file_size,
+        )
+        self.index_version = index_version
+        # Index version the cached files belong to
+        self.version: Optional[int] = None
+
+    async def get_many(
+        self,
+        db_session: AsyncSession,
+        file_ids: Sequence[str],
+    ) -> Dict[str, FileContext]:
+        """
+        Get document files, loading only the missing ones from the database.
+
+        Args:
+            db_session (AsyncSession): SQLAlchemy async database session
+            file_ids (Sequence[str]): IDs of the document files
+
+        Returns:
+            Dict[str, FileContext]: Found files keyed by their IDs
+        """
+        version = await self.index_version.aget(db_session)
+        if version != self.version:
+            self.files.clear()
+            self.version = version
+
+        files: Dict[str, FileContext] = {}
+        missing = []
+        for file_id in dict.fromkeys(str(file_id) for file_id in file_ids):
+            file = self.files.get(file_id)
+            if file is None:
+                missing.append(file_id)
+            else:
+                files[file_id] = file
+
+        if missing:
+            document_files = await DocumentFileDAO(db_session).get_many(missing)
+            symbols = await SymbolIndexDAO(db_session).get_symbols(missing)
+            for document_file in document_files:
+                file_id = str(document_file.id)
+                files[file_id] = FileContext.from_model(
+                    document_file,
+                    symbols.get(file_id),
+                )
+                self.files.set(file_id, files[file_id])
+        return files
+
+
+file_cache = DocumentFileCache(
+    maxbytes=settings.file_cache_maxbytes,
+    index_version=index_version,
+)
@@ -1,20 +1,43 @@
 import logging
-from functools import partial
-from typing import Annotated, Any, Dict
+from typing import Annotated, Any, AsyncGenerator, Dict, Optional
 
 from langchain_core.documents import Document
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_postgres import PGVectorStore
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import START, StateGraph
 from langgraph.graph.graph import CompiledGraph
 from langgraph.graph.message import add_messages
+from langgraph.types import StreamWriter
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing_extensions import List, TypedDict
 
-from scaledp_chat.db.models.document_index import DocumentFileModel
+from scaledp_chat.db.dao.document_index_dao import DocumentIndexDAO, distinct_sources
+from scaledp_chat.db.dao.symbol_index_dao import SymbolIndexDAO
+from scaledp_chat.settings import RetrievalMode, settings
+from scaledp_chat.web.api.chat.context import pack_context
+from scaledp_chat.web.api.chat.file_cache import file_cache
+from scaledp_chat.web.api.chat.history import window_messages
 from scaledp_chat.web.api.chat.llm import generator_llm, retrieve_llm
 from scaledp_chat.web.api.chat.prompts import defenition_prompt, rag_prompt
+from scaledp_chat.web.api.chat.symbols import symbol_table
+from scaledp_chat.web.api.chat.timings import Timings
+
+
+def get_request_db_session(config: RunnableConfig) -> AsyncSession:
+    """Get database session of the request from the run configuration."""
+    return config["configurable"]["db_session"]
+
+
+def get_request_vector_store(config: RunnableConfig) -> PGVectorStore:
+    """Get vector store from the run configuration."""
+    return config["configurable"]["vector_store"]
+
+
+def get_request_timings(config: RunnableConfig) -> Timings:
+    """Get stage timings of the request from the run configuration."""
+    return config["configurable"].get("timings") or Timings()
 
 
 class State(TypedDict):
@@ -25,9 +48,174 @@ class State(TypedDict):
     answer: str
 
 
+async def extract_definitions(question: str, db_session: AsyncSession) -> List[str]:
+    """
+    Extract python class and function names from the question.
+
+    Args:
+        question (str): User question
+        db_session (AsyncSession): SQLAlchemy async database session
+
+    Returns:
+        List[str]: Extracted names
+
+    Names are matched locally against the symbol table of the indexed
+    repository. The LLM is used only as a fallback when the question doesn't
+    mention any known symbol or local extraction is disabled.
+    """
+    if settings.local_term_extraction:
+        await symbol_table.aload(db_session)
+        defenitions = symbol_table.extract(question)
+        if defenitions:
+            return defenitions
+
+    # Use LLM to analyze and extract key concepts from the question
+    messages = await defenition_prompt.ainvoke({"question": question})
+    response = await retrieve_llm.ainvoke(messages.to_messages())
+    return response.content.split(",")  # type: ignore
+
+
+async def search_documents(
+    terms: List[str],
+    vector_store: PGVectorStore,
+    db_session: AsyncSession,
+    timings: Timings,
+) -> List[List[Document]]:
+    """
+    Perform semantic search for every search term.
+
+    Args:
+        terms (List[str]): Search terms in the order of priority
+        vector_store (PGVectorStore): Vector database instance for semantic
+         document search
+        db_session (AsyncSession): SQLAlchemy async database session
+        timings (Timings): Stage timings of the request
+
+    Returns:
+        List[List[Document]]: Top matches for every search term, in the order
+        of the given terms
+
+    Both modes return the nearest chunk of distinct files for every term,
+    taken from its `retrieval_fetch_k` nearest chunks. In the batched mode
+    all terms are embedded with one embedding call and searched with one
+    database query. In the sequential mode every term costs one embedding
+    call and one query.
+    """
+    if settings.retrieval_mode == RetrievalMode.BATCHED:
+        with timings.measure("embed"):
+            embeddings = await vector_store.embeddings.aembed_documents(terms)
+        with timings.measure("vector"):
+            return await DocumentIndexDAO(db_session).similarity_search_batch(
+                embeddings,
+                k=settings.retrieval_k,
+                fetch_k=settings.retrieval_fetch_k,
+            )
+
+    # Embedding and query of a term are timed together
+    with timings.measure("vector"):
+        return [
+            distinct_sources(
+                await vector_store.asimilarity_search(
+                    term,
+                    k=max(settings.retrieval_fetch_k, settings.retrieval_k),
+                ),
+                k=settings.retrieval_k,
+            )
+            for term in terms
+        ]
+
+
+async def search_terms(
+    terms: List[str],
+    vector_store: PGVectorStore,
+    db_session: AsyncSession,
+    timings: Timings,
+) -> AsyncGenerator[List[Document], None]:
+    """
+    Find documents for every search term.
+
+    Args:
+        terms (List[str]): Search terms in the order of priority, the first
+         one is the free-text question
+        vector_store (PGVectorStore): Vector database instance for semantic
+         document search
+        db_session (AsyncSession): SQLAlchemy async database session
+        timings (Timings): Stage timings of the request
+
+    Yields:
+        List[Document]: Documents for every search term, in the order of the
+        given terms, as soon as the term and all preceding ones are searched
+
+    Terms naming a class, function or module are resolved with one exact
+    and prefix lookup in the symbol index. Semantic search runs only for the
+    question and the terms which didn't resolve to any symbol. In the hybrid
+    mode those terms are searched with one full-text and vector query, and
+    the fused ranking comes first, followed by the resolved symbols. In the
+    sequential mode every term is searched on its own, so the documents of
+    the first terms are yielded while the remaining ones are searched.
+    """
+    symbol_docs: Dict[str, List[Document]] = {}
+    if settings.symbol_lookup:
+        with timings.measure("symbols"):
+            symbol_docs = await SymbolIndexDAO(db_session).lookup(
+                [term.strip() for term in terms[1:]],
+                limit=settings.symbol_lookup_limit,
+            )
+        logging.info(f"Resolved symbols: {list(symbol_docs)}")
+
+    vector_terms = [term for term in terms if term.strip() not in symbol_docs]
+
+    if settings.retrieval_mode == RetrievalMode.HYBRID:
+        # All remaining terms are fused into one ranking led by the question
+        with timings.measure("embed"):
+            embeddings = await vector_store.embeddings.aembed_documents(vector_terms)
+        with timings.measure("vector"):
+            hybrid_docs = await DocumentIndexDAO(db_session).hybrid_search(
+                " ".join(vector_terms),
+                embeddings,
+                k=settings.retrieval_hybrid_k,
+                fetch_k=settings.retrieval_hybrid_fetch_k,
+                rrf_k=settings.retrieval_rrf_k,
+            )
+        yield hybrid_docs
+        for term in terms:
+            if term.strip() in symbol_docs:
+                yield symbol_docs[term.strip()]
+        return
+
+    vector_docs: Dict[str, List[Document]] = {}
+    if settings.retrieval_mode == RetrievalMode.BATCHED:
+        vector_docs = dict(
+            zip(
+                vector_terms,
+                await search_documents(
+                    vector_terms,
+                    vector_store=vector_store,
+                    db_session=db_session,
+                    timings=timings,
+                ),
+            ),
+        )
+
+    for term in terms:
+        if term.strip() in symbol_docs:
+            yield symbol_docs[term.strip()]
+        elif term in vector_docs:
+            yield vector_docs[term]
+        else:
+            [docs] = await search_documents(
+                [term],
+                vector_store=vector_store,
+                db_session=db_session,
+                timings=timings,
+            )
+            yield docs
+
+
 async def retrieve(
     state: State,
-    vector_store: PGVectorStore,
+    config: RunnableConfig,
+    writer: StreamWriter,
 ) -> Dict[str, List[Document]]:
     """
     Retrieve relevant documents using semantic search based on user queries
@@ -37,8 +225,11 @@ async def retrieve(
             - messages (List[BaseMessage]): The complete conversation history
             - context (List[Document]): Previously retrieved reference documents
             - answer (str): The last generated response
-        vector_store (PGVectorStore): Vector database instance for semantic
-         document search
+        config (RunnableConfig): Run configuration with the vector store, the
+         database session and the stage timings of the request
+        writer (StreamWriter): Writer of the custom stream events, the new
+         unique documents of every search term are published under the
+         "context" key as soon as the term is searched
 
     Returns:
         Dict[str, List[Document]]: Dictionary containing retrieved documents
@@ -47,29 +238,37 @@ async def retrieve(
 
     Process Flow:
     1. Extracts the most recent user question from the conversation
-    2. Uses an LLM to analyze the question and extract relevant search terms
+    2. Extracts class and function names from the question, matching them
+       against the repository symbol table and falling back to an LLM
     3. Combines extracted terms with predefined system keywords
-    4. Performs semantic similarity search for each search term
-    5. Deduplicates results based on document sources
+    4. Resolves names through the symbol index and performs semantic
+       similarity search for the remaining search terms
+    5. Deduplicates results based on document sources and publishes the new
+       documents of every term to the stream, so citations are sent while
+       the remaining terms are searched
     6. Returns unique, relevant documents as context
 
     Implementation Details:
-    - Utilizes defenition_prompt to extract meaningful search terms
+    - Utilizes the symbol table or defenition_prompt to extract search terms
     - Includes system-specific keywords (ScaleDPSession, DataToImage, show_image)
-    - Performs incremental searches with both extracted and predefined terms
+    - Searches with both extracted and predefined terms, batched into one
+      embedding call and one query unless sequential retrieval is configured
     - Maintains result uniqueness by tracking document sources
     - Prioritizes more recent/relevant search terms in the search order
     """
+    vector_store = get_request_vector_store(config)
+    db_session = get_request_db_session(config)
+    timings = get_request_timings(config)
+
     # Extract the latest user question from the conversation history
     question: str = state["messages"][-1].content[0]["text"]  # type: ignore
 
-    # Use LLM to analyze and extract key concepts from the question
-    messages = defenition_prompt.invoke({"question": question})
-    response = retrieve_llm.invoke(messages.to_messages())
+    # Extract key concepts from the question
+    with timings.measure("extract"):
+        defenitions = await extract_definitions(question, db_session)
 
     # Define core system keywords and combine with extracted terms
     predefined_context = ["ScaleDPSession", "DataToImage", "show_image"]
-    defenitions = response.content.split(",")  # type: ignore
 
     # Log extracted terms for debugging and monitoring
     logging.info(f"Extracted defenitions: {defenitions}")
@@ -85,22 +284,30 @@ async def retrieve(
     retrieved_docs = []
     seen_sources = set()
 
-    # Perform semantic search for each term, starting with most specific
-    for context in predefined_context[::-1]:
-        docs = await vector_store.asimilarity_search(
-            context,
-            k=3,  # Retrieve top 3 matches per term
-        )
+    # Search for each term, starting with most specific
+    search_results = search_terms(
+        predefined_context[::-1],
+        vector_store=vector_store,
+        db_session=db_session,
+        timings=timings,
+    )
+    async for docs in search_results:
         # Deduplicate documents based on source
+        new_docs = []
         for doc in docs:
             if doc.metadata["source"] not in seen_sources:
-                retrieved_docs.append(doc)
+                new_docs.append(doc)
                 seen_sources.add(doc.metadata["source"])
+        retrieved_docs.extend(new_docs)
+
+        # Publish the new documents before the next term is searched
+        if new_docs:
+            writer({"context": new_docs})
 
     return {"context": retrieved_docs}
 
 
-async def generate(state: State, db_session: AsyncSession) -> Dict[str, Any]:
+async def generate(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """
     Generate a response based on the context and user's question
     using RAG (Retrieval-Augmented Generation).
@@ -110,59 +317,102 @@ async def generate(state: State, db_session: AsyncSession) -> Dict[str, Any]:
             - messages: List of conversation messages
             - context: List of retrieved Documents
             - answer: Generated response string
-        db_session (AsyncSession): SQLAlchemy async database session
+        config (RunnableConfig): Run configuration with the database session
+            and the stage timings of the request
 
     Returns:
-        Dict[str, str]: Dictionary with key "answer" containing the generated response
+        Dict[str, Any]: Dictionary with key "answer" containing the generated
+        response and key "messages" appending the response to the
+        conversation and removing the messages beyond the session limit
 
     The function performs these steps:
-    1. Retrieves full document contents from the database for each context document
-       using the provided async session
-    2. Combines all document contents into a single string separated by newlines
+    1. Retrieves the files of all context documents and the symbols defined
+       in them from the file cache, loading missing files from the database
+    2. Expands every context document to its enclosing class or function
+       and packs the spans into the token budget, in the order of relevance
     3. Extracts the latest question from the conversation messages
     4. Formats the prompt with question and context using rag_prompt
-    5. Generates a response using the LLM with the complete conversation history
+    5. Trims earlier turns of the conversation to the token budget left by
+       the latest turn and the prompt, keeping the most recent ones
+    6. Generates a response using the LLM with the trimmed conversation
+    7. Drops the oldest messages, so a stored session keeps at most
+       `session_max_messages` messages
 
     Notes:
         - Expects document file_ids to be stored in the Document metadata
         - Uses the rag_prompt template for formatting the context and question
-        - Preserves conversation history when generating the response
+        - Preserves recent conversation history when generating the response
     """
 
-    # Fetch full document contents from database
-    file_contents: List[str] = []
-    for doc in state["context"]:
-        document_file: DocumentFileModel | None = await db_session.get(
-            DocumentFileModel,
-            doc.metadata["file_id"],
+    timings = get_request_timings(config)
+
+    # Get files of the context documents, hot files are served from the cache
+    with timings.measure("files"):
+        files = await file_cache.get_many(
+            get_request_db_session(config),
+            [doc.metadata["file_id"] for doc in state["context"]],
         )
-        if document_file:
-            file_contents.append(document_file.content)
 
-    # Combine all document contents
-    docs_content = "\n\n".join(file_contents)
+    # Pack the code around the context documents into the token budget
+    with timings.measure("pack"):
+        docs_content = pack_context(
+            state["context"],
+            files,
+            budget=settings.context_token_budget,
+        )
 
     # Extract the latest question from messages
     question = state["messages"][-1].content[0]["text"]  # type: ignore
 
     # Format the prompt with question and context
-    messages = rag_prompt.invoke({"question": question, "context": docs_content})
+    messages = await rag_prompt.ainvoke(
+        {"question": question, "context": docs_content},
+    )
 
-    # Generate response using the LLM
-    response = await generator_llm.ainvoke(state["messages"] + messages.to_messages())
+    # Fit the conversation into the token budget, keeping the latest turn
+    generator_input = window_messages(
+        state["messages"],
+        messages.to_messages(),
+        budget=settings.history_token_budget,
+    )
 
-    return {"answer": response.content}
+    # Generate response using the LLM, the time to the first token is
+    # measured by the stream from the mark
+    timings.mark("llm")
+    with timings.measure("llm"):
+        response = await generator_llm.ainvoke(generator_input)
 
+    # Keep the conversation bounded, the oldest messages are dropped first
+    excess = max(len(state["messages"]) + 1 - settings.session_max_messages, 0)
+    removed = [
+        RemoveMessage(id=str(message.id)) for message in state["messages"][:excess]
+    ]
 
-def build_graph(vector_store: PGVectorStore, db_session: AsyncSession) -> CompiledGraph:
-    """Build a state graph for the RAG application."""
+    return {"answer": response.content, "messages": [*removed, response]}
 
-    partial_retrieve = partial(retrieve, vector_store=vector_store)
-    partial_generate = partial(generate, db_session=db_session)
 
+def build_graph(
+    checkpointer: Optional[BaseCheckpointSaver[Any]] = None,
+) -> CompiledGraph:
+    """
+    Build and compile the state graph of the RAG application.
+
+    The graph is compiled once at startup and shared by all requests. The
+    vector store and the database session of a request are passed to the
+    nodes with the "configurable" section of the run configuration.
+
+    Args:
+        checkpointer (Optional[BaseCheckpointSaver]): Checkpointer keeping
+         the conversation of every session by the "thread_id" of the run
+         configuration, without it the whole conversation is sent by the
+         client
+
+    Returns:
+        CompiledGraph: Compiled graph
+    """
     graph_builder = StateGraph(State).add_sequence(
-        [("retrieve", partial_retrieve), ("generate", partial_generate)],
+        [("retrieve", retrieve), ("generate", generate)],
     )
     graph_builder.add_edge(START, "retrieve")
 
-    return graph_builder.compile(checkpointer=MemorySaver())
+    return graph_builder.compile(checkpointer=checkpointer)
@@ -0,0 +1,87 @@
+import logging
+from typing import List, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from scaledp_chat.indexer.tokens import count_tokens, truncate_tokens
+
+# Tokens of the role and separators added to every message
+MESSAGE_OVERHEAD = 4
+# Marker appended to truncated messages
+TRUNCATED = " ..."
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Approximate number of input tokens of the message."""
+    return count_tokens(message.text()) + MESSAGE_OVERHEAD
+
+
+def messages_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Approximate number of input tokens of the messages."""
+    return sum(message_tokens(message) for message in messages)
+
+
+def trim_history(history: Sequence[BaseMessage], budget: int) -> List[BaseMessage]:
+    """
+    Fit earlier turns of the conversation into a token budget.
+
+    The most recent messages are kept verbatim. The newest message which
+    doesn't fit is truncated to the remaining budget, and all older
+    messages are dropped.
+
+    Args:
+        history: Earlier messages of the conversation, the oldest first
+        budget: Maximum number of tokens of the kept messages
+
+    Returns:
+        List[BaseMessage]: Kept messages, the oldest first
+    """
+    kept: List[BaseMessage] = []
+    remaining = budget
+    for message in reversed(history):
+        tokens = message_tokens(message)
+        if tokens <= remaining:
+            kept.append(message)
+            remaining -= tokens
+            continue
+        text = truncate_tokens(
+            message.text(),
+            remaining - MESSAGE_OVERHEAD - count_tokens(TRUNCATED),
+        )
+        if text:
+            kept.append(message.model_copy(update={"content": text + TRUNCATED}))
+        break
+    return kept[::-1]
+
+
+def window_messages(
+    messages: Sequence[BaseMessage],
+    prompt: Sequence[BaseMessage],
+    budget: int,
+) -> List[BaseMessage]:
+    """
+    Build the generator input from the conversation and the RAG prompt.
+
+    The latest user turn and the prompt are always kept, earlier turns are
+    trimmed to the rest of the budget. Input tokens before and after the
+    trimming are logged.
+
+    Args:
+        messages: Conversation messages, the latest user turn last
+        prompt: Messages of the RAG prompt
+        budget: Maximum number of input tokens
+
+    Returns:
+        List[BaseMessage]: Kept earlier turns, the latest user turn and the
+        prompt
+    """
+    latest = [*messages[-1:], *prompt]
+    latest_tokens = messages_tokens(latest)
+    history = trim_history(messages[:-1], budget - latest_tokens)
+    logging.info(
+        "Generator input tokens: "
+        f"{messages_tokens(messages[:-1]) + latest_tokens} before trimming, "
+        f"{messages_tokens(history) + latest_tokens} after "
+        f"({len(messages) - 1 - len(history)} earlier messages dropped)",
+    )
+    return [*history, *latest]
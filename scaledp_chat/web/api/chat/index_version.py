@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.settings import settings
+
+
+class IndexVersion:
+    """
+    Version of the document index shared by the in-process caches.
+
+    The version is read from the database at most every `ttl` seconds, so
+    checking it usually costs no query. Caches compare it with the version
+    their entries were built for and drop them when it changes.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self.version is not None and time.monotonic() - self._checked_at < self.ttl
+        )
+
+    async def aget(self, db_session: AsyncSession) -> int:
+        """
+        Get version of the document index.
+
+        Args:
+            db_session (AsyncSession): SQLAlchemy async database session
+
+        Returns:
+            int: Index version
+        """
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    self.version = await IndexStateDAO(db_session).get_version()
+                    self._checked_at = time.monotonic()
+        return self.version  # type: ignore
+
+
+index_version = IndexVersion(ttl=settings.index_version_ttl)
@@ -1,6 +1,6 @@
 from typing import Any, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ClientAttachment(BaseModel):
@@ -33,3 +33,13 @@ class Request(BaseModel):
     """Represents a request containing a list of client messages."""
 
     messages: List[ClientMessage]
+    # ID of the chat session, the conversation of a session is kept on the
+    # server, so only the newest message has to be sent. The ID is the only
+    # credential of the session, clients should use a random UUID, e.g. from
+    # crypto.randomUUID().
+    session_id: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=128,
+        pattern=r"^[A-Za-z0-9_.:-]+$",
+    )
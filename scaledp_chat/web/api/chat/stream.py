@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import ujson
+from starlette.types import Receive
+
+from scaledp_chat.indexer.tokens import count_tokens
+from scaledp_chat.metrics import CallbackMetric, registry
+
+# Type codes of the Vercel AI data stream protocol parts
+TEXT = "0"
+DATA = "2"
+SOURCE = "h"
+
+
+class StreamPart(NamedTuple):
+    """Part of the Vercel AI data stream."""
+
+    code: str
+    value: Any
+
+
+def text_part(text: str) -> StreamPart:
+    """
+    Create a text part of the AI's message.
+
+    Args:
+        text (str): Part of the AI's message.
+
+    Returns:
+        StreamPart: Part with the '0' code, which indicates a text message.
+    """
+    return StreamPart(TEXT, text)
+
+
+def source_part(source: str) -> StreamPart:
+    """
+    Create a citation part of a source reference.
+
+    Args:
+        source (str): Path of the source file.
+
+    Returns:
+        StreamPart: Part with the 'h' code, which indicates a citation.
+    """
+    return StreamPart(
+        SOURCE,
+        {
+            "sourceType": "url",
+            "id": "",
+            "url": source,
+            "title": source,
+        },
+    )
+
+
+def data_part(data: Dict[str, Any]) -> StreamPart:
+    """
+    Create a custom data part.
+
+    Args:
+        data (Dict[str, Any]): JSON serializable data.
+
+    Returns:
+        StreamPart: Part with the '2' code, which carries an array of data.
+    """
+    return StreamPart(DATA, [data])
+
+
+def encode_part(part: StreamPart) -> str:
+    """
+    Encode a stream part as a line of the data stream.
+
+    Args:
+        part (StreamPart): Part to encode.
+
+    Returns:
+        str: Type code and JSON value of the part, terminated by a newline.
+    """
+    return f"{part.code}:{ujson.dumps(part.value, escape_forward_slashes=False)}\n"
+
+
+class StreamStats:
+    """
+    Counters of the chat streams.
+
+    Tokens saved by an aborted stream are estimated as the average number of
+    tokens of a completed answer minus the tokens streamed before the abort.
+    """
+
+    def __init__(self) -> None:
+        self.completed = 0
+        self.aborted = 0
+        self.completed_tokens = 0
+        self.saved_tokens = 0
+
+    def record_completed(self, tokens: int) -> None:
+        """Count a stream sent completely."""
+        self.completed += 1
+        self.completed_tokens += tokens
+
+    def record_aborted(self, tokens: int) -> None:
+        """Count a stream aborted by a disconnect of the client."""
+        self.aborted += 1
+        if self.completed:
+            average = self.completed_tokens // self.completed
+            self.saved_tokens += max(average - tokens, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters.
+
+        :return: completed and aborted streams and the saved tokens.
+        """
+        return {
+            "completed": self.completed,
+            "aborted": self.aborted,
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+stream_stats = StreamStats()
+
+registry.register(
+    CallbackMetric(
+        "chat_streams_total",
+        "Chat streams by the way they ended.",
+        lambda: {
+            ("completed",): stream_stats.completed,
+            ("aborted",): stream_stats.aborted,
+        },
+        kind="counter",
+        labelnames=["status"],
+    ),
+)
+registry.register(
+    CallbackMetric(
+        "chat_saved_tokens_total",
+        "Estimated LLM tokens saved by streams aborted by the client.",
+        lambda: {(): stream_stats.saved_tokens},
+        kind="counter",
+    ),
+)
+
+
+async def wait_for_disconnect(receive: Receive) -> None:
+    """
+    Wait until the client disconnects.
+
+    Args:
+        receive (Receive): ASGI receive channel of the request, its body
+            must be read already.
+    """
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class FrameBuffer:
+    """Encoded parts waiting to be sent, with consecutive text merged."""
+
+    def __init__(self) -> None:
+        self.frames: List[str] = []
+        self.text: List[str] = []
+        self.size = 0
+        # Tokens of the text encoded into frames, counted once per merged
+        # text part to keep tokenizing off the per-token path
+        self.tokens = 0
+
+    def add(self, part: StreamPart) -> None:
+        """Add a part, text is merged with the preceding text parts."""
+        if part.code == TEXT:
+            self.text.append(part.value)
+            self.size += len(part.value)
+            return
+        self._encode_text()
+        frame = encode_part(part)
+        self.frames.append(frame)
+        self.size += len(frame)
+
+    def flush(self) -> str:
+        """Take all buffered parts as one chunk of the stream."""
+        self._encode_text()
+        chunk = "".join(self.frames)
+        self.frames.clear()
+        self.size = 0
+        return chunk
+
+    def _encode_text(self) -> None:
+        if self.text:
+            text = "".join(self.text)
+            self.frames.append(encode_part(text_part(text)))
+            self.tokens += count_tokens(text)
+            self.text.clear()
+
+    def __bool__(self) -> bool:
+        return bool(self.frames or self.text)
+
+
+async def encode_stream(
+    parts: AsyncIterator[StreamPart],
+    coalesce: bool = True,
+    max_bytes: int = 1024,
+    max_delay: float = 0.016,
+    receive: Optional[Receive] = None,
+) -> AsyncGenerator[str, None]:
+    """
+    Encode stream parts into chunks of the data stream.
+
+    Every LLM token is a separate text part, so sending them one by one
+    costs a write to the socket per token. With coalescing the parts are
+    buffered, consecutive text parts are merged into one, and the buffer is
+    sent once it holds `max_bytes` or its first part waited for `max_delay`
+    seconds. The stream stays valid for the protocol, as merged text parts
+    are concatenated by the client anyway.
+
+    When the client disconnects, the pending step of `parts` is cancelled,
+    which cancels the graph run and the LLM call behind it, and the stream
+    ends without waiting for a failed write to notice the disconnect.
+    Completed and aborted streams are counted in `stream_stats`.
+
+    Args:
+        parts (AsyncIterator[StreamPart]): Parts of the stream.
+        coalesce (bool): Buffer the parts instead of sending each of them.
+        max_bytes (int): Size of the buffer which is sent immediately.
+        max_delay (float): Longest time a part is buffered, in seconds.
+        receive (Optional[Receive]): ASGI receive channel of the request,
+            listened to for the disconnect of the client.
+
+    Yields:
+        str: Encoded chunks of the stream.
+    """
+    if not coalesce:
+        # Every part fills the buffer
+        max_bytes = 0
+
+    loop = asyncio.get_running_loop()
+    buffer = FrameBuffer()
+    deadline = 0.0
+    disconnect = (
+        asyncio.ensure_future(wait_for_disconnect(receive)) if receive else None
+    )
+    next_part = asyncio.ensure_future(parts.__anext__())
+    try:
+        while True:
+            # Wait for the next part, the deadline of the buffer or the disconnect
+            waiting = {next_part, disconnect} if disconnect else {next_part}
+            done, _ = await asyncio.wait(
+                waiting,
+                timeout=max(deadline - loop.time(), 0) if buffer else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                next_part.cancel()
+                with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                    await next_part
+                logging.info(
+                    f"Client disconnected after {buffer.tokens} streamed tokens",
+                )
+                stream_stats.record_aborted(buffer.tokens)
+                return
+            if next_part not in done:
+                yield buffer.flush()
+                continue
+            try:
+                part = next_part.result()
+            except StopAsyncIteration:
+                break
+            if not buffer:
+                deadline = loop.time() + max_delay
+            buffer.add(part)
+            if buffer.size >= max_bytes or loop.time() >= deadline:
+                yield buffer.flush()
+            next_part = asyncio.ensure_future(parts.__anext__())
+        if buffer:
+            yield buffer.flush()
+        stream_stats.record_completed(buffer.tokens)
+    finally:
+        next_part.cancel()
+        if disconnect:
+            disconnect.cancel()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.web.api.chat.index_version import IndexVersion, index_version
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def looks_like_code(token: str, question: str, position: int) -> bool:
+    """
+    Check whether a token of the question is written as code.
+
+    Plain lowercase words like "image" or "read" are also names of
+    functions, so they are only matched when they are quoted with
+    backticks or called.
+    """
+    if any(char in token for char in "_.") or any(c.isupper() for c in token[1:]):
+        return True
+    before = question[position - 1 : position]
+    after = question[position + len(token) : position + len(token) + 1]
+    return before == "`" or after in {"`", "("}
+
+
+class SymbolTable:
+    """
+    Names of classes, functions and methods of the indexed repository.
+
+    The table is built from the python AST of the files stored in
+    document_file and is used to extract search terms from questions
+    locally, without a LLM round trip. It is rebuilt when the index version
+    changes, so definitions added or removed by the indexer are picked up
+    without a restart.
+    """
+
+    def __init__(self, index_version: IndexVersion) -> None:
+        self.names: Set[str] = set()
+        self.index_version = index_version
+        # Index version the names were built for, None until a non-empty
+        # index was loaded
+        self.version: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the table holds the names of an indexed repository."""
+        return self.version is not None
+
+    def build(self, sources: Iterable[Tuple[str, str]]) -> None:
+        """
+        Fill the table with symbols of python sources.
+
+        Args:
+            sources: Pairs of file path and file content
+        """
+        names: Set[str] = set()
+        for filepath, content in sources:
+            for symbol in extract_symbols(content, filepath):
+                names.add(symbol.name)
+                names.add(symbol.short_name)
+        self.names = names
+
+    async def aload(self, db_session: AsyncSession) -> None:
+        """
+        Build the table from document files unless it is built for the
+        current index version.
+
+        A table of an empty index is not marked as loaded, so it is built
+        again once the repository is indexed.
+
+        Args:
+            db_session (AsyncSession): SQLAlchemy async database session
+        """
+        version = await self.index_version.aget(db_session)
+        if version == self.version:
+            return
+        async with self._lock:
+            if version == self.version:
+                return
+            sources = await DocumentFileDAO(db_session).get_sources()
+            # Parsing the whole repository is CPU bound, keep it off the loop
+            await asyncio.to_thread(self.build, sources)
+            if self.names:
+                self.version = version
+            logging.info(
+                f"Symbol table built with {len(self.names)} names "
+                f"for index version {version}",
+            )
+
+    def extract(self, question: str) -> List[str]:
+        """
+        Extract names of known classes and functions from the question.
+
+        Args:
+            question (str): User question
+
+        Returns:
+            List[str]: Unique matched names in the order they appear
+        """
+        terms: List[str] = []
+        for match in IDENTIFIER_RE.finditer(question):
+            token = match.group()
+            candidates = [token, token.rsplit(".", 1)[-1]]
+            for candidate in candidates:
+                if candidate not in self.names:
+                    continue
+                if candidate not in terms and looks_like_code(
+                    token,
+                    question,
+                    match.start(),
+                ):
+                    terms.append(candidate)
+                break
+        return terms
+
+
+symbol_table = SymbolTable(index_version)
@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from scaledp_chat.indexer.tokens import count_tokens
+from scaledp_chat.metrics import Counter, Histogram, registry
+
+stage_seconds = registry.register(
+    Histogram(
+        "chat_stage_seconds",
+        "Duration of the stages of chat requests in seconds.",
+        labelnames=["stage"],
+    ),
+)
+llm_tokens = registry.register(
+    Counter(
+        "chat_llm_tokens_total",
+        "Approximate number of tokens of the generated answers.",
+    ),
+)
+llm_seconds = registry.register(
+    Counter(
+        "chat_llm_seconds_total",
+        "Time spent generating the answers in seconds.",
+    ),
+)
+
+
+class Timings:
+    """
+    Durations of the stages of a chat request.
+
+    Every measured stage is added to the durations of the request, sent to
+    the client as Server-Timing, and observed in the stage latency
+    histogram. A stage measured several times is summed up.
+    """
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Measure duration of the code in the block.
+
+        Args:
+            stage (str): Name of the stage, a token without spaces.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Record duration of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration of the stage in seconds.
+        """
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        stage_seconds.observe(seconds, stage=stage)
+
+    def mark(self, name: str) -> None:
+        """Remember the current time, to measure a stage ending elsewhere."""
+        self.marks[name] = time.perf_counter()
+
+    def record_since(self, stage: str, name: str) -> None:
+        """
+        Record duration of a stage started at the mark, if it was set.
+
+        Args:
+            stage (str): Name of the stage.
+            name (str): Name of the mark.
+        """
+        if name in self.marks:
+            self.record(stage, time.perf_counter() - self.marks[name])
+
+    def server_timing(self) -> str:
+        """
+        Format the durations as the value of the Server-Timing header.
+
+        Returns:
+            str: Stages with their durations in milliseconds.
+        """
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}"
+            for stage, seconds in self.durations.items()
+        )
+
+
+def observe_generation(timings: Timings, answer: str) -> None:
+    """
+    Count tokens of a generated answer and the time spent generating it.
+
+    Args:
+        timings (Timings): Stage timings of the request, with the "llm" stage.
+        answer (str): Generated answer.
+    """
+    seconds = timings.durations.get("llm")
+    if seconds:
+        llm_tokens.inc(count_tokens(answer))
+        llm_seconds.inc(seconds)
@@ -1,11 +1,44 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from langchain_postgres import PGEngine, PGVectorStore
-from langchain_together import TogetherEmbeddings
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.cache import LRUCache
+from scaledp_chat.db.models.document_index import (
+    METADATA_COLUMNS,
+    DocumentIndexModel,
+)
+from scaledp_chat.db.vector_index import get_distance_strategy, get_server_settings
 from scaledp_chat.settings import settings
+from scaledp_chat.web.api.chat.embeddings import (
+    BatchTogetherEmbeddings,
+    CachedEmbeddings,
+)
+
+# Vectors of embedded search queries, shared by the vector stores of the
+# worker and reported with the other in-process caches
+query_embedding_cache: LRUCache[Tuple[str, str], List[float]] = LRUCache(
+    maxsize=settings.embeddings_cache_size,
+    ttl=settings.embeddings_cache_ttl,
+)
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Creates embeddings model for search queries.
+
+    Returns:
+        CachedEmbeddings: TogetherAI embeddings model from settings wrapped
+        with the LRU/TTL cache of already embedded texts
+    """
+    return CachedEmbeddings(
+        BatchTogetherEmbeddings(
+            model=settings.togetherai_embeddings_model,
+            api_key=settings.togetherai_embeddings_api_key,
+        ),
+        model=settings.togetherai_embeddings_model,
+        cache=query_embedding_cache,
+    )
 
 
 def get_vector_store(pg_engine: Optional[AsyncEngine] = None) -> PGVectorStore:
@@ -14,18 +47,20 @@ def get_vector_store(pg_engine: Optional[AsyncEngine] = None) -> PGVectorStore:
 
     Returns:
         PGVectorStore: A Postgres vector store instance configured with:
-            - HuggingFace embeddings model from settings
+            - Cached TogetherAI embeddings model from settings
             - Database connection from settings
             - Document index table name from DocumentIndexModel
+            - Source and file_id metadata stored in their own columns
+            - Distance strategy matching the vector index
     """
 
-    embeddings = TogetherEmbeddings(
-        model=settings.togetherai_embeddings_model,
-        api_key=settings.togetherai_embeddings_api_key,
-    )
+    embeddings = get_embeddings()
 
     if pg_engine is None:
-        engine = PGEngine.from_connection_string(str(settings.db_url))
+        engine = PGEngine.from_connection_string(
+            str(settings.db_url),
+            connect_args={"server_settings": get_server_settings()},
+        )
     else:
         engine = PGEngine.from_engine(pg_engine)
 
@@ -33,6 +68,8 @@ def get_vector_store(pg_engine: Optional[AsyncEngine] = None) -> PGVectorStore:
         engine=engine,
         table_name=DocumentIndexModel.__tablename__,
         embedding_service=embeddings,
+        metadata_columns=METADATA_COLUMNS,
+        distance_strategy=get_distance_strategy(),
     )
 
 
@@ -46,18 +83,20 @@ async def aget_vector_store(pg_engine: Optional[AsyncEngine] = None) -> PGVector
 
     Returns:
         PGVectorStore: A Postgres vector store instance configured with:
-            - HuggingFace embeddings model from settings
+            - Cached TogetherAI embeddings model from settings
             - Database connection from settings or provided engine
             - Document index table name from DocumentIndexModel
+            - Source and file_id metadata stored in their own columns
+            - Distance strategy matching the vector index
     """
 
-    embeddings = TogetherEmbeddings(
-        model=settings.togetherai_embeddings_model,
-        api_key=settings.togetherai_embeddings_api_key,
-    )
+    embeddings = get_embeddings()
 
     if pg_engine is None:
-        engine = PGEngine.from_connection_string(str(settings.db_url))
+        engine = PGEngine.from_connection_string(
+            str(settings.db_url),
+            connect_args={"server_settings": get_server_settings()},
+        )
     else:
         engine = PGEngine.from_engine(pg_engine)
 
@@ -65,4 +104,6 @@ async def aget_vector_store(pg_engine: Optional[AsyncEngine] = None) -> PGVector
         engine=engine,
         table_name=DocumentIndexModel.__tablename__,
         embedding_service=embeddings,
+        metadata_columns=METADATA_COLUMNS,
+        distance_strategy=get_distance_strategy(),
     )
@@ -1,17 +1,32 @@
-import json
-from typing import AsyncGenerator
+import contextlib
+from typing import AsyncGenerator, Iterable, List, Optional, Set
 
 from fastapi import APIRouter, Depends
+from fastapi import Request as HTTPRequest
 from fastapi.responses import StreamingResponse
+from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_postgres import PGVectorStore
+from langgraph.graph.graph import CompiledGraph
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive
 
 from scaledp_chat.db.dependencies import get_db_session, get_vector_db_session
+from scaledp_chat.settings import settings
 
-from .graph import State, build_graph
+from .answer_cache import CachedAnswer, answer_cache
+from .dependencies import get_graph, get_session_graph
+from .graph import State, get_request_db_session, get_request_timings
 from .schema import Request
+from .stream import (
+    StreamPart,
+    data_part,
+    encode_stream,
+    source_part,
+    text_part,
+)
+from .timings import Timings, observe_generation
 from .utils import convert_to_langgraph_messages
 
 router = APIRouter()
@@ -20,98 +35,254 @@ router = APIRouter()
 @router.post("/")
 async def chat(
     request: Request,
+    http_request: HTTPRequest,
     session: AsyncSession = Depends(get_db_session),
     vector_store: PGVectorStore = Depends(get_vector_db_session),
+    graph: CompiledGraph = Depends(get_graph),
+    session_graph: CompiledGraph = Depends(get_session_graph),
 ) -> StreamingResponse:
     """
     Handle chat requests by streaming AI responses.
 
     Args:
         request (Request): The incoming chat request containing messages
-        and session information.
+        and session information. The session ID is trusted as is: anyone
+        who knows it can read and continue the conversation, so clients
+        must keep it secret and should make it unguessable.
+        http_request (HTTPRequest): The HTTP request, listened to for the
+        disconnect of the client.
 
     Returns:
         StreamingResponse: A streaming response containing the AI's generated messages.
 
     The function:
     1. Sets up configuration for the chat session
-    2. Converts incoming messages to the LangGraph format
-    3. Streams responses from the graph with a slight delay between messages
-    4. Returns a properly formatted event stream
+    2. Converts incoming messages to the LangGraph format, of a request with
+       a checkpointed session ID only the newest message is used, as the
+       conversation is restored from the session checkpoint
+    3. Replays the cached answer of a similar single-turn question if the
+       answer cache is enabled
+    4. Otherwise streams responses from the graph compiled at startup,
+       passing it the vector store and the database session of the request,
+       and caches the answer
+    5. Returns a properly formatted event stream, which cancels the graph
+       run as soon as the client disconnects, with the durations of the
+       request stages in the Server-Timing header and a trailing data event
     """
 
-    # Configure the chat session with user and thread identification
+    # Durations of the request stages, reported to the client and the metrics
+    timings = Timings()
+
+    # Pass the request scoped dependencies to the graph nodes
     config = RunnableConfig(
         configurable={
-            "thread_id": "{user_id}-{request.session_id}",
-            "user_id": "user_id",
+            "db_session": session,
+            "vector_store": vector_store,
+            "timings": timings,
         },
     )
 
     # Convert incoming messages to LangGraph format
     messages: list[BaseMessage] = convert_to_langgraph_messages(request.messages)
 
-    # Build the graph for processing messages with the given vector store and db session
-    graph = build_graph(vector_store, session)
-
-    async def stream_graph_events(
-        messages: list[BaseMessage],
-    ) -> AsyncGenerator[str, None]:
-        """
-        Generate a stream of events from the graph.
-
-        Args:
-            messages (list[BaseMessage]): List of messages to process.
-
-        Yields:
-            str: Formatted JSON strings containing the AI's responses.
-        """
-        # Stream both updates and messages from the graph processing
-        async for stream_mode, chunk in graph.astream(
-            {"messages": messages},
-            config=config,
-            stream_mode=["updates", "messages"],
-        ):
-            # Handle retrieval updates from the vector store
-            if stream_mode == "updates":
-                # Cast chunk to dictionary containing State objects
-                updates: dict[str, State] = chunk  # type: ignore
-
-                # Check if we have retrieval results with context
-                if "retrieve" in updates and "context" in updates["retrieve"]:
-                    # Extract metadata from retrieved documents
-                    context = [item.metadata for item in updates["retrieve"]["context"]]
-
-                    # Yield the first 10 context items as source references
-                    for item in context[0:10]:
-                        # Format each context item as a citation event
-                        # prefix 'h:' indicates a citation/reference
-                        yield "h:{text}\n".format(
-                            text=json.dumps(
-                                {
-                                    "sourceType": "url",
-                                    "id": "",
-                                    "url": item["source"],
-                                    "title": item["source"],
-                                },
-                            ),
-                        )
-            # Handle message updates from the AI
-            else:
-                # Unpack the message event and its metadata
-                event, metadata = chunk  # type: ignore
-
-                # Only yield messages tagged as coming from the generator
-                if "generator" in metadata.get("tags", []):  # type: ignore
-                    # Format the AI's message content as a text event
-                    # prefix '0:' indicates a text message
-                    yield "0:{text}\n".format(text=json.dumps(event.content))  # type: ignore
-
-    # Create and configure the streaming response
+    # The conversation of a session is kept by the checkpointer of the session
+    # graph, so any worker can continue it from the newest message. A session
+    # without a checkpoint yet starts with the history sent by the client.
+    if request.session_id is not None:
+        graph = session_graph
+        config["configurable"]["thread_id"] = request.session_id
+        state = await session_graph.aget_state(config)
+        if state.values:
+            messages = messages[-1:]
+
+    # Single-turn questions may be answered from the semantic answer cache
+    question = request.messages[-1].content if request.messages else ""
+    question_embedding: Optional[List[float]] = None
+    if (
+        settings.answer_cache_enabled
+        and request.session_id is None
+        and len(request.messages) == 1
+    ):
+        with timings.measure("cache"):
+            await answer_cache.acheck_version(session)
+            question_embedding = await vector_store.embeddings.aembed_query(question)
+            cached_answer = answer_cache.lookup(question_embedding)
+        if cached_answer is not None:
+            return make_response(replay_answer(cached_answer), timings=timings)
+
+    return make_response(
+        stream_graph_events(
+            graph,
+            messages,
+            config,
+            question=question,
+            question_embedding=question_embedding,
+        ),
+        receive=http_request.receive,
+        timings=timings,
+    )
+
+
+async def stream_graph_events(
+    graph: CompiledGraph,
+    messages: list[BaseMessage],
+    config: RunnableConfig,
+    question: str,
+    question_embedding: Optional[List[float]] = None,
+) -> AsyncGenerator[StreamPart, None]:
+    """
+    Generate a stream of events from the graph.
+
+    Args:
+        graph (CompiledGraph): Graph answering the question.
+        messages (list[BaseMessage]): List of messages to process.
+        config (RunnableConfig): Run configuration of the graph.
+        question (str): The latest question.
+        question_embedding (Optional[List[float]]): Embedding of the
+            question, the answer is stored in the answer cache when given.
+
+    Yields:
+        StreamPart: Citations of the retrieved sources and parts of the AI's
+        responses, followed by a data part with the Server-Timing value of
+        the request stages.
+    """
+    sources: List[str] = []
+    cited: Set[str] = set()
+    answer_parts: List[str] = []
+    timings = get_request_timings(config)
+    timings.mark("stream")
+
+    # Stream documents, updates and messages from the graph processing. The graph
+    # stream is closed together with these events, so a disconnect of the
+    # client stops the graph run and releases the database session at once.
+    stream = graph.astream(
+        {"messages": messages},
+        config=config,
+        stream_mode=["custom", "updates", "messages"],
+    )
+    async with contextlib.aclosing(stream):  # type: ignore[type-var]
+        try:
+            async for stream_mode, chunk in stream:
+                # Cite documents published by retrieval as they are found
+                if stream_mode == "custom":
+                    for part in new_citations(chunk["context"], cited):  # type: ignore
+                        yield part
+                # Handle retrieval updates from the vector store
+                elif stream_mode == "updates":
+                    # Cast chunk to dictionary containing State objects
+                    updates: dict[str, State] = chunk  # type: ignore
+
+                    # Check if we have retrieval results with context
+                    if "retrieve" in updates and "context" in updates["retrieve"]:
+                        context = updates["retrieve"]["context"]
+                        # Extract sources of the retrieved documents
+                        sources = [item.metadata["source"] for item in context]
+
+                        # Cite the first context items which weren't published
+                        for part in new_citations(context, cited):
+                            yield part
+                # Handle message updates from the AI
+                else:
+                    # Unpack the message event and its metadata
+                    event, metadata = chunk  # type: ignore
+
+                    # Only yield messages tagged as coming from the generator
+                    if "generator" in metadata.get("tags", []):  # type: ignore
+                        if not answer_parts:
+                            timings.record_since("llm_ttft", "llm")
+                        answer_parts.append(event.content)  # type: ignore
+                        yield text_part(event.content)  # type: ignore
+        finally:
+            await get_request_db_session(config).close()
+
+    answer = "".join(answer_parts)
+
+    # Cache the answer once it was streamed completely
+    if question_embedding is not None:
+        answer_cache.store(question, question_embedding, sources, answer)
+
+    # Report durations of the stages, they are known only at the end
+    timings.record_since("stream", "stream")
+    observe_generation(timings, answer)
+    yield data_part({"serverTiming": timings.server_timing()})
+
+
+def new_citations(
+    docs: Iterable[Document],
+    cited: Set[str],
+    limit: int = 10,
+) -> List[StreamPart]:
+    """
+    Cite sources of the documents which were not cited yet.
+
+    Args:
+        docs (Iterable[Document]): Retrieved documents in the order of
+            relevance.
+        cited (Set[str]): Sources cited already, updated with the new ones.
+        limit (int): Maximum number of citations of the answer.
+
+    Returns:
+        List[StreamPart]: Citations of the new sources.
+    """
+    parts = []
+    for doc in docs:
+        source = doc.metadata["source"]
+        if len(cited) >= limit:
+            break
+        if source not in cited:
+            cited.add(source)
+            parts.append(source_part(source))
+    return parts
+
+
+async def replay_answer(
+    cached_answer: CachedAnswer,
+) -> AsyncGenerator[StreamPart, None]:
+    """
+    Stream a cached answer with the same events as a generated one.
+
+    Args:
+        cached_answer (CachedAnswer): Answer found in the answer cache.
+
+    Yields:
+        StreamPart: Citations of the answer sources followed by the answer.
+    """
+    for source in cached_answer.sources[0:10]:
+        yield source_part(source)
+    yield text_part(cached_answer.answer)
+
+
+def make_response(
+    events: AsyncGenerator[StreamPart, None],
+    receive: Optional[Receive] = None,
+    timings: Optional[Timings] = None,
+) -> StreamingResponse:
+    """
+    Create a streaming response from chat events.
+
+    Args:
+        events (AsyncGenerator[StreamPart, None]): Chat events.
+        receive (Optional[Receive]): ASGI receive channel of the request, the
+            events are cancelled when the client disconnects.
+        timings (Optional[Timings]): Stage timings of the request, the stages
+            finished before streaming are sent in the Server-Timing header.
+
+    Returns:
+        StreamingResponse: Event stream compatible with Vercel AI SDK, with
+        consecutive text events coalesced unless it is disabled.
+    """
     response: StreamingResponse = StreamingResponse(
-        stream_graph_events(messages),
+        encode_stream(
+            events,
+            coalesce=settings.stream_coalesce,
+            max_bytes=settings.stream_coalesce_bytes,
+            max_delay=settings.stream_coalesce_delay,
+            receive=receive,
+        ),
         media_type="text/event-stream",
     )
     # Add Vercel AI compatibility header
     response.headers["x-vercel-ai-data-stream"] = "v1"
+    if timings is not None and timings.durations:
+        response.headers["Server-Timing"] = timings.server_timing()
     return response
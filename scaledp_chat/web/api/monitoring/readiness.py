@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from aio_pika.pool import Pool
+from langchain_postgres import PGVectorStore
+from sqlalchemy import QueuePool, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def saturation(in_use: int, capacity: Optional[int]) -> float:
+    """Share of the pool capacity in use, 0 for unbounded pools."""
+    return in_use / capacity if capacity else 0.0
+
+
+def engine_pool_state(engine: AsyncEngine) -> Dict[str, Any]:
+    """
+    Get state of the connection pool of a SQLAlchemy engine.
+
+    :param engine: async engine.
+    :return: pool size, checked out and overflow connections and the
+        saturation of the pool.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "saturation": 0.0}
+    checked_out = pool.checkedout()
+    # Overflow counts up from minus the pool size until the pool is full
+    max_overflow = max(pool._max_overflow, 0)  # noqa: SLF001
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": max_overflow,
+        "saturation": saturation(checked_out, pool.size() + max_overflow),
+    }
+
+
+def vector_store_engine(vector_store: PGVectorStore) -> AsyncEngine:
+    """Get SQLAlchemy engine of the PGEngine of the vector store."""
+    return vector_store._engine._pool  # noqa: SLF001
+
+
+def rabbit_pool_state(pool: "Pool[Any]") -> Dict[str, Any]:
+    """
+    Get state of an aio-pika pool.
+
+    The pool doesn't expose its counters, so they are read from its
+    private attributes. When a version of aio-pika doesn't have them, the
+    idle items are reported as unknown and the saturation as 0.
+
+    :param pool: aio-pika pool of connections or channels.
+    :return: created, idle and maximum items and the saturation of the pool.
+    """
+    created: int = getattr(pool, "_Pool__created", 0)
+    items = getattr(pool, "_Pool__items", None)
+    idle: Optional[int] = items.qsize() if items is not None else None
+    max_size: Optional[int] = getattr(pool, "_Pool__max_size", None)
+    return {
+        "closed": pool.is_closed,
+        "created": created,
+        "idle": idle,
+        "max_size": max_size,
+        "saturation": 0.0 if idle is None else saturation(created - idle, max_size),
+    }
+
+
+async def check_database(engine: AsyncEngine, timeout: float) -> Optional[str]:
+    """
+    Run `SELECT 1` within the timeout.
+
+    The time to get a connection from the pool counts, so the check fails
+    when the pool is exhausted.
+
+    :param engine: async engine.
+    :param timeout: timeout in seconds.
+    :return: error message or None if the query succeeded.
+    """
+
+    async def select_one() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(select_one(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return f"SELECT 1 timed out after {timeout}s"
+    except Exception as exc:
+        return f"SELECT 1 failed: {exc!r}"
+    return None
@@ -1,7 +1,52 @@
-from fastapi import APIRouter
+from typing import Any, Callable, Dict
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from scaledp_chat.cache import LRUCache
+from scaledp_chat.metrics import CallbackMetric, LabelValues, registry
+from scaledp_chat.settings import settings
+from scaledp_chat.web.api.chat.answer_cache import answer_cache
+from scaledp_chat.web.api.chat.file_cache import file_cache
+from scaledp_chat.web.api.chat.stream import stream_stats
+from scaledp_chat.web.api.chat.vector_store import query_embedding_cache
+from scaledp_chat.web.api.monitoring.readiness import (
+    check_database,
+    engine_pool_state,
+    rabbit_pool_state,
+    vector_store_engine,
+)
 
 router = APIRouter()
 
+CACHES: Dict[str, LRUCache[Any, Any]] = {
+    "query_embeddings": query_embedding_cache,
+    "document_files": file_cache.files,
+    "answers": answer_cache.answers,
+}
+
+
+def cache_stat(stat: str) -> Callable[[], Dict[LabelValues, float]]:
+    """Read a usage statistic of every cache, labelled by the cache name."""
+    return lambda: {(name,): cache.stats()[stat] for name, cache in CACHES.items()}
+
+
+for name, stat, kind in [
+    ("cache_hits_total", "hits", "counter"),
+    ("cache_misses_total", "misses", "counter"),
+    ("cache_entries", "entries", "gauge"),
+    ("cache_bytes", "bytes", "gauge"),
+]:
+    registry.register(
+        CallbackMetric(
+            name,
+            f"Cache {stat} of the in-process caches.",
+            cache_stat(stat),
+            kind=kind,
+            labelnames=["cache"],
+        ),
+    )
+
 
 @router.get("/health")
 def health_check() -> None:
@@ -10,3 +55,94 @@ def health_check() -> None:
 
     It returns 200 if the project is healthy.
     """
+
+
+@router.get("/ready")
+async def readiness_check(request: Request) -> JSONResponse:
+    """
+    Checks whether the worker can serve requests.
+
+    Reports the state of the database pool, the pool of the vector store,
+    the RabbitMQ pools when taskiq is enabled and the cache sizes, and runs
+    a time-bounded `SELECT 1`. Returns 503 when a dependency failed to
+    initialize, the query fails or a pool is saturated above
+    `ready_max_pool_saturation`, so traffic drains away from the worker.
+    """
+    state = request.app.state
+    failures = []
+    pools: Dict[str, Dict[str, Any]] = {}
+
+    db_engine = getattr(state, "db_engine", None)
+    if db_engine is None:
+        failures.append("database: not initialized")
+    else:
+        pools["database"] = engine_pool_state(db_engine)
+        error = await check_database(db_engine, timeout=settings.ready_db_timeout)
+        if error:
+            failures.append(f"database: {error}")
+
+    vector_store = getattr(state, "vector_store", None)
+    if vector_store is None:
+        failures.append("vector_store: not initialized")
+    else:
+        pools["vector_store"] = engine_pool_state(vector_store_engine(vector_store))
+
+    if settings.with_taskiq:
+        for name in ("rmq_pool", "rmq_channel_pool"):
+            pool = getattr(state, name, None)
+            if pool is None:
+                failures.append(f"{name}: not initialized")
+                continue
+            pools[name] = rabbit_pool_state(pool)
+            if pools[name]["closed"]:
+                failures.append(f"{name}: closed")
+
+    failures.extend(
+        f"{name}: saturation {pool['saturation']:.2f}"
+        for name, pool in pools.items()
+        if pool["saturation"] > settings.ready_max_pool_saturation
+    )
+
+    return JSONResponse(
+        {
+            "ready": not failures,
+            "failures": failures,
+            "pools": pools,
+            "caches": {name: cache.stats() for name, cache in CACHES.items()},
+        },
+        status_code=(
+            status.HTTP_503_SERVICE_UNAVAILABLE if failures else status.HTTP_200_OK
+        ),
+    )
+
+
+@router.get("/cache")
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Returns usage statistics of the in-process caches.
+
+    Hits, misses, number of entries and their total size in bytes.
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+@router.get("/streams")
+def chat_stream_stats() -> Dict[str, int]:
+    """
+    Returns statistics of the chat streams.
+
+    Completed streams, streams aborted by a disconnect of the client and the
+    estimated LLM tokens the aborts saved.
+    """
+    return stream_stats.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    """
+    Returns metrics in the Prometheus text format.
+
+    Latency of the chat stages, generated tokens, chat streams and cache
+    statistics of this worker.
+    """
+    return registry.render()
@@ -4,6 +4,15 @@ from typing import AsyncGenerator
 from fastapi import FastAPI
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
+from scaledp_chat.db.vector_index import get_server_settings
+from scaledp_chat.services.checkpointer.lifespan import (
+    init_checkpointer,
+    shutdown_checkpointer,
+)
+from scaledp_chat.services.loop_monitor.lifespan import (
+    init_loop_monitor,
+    shutdown_loop_monitor,
+)
 from scaledp_chat.services.rabbit.lifespan import init_rabbit, shutdown_rabbit
 from scaledp_chat.settings import settings
 from scaledp_chat.tkq import broker
@@ -19,7 +28,11 @@ def _setup_db(app: FastAPI) -> None:  # pragma: no cover
 
     :param app: fastAPI application.
     """
-    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    engine = create_async_engine(
+        str(settings.db_url),
+        echo=settings.db_echo,
+        connect_args={"server_settings": get_server_settings()},
+    )
     session_factory = async_sessionmaker(
         engine,
         expire_on_commit=False,
@@ -28,10 +41,18 @@ def _setup_db(app: FastAPI) -> None:  # pragma: no cover
     app.state.db_session_factory = session_factory
 
 
-def _setup_vector_store(app: FastAPI) -> None:
-    from scaledp_chat.web.api.chat.vector_store import get_vector_store
+async def _setup_vector_store(app: FastAPI) -> None:
+    from scaledp_chat.web.api.chat.vector_store import aget_vector_store
+
+    app.state.vector_store = await aget_vector_store()
+
+
+def _setup_graph(app: FastAPI) -> None:
+    from scaledp_chat.web.api.chat.graph import build_graph
 
-    app.state.vector_store = get_vector_store()
+    app.state.graph = build_graph()
+    # Graph of the chat sessions, keeping the conversation in the database
+    app.state.session_graph = build_graph(checkpointer=app.state.checkpointer)
 
 
 @asynccontextmanager
@@ -49,17 +70,24 @@ async def lifespan_setup(
     """
 
     app.middleware_stack = None
+    if settings.loop_monitor_enabled:
+        await init_loop_monitor(app)
     if settings.with_taskiq and not broker.is_worker_process:
         await broker.startup()
     _setup_db(app)
-    _setup_vector_store(app)
+    await _setup_vector_store(app)
+    init_checkpointer(app)
+    _setup_graph(app)
     if settings.with_taskiq:
         init_rabbit(app)
     app.middleware_stack = app.build_middleware_stack()
 
     yield
+    if settings.loop_monitor_enabled:
+        await shutdown_loop_monitor(app)
     if not broker.is_worker_process:
         await broker.shutdown()
+    await shutdown_checkpointer(app)
     await app.state.db_engine.dispose()
 
     await shutdown_rabbit(app)
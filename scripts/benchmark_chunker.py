@@ -0,0 +1,112 @@
+import argparse
+import logging
+import time
+from pathlib import Path
+from statistics import mean
+from typing import Union
+
+from langchain_core.documents import Document
+from langchain_text_splitters import (
+    Language,
+    RecursiveCharacterTextSplitter,
+    TextSplitter,
+)
+
+from scaledp_chat.indexer.chunker import DEFAULT_MAX_TOKENS, PythonChunker
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.indexer.tokens import count_tokens
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+
+
+def load_files(repo_path: Path) -> list[Document]:
+    """Read python files of the repository with their relative path."""
+    return [
+        Document(
+            page_content=path.read_text(encoding="utf-8"),
+            metadata={
+                "source": str(path.relative_to(repo_path)),
+                "file_path": str(path.relative_to(repo_path)),
+            },
+        )
+        for path in sorted(repo_path.rglob("*.py"))
+        if ".git" not in path.parts
+    ]
+
+
+def chunk_span(chunk: Document, content: str) -> tuple[int, int]:
+    """1-based line span of a chunk in the content of its file."""
+    if "start_line" in chunk.metadata:
+        return chunk.metadata["start_line"], chunk.metadata["end_line"]
+    start = content.count("\n", 0, chunk.metadata["start_index"]) + 1
+    return start, start + chunk.page_content.count("\n")
+
+
+def report(
+    name: str,
+    files: list[Document],
+    splitter: Union[TextSplitter, PythonChunker],
+) -> None:
+    """Log chunk counts, token sizes, time and whole definitions of a splitter."""
+    started = time.monotonic()
+    chunks = splitter.split_documents(files)
+    elapsed = time.monotonic() - started
+
+    # Definitions retrievable as a whole, without combining chunks
+    contents = {file.metadata["source"]: file.page_content for file in files}
+    spans: dict[str, list[tuple[int, int]]] = {}
+    for chunk in chunks:
+        source = chunk.metadata["source"]
+        spans.setdefault(source, []).append(chunk_span(chunk, contents[source]))
+    symbols = whole = 0
+    for source, content in contents.items():
+        for symbol in extract_symbols(content, source):
+            symbols += 1
+            whole += any(
+                start <= symbol.start_line and end >= symbol.end_line
+                for start, end in spans.get(source, [])
+            )
+
+    tokens = [count_tokens(chunk.page_content) for chunk in chunks] or [0]
+    logging.info(
+        f"{name}: {len(chunks)} chunks in {elapsed:.2f}s, "
+        f"tokens per chunk mean {mean(tokens):.0f} max {max(tokens)}, "
+        f"{whole}/{symbols} definitions in a single chunk",
+    )
+
+
+def main(repo_path: Path, max_tokens: int) -> None:
+    """Compare the character splitter with the AST chunker on the repository."""
+    files = load_files(repo_path)
+    logging.info(f"Chunking {len(files)} files of {repo_path}")
+    report(
+        "RecursiveCharacterTextSplitter(chunk_size=50)",
+        files,
+        RecursiveCharacterTextSplitter.from_language(
+            language=Language.PYTHON,
+            chunk_size=50,
+            chunk_overlap=10,
+            add_start_index=True,
+        ),
+    )
+    report(f"PythonChunker(max_tokens={max_tokens})", files, PythonChunker(max_tokens))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare chunks of the AST chunker and the character splitter.",
+    )
+    parser.add_argument(
+        "repo_path",
+        nargs="?",
+        type=Path,
+        default=Path(__file__).parent.parent / "repos" / "scaledp",
+        help="repository to chunk (default: the indexed ScaleDP clone)",
+    )
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    args = parser.parse_args()
+    main(args.repo_path, args.max_tokens)
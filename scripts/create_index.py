@@ -1,21 +1,31 @@
+import argparse
 import logging
 import os
-from langchain_community.document_loaders import GitLoader
+from functools import partial
 
 
 from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
-from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.db.dao.document_index_dao import DocumentIndexDAO
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.db.vector_index import drop_vector_indexes, ensure_vector_index
+from scaledp_chat.indexer.changes import (
+    changed_paths,
+    diff_hashes,
+    file_hashes,
+    load_files,
+    open_repo,
+)
+from scaledp_chat.indexer.chunker import DEFAULT_MAX_TOKENS, PythonChunker
+from scaledp_chat.indexer.embedding_cache import CachedEmbedder
+from scaledp_chat.indexer.pipeline import IndexingPipeline, ProcessPoolEmbedder
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.indexer.writer import bulk_writer
 from scaledp_chat.settings import settings
+from langchain_core.documents import Document
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_postgres import PGEngine, PGVectorStore
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 import asyncio
 
-from langchain_text_splitters import (
-    Language,
-    RecursiveCharacterTextSplitter,
-)
-
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -23,98 +33,214 @@ logging.basicConfig(
 )
 
 
-async def main():
+# Incremental runs with fewer changed files keep the vector index
+DROP_INDEX_MIN_FILES = 1000
+
+
+def is_python(file_path: str) -> bool:
+    return file_path.endswith(".py")
 
-    logging.info(f"Clone git repo: {settings.repo_url}")
+
+async def main(
+    full: bool = False,
+    workers: int = 1,
+    batch_size: int = 64,
+    drop_index: bool = False,
+    chunk_tokens: int = DEFAULT_MAX_TOKENS,
+    drop_index_min_files: int = DROP_INDEX_MIN_FILES,
+):
+
+    logging.info(f"Update git repo: {settings.repo_url}")
     absolute_path = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "repos", "scaledp")
     )
-    loader = GitLoader(
-        repo_path=absolute_path,
-        clone_url=settings.repo_url,
-        file_filter=lambda file_path: file_path.endswith(".py"),
-        branch="master",
-    )
-    data = loader.load()
-
-    logging.info(len(data))
-
-    contents = []
-    metadatas = []
+    repo = open_repo(absolute_path, settings.repo_url, branch="master")
+    head = repo.head.commit.hexsha
 
     engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
     async_session = async_sessionmaker(engine, expire_on_commit=False)
 
-    async with async_session() as session:
-        try:
-            dao = DocumentFileDAO(session)
-
-            logging.info(f"Processing {len(data)} files")
-            for index, file_data in enumerate(data):
-                try:
-                    logging.info(f"Processing file {index + 1}/{len(data)}")
-                    logging.info(f"File metadata: {file_data.metadata}")
-                    file_id = await dao.create(
-                        content=file_data.page_content,
-                        filepath=file_data.metadata["file_path"],
-                        file_type=file_data.metadata["file_type"],
-                        file_metadata=file_data.metadata,
+    try:
+        async with async_session() as session:
+            try:
+                dao = DocumentFileDAO(session)
+                state_dao = IndexStateDAO(session)
+
+                indexed_commit = None if full else await state_dao.get_commit()
+                if indexed_commit == head:
+                    logging.info(f"Index is up to date with commit {head}")
+                    return
+
+                # Only files touched since the indexed commit are hashed, all of
+                # them when the indexed commit is unknown
+                paths = changed_paths(repo, indexed_commit, is_python)
+                indexed = await dao.get_hashes()
+                if full:
+                    indexed = dict.fromkeys(indexed, "")
+                changes = diff_hashes(
+                    indexed, file_hashes(repo, is_python, paths), paths
+                )
+                logging.info(
+                    f"Indexing {indexed_commit or 'nothing'}..{head}: "
+                    f"{len(changes.changed)} changed, {len(changes.removed)} removed files"
+                )
+
+                # Rebuilding the index costs as much as loading every chunk,
+                # so small incremental runs keep it
+                many_changes = len(changes.changed) >= drop_index_min_files
+                if drop_index and changes and (full or many_changes):
+                    # Rows are loaded faster without the vector index, which is
+                    # built once at the end. It is dropped in its own transaction,
+                    # before the session locks any chunks.
+                    async with engine.begin() as conn:
+                        dropped = await drop_vector_indexes(conn)
+                    logging.info(f"Dropped vector indexes: {dropped}")
+                elif drop_index and changes:
+                    logging.info(
+                        f"Keeping vector indexes for {len(changes.changed)} "
+                        f"changed files, below {drop_index_min_files}",
                     )
 
-                    if not file_id:
-                        logging.error(
-                            f"Failed to create file record: {file_data.metadata['file_path']}"
+                # Rows of changed and removed files are deleted in the same
+                # transaction the new files are stored in, so an interrupted run
+                # leaves the previous index in place
+                deleted = await DocumentIndexDAO(session).delete_sources(changes.stale)
+                deleted_files = await dao.delete_paths(changes.stale)
+                logging.info(f"Deleted {deleted_files} files and {deleted} chunks")
+
+                # Definitions are chunked whole, so they are retrieved and
+                # expanded as a unit
+                python_chunker = PythonChunker(max_tokens=chunk_tokens)
+
+                with ProcessPoolEmbedder(
+                    partial(
+                        HuggingFaceEmbeddings, model_name=settings.embeddings_model
+                    ),
+                    workers=workers,
+                ) as embeddings:
+                    # Chunks embedded by previous runs are taken from the cache
+                    cached_embeddings = CachedEmbedder(
+                        async_session,
+                        embeddings.aembed_documents,
+                        model=settings.embeddings_model,
+                    )
+                    async with bulk_writer(session) as writer:
+
+                        async def prepare(file_data: Document) -> Document:
+                            file_id = await writer.add_file(
+                                content=file_data.page_content,
+                                filepath=file_data.metadata["file_path"],
+                                file_type=file_data.metadata["file_type"],
+                                file_metadata=file_data.metadata,
+                                symbols=extract_symbols(
+                                    file_data.page_content,
+                                    file_data.metadata["file_path"],
+                                ),
+                            )
+                            # Create a copy to avoid modifying the original
+                            metadata = file_data.metadata.copy()
+                            metadata["file_id"] = file_id
+                            return Document(
+                                page_content=file_data.page_content, metadata=metadata
+                            )
+
+                        pipeline = IndexingPipeline(
+                            prepare=prepare,
+                            split=lambda document: python_chunker.split_documents(
+                                [document]
+                            ),
+                            embed=cached_embeddings.aembed_documents,
+                            write=writer.add_chunks,
+                            batch_size=batch_size,
+                            workers=workers,
+                        )
+                        await pipeline.run(
+                            load_files(repo, is_python, set(changes.changed))
                         )
-                        continue
-
-                    logging.info(f"Created file record with ID: {file_id}")
-
-                    metadata = (
-                        file_data.metadata.copy()
-                    )  # Create a copy to avoid modifying the original
-                    metadata["file_id"] = file_id
-                    contents.append(file_data.page_content)
-                    metadatas.append(metadata)
 
-                except Exception as e:
-                    logging.error(
-                        f"Error processing file {file_data.metadata.get('file_path')}: {str(e)}"
+                cache_stats = cached_embeddings.stats
+                logging.info(
+                    f"Embedded {cache_stats.misses} of {cache_stats.texts} chunks: "
+                    f"{cache_stats.hits} cached, {cache_stats.duplicates} duplicates"
+                )
+                for table, stats in writer.stats.items():
+                    logging.info(
+                        f"Copied {stats.rows} rows into {table} in {stats.seconds:.1f}s "
+                        f"({stats.rate:.0f} rows/s)"
                     )
-                    continue
 
-            # Commit the transaction
-            await session.commit()
+                await state_dao.set_commit(head)
+                if changes:
+                    # Invalidate cached files of the running application
+                    version = await state_dao.bump_version()
+                    logging.info(f"Index version: {version}")
 
-            logging.info(f"Successfully processed {len(contents)} files")
-            logging.info(f"Contents length: {len(contents)}")
-            logging.info(f"Metadatas length: {len(metadatas)}")
+                # Commit the transaction
+                await session.commit()
 
-        except Exception as e:
-            logging.error(f"Database transaction failed: {str(e)}")
-            await session.rollback()
-            raise
-
-    python_splitter = RecursiveCharacterTextSplitter.from_language(
-        language=Language.PYTHON, chunk_size=50, chunk_overlap=10, add_start_index=True
-    )
-
-    python_docs = python_splitter.create_documents(contents, metadatas=metadatas)
-
-    logging.info(f"Number of the chunks:{len(python_docs)}")
-
-    embeddings = HuggingFaceEmbeddings(model_name=settings.embeddings_model)
-
-    engine = PGEngine.from_engine(engine)
-
-    vector_store = await PGVectorStore.create(
-        engine=engine,
-        table_name=DocumentIndexModel.__tablename__,
-        embedding_service=embeddings,
-    )
-
-    ids = await vector_store.aadd_documents(documents=python_docs)
-    logging.info(f"Number of the chunks:{len(ids)}")
+            except Exception as e:
+                logging.error(f"Database transaction failed: {str(e)}")
+                await session.rollback()
+                raise
+    finally:
+        try:
+            # Builds the vector index if it is missing, also after a failed run
+            async with engine.begin() as conn:
+                if await ensure_vector_index(conn):
+                    logging.info("Rebuilt vector index")
+        finally:
+            await engine.dispose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(
+        description="Index python files of the repository."
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="re-index all files instead of the files changed since the last run",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of processes embedding chunks (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="number of chunks embedded and written at once (default: 64)",
+    )
+    parser.add_argument(
+        "--drop-index",
+        action="store_true",
+        help="drop the vector index before loading the chunks and build it "
+        "afterwards, faster for full rebuilds",
+    )
+    parser.add_argument(
+        "--drop-index-min-files",
+        type=int,
+        default=DROP_INDEX_MIN_FILES,
+        help="number of changed files from which incremental runs drop the "
+        f"vector index, full runs always do (default: {DROP_INDEX_MIN_FILES})",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_MAX_TOKENS,
+        help="maximum number of tokens of a chunk, longer definitions are "
+        f"split between statements (default: {DEFAULT_MAX_TOKENS})",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            full=args.full,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            drop_index=args.drop_index,
+            chunk_tokens=args.chunk_tokens,
+            drop_index_min_files=args.drop_index_min_files,
+        )
+    )
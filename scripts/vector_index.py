@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from scaledp_chat.db.vector_index import check_vector_index, ensure_vector_index
+from scaledp_chat.settings import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+
+
+async def main(command: str) -> int:
+    """Rebuild the vector index if asked, check it and return the exit code."""
+    engine = create_async_engine(str(settings.db_url), echo=settings.db_echo)
+    try:
+        async with engine.begin() as conn:
+            if command == "rebuild":
+                logging.info(
+                    f"Rebuilding {settings.vector_index_type.value} index "
+                    f"for {settings.vector_distance.value} distance",
+                )
+                await ensure_vector_index(conn, rebuild=True)
+
+            check = await check_vector_index(conn)
+    finally:
+        await engine.dispose()
+
+    for definition in check.definitions:
+        logging.info(f"Index: {definition}")
+    logging.info(f"Query plan:\n{check.plan}")
+    if not check.matches_strategy:
+        logging.error(
+            f"No index matches {settings.vector_distance.value} distance, "
+            "run with `rebuild`",
+        )
+        return 1
+    if not check.used_by_search:
+        logging.error("Similarity search does not use the vector index")
+        return 1
+    logging.info("Similarity search uses the vector index")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check or rebuild the vector index of the document index.",
+    )
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.command)))
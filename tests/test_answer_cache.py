@@ -0,0 +1,73 @@
+from typing import List
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.web.api.chat.answer_cache import AnswerCache
+from scaledp_chat.web.api.chat.index_version import IndexVersion
+from scaledp_chat.web.api.chat.stream import encode_part
+from scaledp_chat.web.api.chat.views import replay_answer
+
+
+def make_cache(ttl: float = 60) -> AnswerCache:
+    """Create answer cache checking the index version on every request."""
+    return AnswerCache(
+        maxsize=2,
+        ttl=ttl,
+        threshold=0.9,
+        index_version=IndexVersion(ttl=0),
+    )
+
+
+def test_lookup_similar_question() -> None:
+    """Answers are reused for questions with similar embeddings only."""
+    cache = make_cache()
+    cache.store("How to create a session?", [1.0, 0.0], ["session.py"], "Use it.")
+    cache.store("How to show an image?", [0.0, 1.0], ["image.py"], "Show it.")
+
+    cached = cache.lookup([2.0, 0.1])
+    assert cached is not None
+    assert cached.question == "How to create a session?"
+    assert cache.lookup([1.0, 1.0]) is None
+    assert cache.answers.stats()["hits"] == 1
+    assert cache.answers.stats()["misses"] == 1
+
+
+def test_lookup_expired() -> None:
+    """Expired answers are not reused."""
+    cache = make_cache(ttl=0)
+    cache.store("How to create a session?", [1.0, 0.0], ["session.py"], "Use it.")
+
+    assert cache.lookup([1.0, 0.0]) is None
+
+
+@pytest.mark.anyio
+async def test_index_version_invalidation(dbsession: AsyncSession) -> None:
+    """Cached answers are dropped when the index is rebuilt."""
+    cache = make_cache()
+    await cache.acheck_version(dbsession)
+    cache.store("How to create a session?", [1.0, 0.0], ["session.py"], "Use it.")
+
+    await cache.acheck_version(dbsession)
+    assert cache.lookup([1.0, 0.0]) is not None
+
+    await IndexStateDAO(dbsession).bump_version()
+    await cache.acheck_version(dbsession)
+    assert cache.lookup([1.0, 0.0]) is None
+
+
+@pytest.mark.anyio
+async def test_replay_answer() -> None:
+    """Cached answers are streamed with citation and text events."""
+    cache = make_cache()
+    cache.store("How to create a session?", [1.0, 0.0], ["session.py"], "Use it.")
+    cached = cache.lookup([1.0, 0.0])
+    assert cached is not None
+
+    events: List[str] = [encode_part(event) async for event in replay_answer(cached)]
+
+    assert events == [
+        'h:{"sourceType":"url","id":"","url":"session.py","title":"session.py"}\n',
+        '0:"Use it."\n',
+    ]
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.db.dao.document_index_dao import DocumentIndexDAO
+from scaledp_chat.db.dao.symbol_index_dao import SymbolIndexDAO
+from scaledp_chat.indexer.changes import content_hash
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.indexer.tokens import line_token_offsets
+from scaledp_chat.indexer.writer import bulk_writer
+from scaledp_chat.settings import settings
+
+SOURCE = """
+class Reader:
+    def read(self, path):
+        return path
+"""
+
+
+@pytest.mark.anyio
+async def test_bulk_writer(dbsession: AsyncSession) -> None:
+    """Files, symbols and chunks are copied in the session transaction."""
+    rng = np.random.default_rng(42)
+    vectors = rng.random((3, settings.embeddings_vector_size))
+
+    async with bulk_writer(dbsession, file_batch_size=2) as writer:
+        file_ids = [
+            await writer.add_file(
+                content=SOURCE,
+                filepath=f"scaledp/reader_{index}.py",
+                file_type=".py",
+                file_metadata={"file_name": f"reader_{index}.py"},
+                symbols=extract_symbols(SOURCE, f"scaledp/reader_{index}.py"),
+            )
+            for index in range(3)
+        ]
+        # The first two files are copied once the batch is full
+        assert writer.stats["document_file"].rows == 2
+        await writer.add_chunks(
+            [
+                Document(
+                    page_content=f"chunk {index}",
+                    metadata={
+                        "source": f"scaledp/reader_{index}.py",
+                        "file_id": file_ids[index],
+                        "start_index": index,
+                    },
+                )
+                for index in range(3)
+            ],
+            vectors.tolist(),
+        )
+
+    assert {table: stats.rows for table, stats in writer.stats.items()} == {
+        "document_file": 3,
+        "symbol_index": 6,
+        "document_index": 3,
+    }
+
+    files = await DocumentFileDAO(dbsession).get_many(file_ids)
+    assert [file.filepath for file in files] == [
+        f"scaledp/reader_{index}.py" for index in range(3)
+    ]
+    assert files[0].file_metadata == {"file_name": "reader_0.py"}
+    assert files[0].token_offsets == line_token_offsets(SOURCE)
+    assert files[0].content_hash == content_hash(SOURCE)
+
+    symbols = await SymbolIndexDAO(dbsession).get_symbols(file_ids)
+    assert [symbol.name for symbol in symbols[file_ids[2]]] == [
+        "scaledp.reader_2.Reader",
+        "scaledp.reader_2.Reader.read",
+    ]
+
+    # Embeddings are stored exactly and vectors still work as text parameters
+    [docs] = await DocumentIndexDAO(dbsession).similarity_search_batch(
+        [vectors[1].tolist()],
+        k=1,
+    )
+    assert docs[0].page_content == "chunk 1"
+    assert docs[0].metadata == {
+        "source": "scaledp/reader_1.py",
+        "file_id": file_ids[1],
+        "start_index": 1,
+    }
@@ -0,0 +1,81 @@
+import time
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from scaledp_chat.cache import LRUCache
+from scaledp_chat.web.api.chat.embeddings import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Fake embeddings model which records the texts it was called with."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts as their lengths."""
+        self.calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed text as its length."""
+        return self.embed_documents([text])[0]
+
+
+def test_lru_eviction() -> None:
+    """The least recently used entry is evicted first."""
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_expiration() -> None:
+    """Entries expire after their time to live."""
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_size_eviction() -> None:
+    """Entries are evicted once their total size exceeds the limit."""
+    cache: LRUCache[str, str] = LRUCache(maxbytes=10, sizeof=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("a", "aaa")
+    cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "entries": 2, "bytes": 7}
+
+    cache.set("d", "d" * 11)
+    assert cache.get("d") is None
+    assert cache.size == 7
+
+
+@pytest.mark.anyio
+async def test_cached_embeddings() -> None:
+    """Only texts missing from the cache are sent to the embeddings model."""
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, model="fake", cache=LRUCache(maxsize=10))
+
+    assert await embeddings.aembed_documents(["a", "bb", "a"]) == [
+        [1.0],
+        [2.0],
+        [1.0],
+    ]
+    assert await embeddings.aembed_documents(["bb", "ccc"]) == [[2.0], [3.0]]
+    assert await embeddings.aembed_query("ccc") == [3.0]
+
+    assert model.calls == [["a", "bb"], ["ccc"]]
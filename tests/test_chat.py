@@ -1,15 +1,19 @@
-from typing import AsyncGenerator
-from unittest.mock import MagicMock, Mock
+from typing import Any, AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
+from langchain_core.documents import Document
 from langchain_core.messages import AIMessage
 from langchain_postgres import PGVectorStore
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from scaledp_chat.web.api.chat.dependencies import get_graph, get_session_graph
 from scaledp_chat.web.api.chat.schema import ClientMessage, Request
+from scaledp_chat.web.api.chat.stream import source_part
+from scaledp_chat.web.api.chat.views import stream_graph_events
 
 
 @pytest.fixture
@@ -35,21 +39,20 @@ def mock_graph_response() -> AsyncGenerator[str, None]:
 
 
 @pytest.fixture
-def mock_build_graph(
-    monkeypatch: pytest.MonkeyPatch,
+def mock_graph(
+    fastapi_app_with_vector_store: FastAPI,
     mock_graph_response: AsyncGenerator[str, None],
 ) -> Mock:
-    """Mock the build_graph function."""
+    """Replace the graphs compiled at startup with a mock."""
     mock_graph = Mock()
     mock_graph.astream.return_value = mock_graph_response
+    # Sessions are new unless a test gives them a checkpointed state
+    mock_graph.aget_state = AsyncMock(return_value=Mock(values={}))
 
-    def mock_build(vector_store: PGVectorStore, session: AsyncSession) -> Mock:
-        return mock_graph
-
-    monkeypatch.setattr(
-        "scaledp_chat.web.api.chat.views.build_graph",
-        mock_build,
-    )
+    for dependency in (get_graph, get_session_graph):
+        fastapi_app_with_vector_store.dependency_overrides[dependency] = (
+            lambda: mock_graph
+        )
     return mock_graph
 
 
@@ -58,7 +61,7 @@ async def test_chat(
     client_with_vector_store: AsyncClient,
     dbsession: AsyncSession,
     vector_store: PGVectorStore,
-    mock_build_graph: Mock,
+    mock_graph: Mock,
 ) -> None:
     """Test the chat endpoint."""
     url = fastapi_app.url_path_for("chat")
@@ -92,10 +95,46 @@ async def test_chat(
 
     assert "Hello! How can I help you today?" in response_text
 
+    # The request scoped dependencies are passed to the graph nodes
+    configurable = mock_graph.astream.call_args.kwargs["config"]["configurable"]
+    assert configurable["db_session"] is dbsession
+    assert configurable["vector_store"] is vector_store
+    assert configurable["thread_id"] == "test-session"
+
+
+async def test_chat_session_sends_newest_message(
+    fastapi_app: FastAPI,
+    client_with_vector_store: AsyncClient,
+    mock_graph: Mock,
+) -> None:
+    """Only the newest message of a checkpointed session is passed to the graph."""
+    url = fastapi_app.url_path_for("chat")
+    mock_graph.aget_state.return_value = Mock(values={"messages": ["checkpointed"]})
+
+    request_data = Request(
+        session_id="test-session",
+        messages=[
+            ClientMessage(role="user", content="First question"),
+            ClientMessage(role="assistant", content="First answer"),
+            ClientMessage(role="user", content="Second question"),
+        ],
+    )
+    response = await client_with_vector_store.post(
+        url,
+        json=request_data.model_dump(),
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    messages = mock_graph.astream.call_args.args[0]["messages"]
+    assert [message.content[0]["text"] for message in messages] == [
+        "Second question",
+    ]
+
 
 async def test_chat_invalid_request(
     fastapi_app: FastAPI,
     client_with_vector_store: AsyncClient,
+    mock_graph: Mock,
 ) -> None:
     """Test the chat endpoint with invalid request data."""
     url = fastapi_app.url_path_for("chat")
@@ -107,3 +146,87 @@ async def test_chat_invalid_request(
     )
 
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_chat_new_session_keeps_history(
+    fastapi_app: FastAPI,
+    client_with_vector_store: AsyncClient,
+    mock_graph: Mock,
+) -> None:
+    """A new session starts with the whole history sent by the client."""
+    url = fastapi_app.url_path_for("chat")
+
+    request_data = Request(
+        session_id="new-session",
+        messages=[
+            ClientMessage(role="user", content="First question"),
+            ClientMessage(role="assistant", content="First answer"),
+            ClientMessage(role="user", content="Second question"),
+        ],
+    )
+    response = await client_with_vector_store.post(
+        url,
+        json=request_data.model_dump(),
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    config = mock_graph.aget_state.call_args.args[0]
+    assert config["configurable"]["thread_id"] == "new-session"
+    messages = mock_graph.astream.call_args.args[0]["messages"]
+    assert [message.content[0]["text"] for message in messages] == [
+        "First question",
+        "First answer",
+        "Second question",
+    ]
+
+
+async def test_chat_invalid_session_id(
+    fastapi_app: FastAPI,
+    client_with_vector_store: AsyncClient,
+    mock_graph: Mock,
+) -> None:
+    """Session IDs are limited in length and characters."""
+    url = fastapi_app.url_path_for("chat")
+
+    for session_id in ("", "a" * 129, "session/other"):
+        response = await client_with_vector_store.post(
+            url,
+            json={
+                "session_id": session_id,
+                "messages": [{"role": "user", "content": "Hi there!"}],
+            },
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    mock_graph.astream.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_stream_graph_events_cites_progressively() -> None:
+    """Sources published by retrieval are cited once, before the update."""
+    docs = [Document("", metadata={"source": f"{name}.py"}) for name in "abc"]
+
+    async def mock_stream() -> AsyncGenerator[Any, None]:
+        yield "custom", {"context": docs[:1]}
+        yield "custom", {"context": docs[1:2]}
+        yield "updates", {"retrieve": {"context": docs}}
+
+    graph = Mock()
+    graph.astream.return_value = mock_stream()
+    db_session = AsyncMock()
+
+    parts = [
+        part
+        async for part in stream_graph_events(
+            graph,
+            [],
+            {"configurable": {"db_session": db_session}},
+            question="",
+        )
+    ]
+
+    assert parts[:-1] == [source_part(f"{name}.py") for name in "abc"]
+    # Durations of the stages trail the stream
+    assert parts[-1].code == "2"
+    assert "stream;dur=" in parts[-1].value[0]["serverTiming"]
+    # The session is released once the stream ends
+    db_session.close.assert_awaited_once()
@@ -0,0 +1,95 @@
+from typing import Annotated, Dict, List
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import START, StateGraph
+from langgraph.graph.message import add_messages
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing_extensions import TypedDict
+
+from scaledp_chat.db.models.chat_checkpoint import ChatCheckpointModel
+from scaledp_chat.services.checkpointer.saver import PostgresCheckpointSaver
+
+
+class State(TypedDict):
+    """Conversation of the test graph."""
+
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+async def echo(state: State) -> Dict[str, List[BaseMessage]]:
+    """Answer with the text of the last message."""
+    return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+
+@pytest.fixture
+def checkpointer(dbsession: AsyncSession) -> PostgresCheckpointSaver:
+    """Checkpointer joining the transaction of the test session."""
+    return PostgresCheckpointSaver(
+        async_sessionmaker(dbsession.bind, expire_on_commit=False),
+    )
+
+
+async def count_checkpoints(dbsession: AsyncSession, thread_id: str) -> int:
+    """Count stored checkpoints of the thread."""
+    return await dbsession.scalar(
+        select(func.count()).where(ChatCheckpointModel.thread_id == thread_id),
+    )
+
+
+@pytest.mark.anyio
+async def test_session_conversation(
+    dbsession: AsyncSession,
+    checkpointer: PostgresCheckpointSaver,
+) -> None:
+    """The conversation is restored from the newest message of the session."""
+    graph = (
+        StateGraph(State)
+        .add_node("echo", echo)
+        .add_edge(START, "echo")
+        .compile(checkpointer=checkpointer)
+    )
+    config = {"configurable": {"thread_id": "session"}}
+
+    await graph.ainvoke({"messages": [HumanMessage(content="first")]}, config)
+    state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="second")]},
+        config,
+    )
+
+    assert [message.content for message in state["messages"]] == [
+        "first",
+        "echo: first",
+        "second",
+        "echo: second",
+    ]
+    # Only the latest checkpoint of the session is kept
+    assert await count_checkpoints(dbsession, "session") == 1
+    assert (
+        await checkpointer.aget_tuple({"configurable": {"thread_id": "other"}}) is None
+    )
+
+
+@pytest.mark.anyio
+async def test_sweep_sessions(
+    dbsession: AsyncSession,
+    checkpointer: PostgresCheckpointSaver,
+) -> None:
+    """Sessions are deleted once they expire."""
+    graph = (
+        StateGraph(State)
+        .add_node("echo", echo)
+        .add_edge(START, "echo")
+        .compile(checkpointer=checkpointer)
+    )
+    await graph.ainvoke(
+        {"messages": [HumanMessage(content="hello")]},
+        {"configurable": {"thread_id": "session"}},
+    )
+
+    assert await checkpointer.asweep(ttl=3600) == 0
+    assert await count_checkpoints(dbsession, "session") == 1
+
+    assert await checkpointer.asweep(ttl=0) == 1
+    assert await count_checkpoints(dbsession, "session") == 0
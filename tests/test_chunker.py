@@ -0,0 +1,147 @@
+from langchain_core.documents import Document
+
+from scaledp_chat.indexer.chunker import PythonChunker, chunk_python
+from scaledp_chat.indexer.tokens import count_tokens
+
+SOURCE = '''"""Image readers."""
+import os
+
+DEFAULT_LIMIT = 5
+
+
+class ImageReader:
+    """Reader of images."""
+
+    # Supported formats
+    formats = ("png", "jpg")
+
+    def read(self, path):
+        return os.path.join(path, "image")
+
+    @staticmethod
+    def formats_of(paths):
+        return [path.split(".")[-1] for path in paths]
+
+
+class Session:
+    def start(self):
+        return self
+
+
+def show_image(df, limit=DEFAULT_LIMIT):
+    def render(row):
+        return row
+    return df
+'''
+
+
+def test_chunk_python() -> None:
+    """Every definition is a chunk of its own, with its line span."""
+    chunks = chunk_python(SOURCE, "scaledp/readers.py")
+
+    assert [
+        (chunk.symbol, chunk.kind, chunk.start_line, chunk.end_line) for chunk in chunks
+    ] == [
+        ("scaledp.readers", "module", 1, 4),
+        ("scaledp.readers.ImageReader", "class", 10, 11),
+        ("scaledp.readers.ImageReader.read", "method", 13, 14),
+        ("scaledp.readers.ImageReader.formats_of", "method", 16, 18),
+        ("scaledp.readers.Session", "class", 21, 21),
+        ("scaledp.readers.Session.start", "method", 22, 23),
+        ("scaledp.readers.show_image", "function", 26, 29),
+    ]
+    # Class code is headed by the class and its docstring, without the methods
+    assert chunks[1].text == (
+        "# scaledp.readers.ImageReader\n"
+        "class ImageReader:\n"
+        '    """Reader of images."""\n'
+        "    # Supported formats\n"
+        '    formats = ("png", "jpg")'
+    )
+    # Decorators belong to the definition, nested functions to their parent
+    assert chunks[3].text.split("\n")[1] == "    @staticmethod"
+    assert "def render(row):" in chunks[6].text
+
+
+def test_chunk_python_long_function() -> None:
+    """Long functions are split between statements under their header."""
+    body = "\n".join(
+        f"    value_{index} = compute({index}, value)" for index in range(40)
+    )
+    header = 'def transform(value):\n    """Transform a value."""\n'
+    source = f"{header}{body}\n    return value\n"
+
+    chunks = chunk_python(source, "scaledp/transform.py", max_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk.text) <= 100 for chunk in chunks)
+    assert all(
+        chunk.text.startswith(f"# scaledp.transform.transform\n{header}")
+        for chunk in chunks
+    )
+    # Parts cover the body without overlapping
+    assert chunks[0].start_line == 3
+    assert chunks[-1].end_line == 43
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start_line == previous.end_line + 1
+
+
+def test_chunk_python_max_tokens() -> None:
+    """Long lines and signatures are split to keep chunks under max_tokens."""
+    arguments = ", ".join(f"argument_{index}=None" for index in range(30))
+    values = ", ".join(str(index) for index in range(200))
+    source = (
+        f"VALUES = [{values}]\n"
+        f"def configure({arguments}):\n"
+        '    """Configure."""\n'
+        f"    return [{values}]\n"
+    )
+
+    chunks = chunk_python(source, "scaledp/config.py", max_tokens=100)
+
+    assert all(count_tokens(chunk.text) <= 100 for chunk in chunks)
+    # Parts of a line keep its span and join into the line
+    module = [chunk for chunk in chunks if chunk.symbol == "scaledp.config"]
+    assert len(module) > 1
+    assert {(chunk.start_line, chunk.end_line) for chunk in module} == {(1, 1)}
+    assert (
+        "".join(chunk.text.removeprefix("# scaledp.config\n") for chunk in module)
+        == source.split("\n")[0]
+    )
+    # Signature too long for the header is chunked as code
+    function = [chunk for chunk in chunks if chunk.kind == "function"]
+    assert function[0].text.startswith("# scaledp.config.configure\ndef configure(")
+    assert function[0].start_line == 2
+    assert function[-1].end_line == 4
+
+
+def test_chunk_python_syntax_error() -> None:
+    """Sources which are not valid python are split by lines."""
+    source = "\n".join(f"def broken_{index}(:" for index in range(60))
+
+    chunks = chunk_python(source, "scaledp/broken.py", max_tokens=100)
+
+    assert len(chunks) > 1
+    assert {chunk.symbol for chunk in chunks} == {"scaledp.broken"}
+    assert chunks[0].start_line == 1
+    assert chunks[-1].end_line == 60
+
+
+def test_split_documents() -> None:
+    """Chunks keep the metadata of their file."""
+    file = Document(
+        page_content=SOURCE,
+        metadata={"file_path": "scaledp/readers.py", "file_id": "1"},
+    )
+
+    chunks = PythonChunker().split_documents([file])
+
+    assert len(chunks) == 7
+    assert chunks[2].metadata == {
+        "file_path": "scaledp/readers.py",
+        "file_id": "1",
+        "symbol": "scaledp.readers.ImageReader.read",
+        "kind": "method",
+        "start_line": 13,
+        "end_line": 14,
+    }
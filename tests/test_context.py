@@ -0,0 +1,106 @@
+from langchain_core.documents import Document
+
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.indexer.tokens import count_tokens, line_token_offsets
+from scaledp_chat.web.api.chat.context import FileContext, merge_spans, pack_context
+
+SOURCE = """import os
+
+
+class Session:
+    def start(self):
+        return os.getpid()
+
+    def stop(self):
+        return None
+
+
+def helper():
+    return 1
+"""
+
+
+def make_file(source: str = SOURCE) -> FileContext:
+    """Create file context of the source with its symbols."""
+    return FileContext(
+        source="scaledp/session.py",
+        content=source,
+        lines=source.split("\n"),
+        token_offsets=line_token_offsets(source),
+        symbols=extract_symbols(source, "scaledp/session.py"),
+    )
+
+
+def chunk(text: str, source: str = SOURCE) -> Document:
+    """Chunk of the source as stored by the indexer."""
+    return Document(
+        page_content=text,
+        metadata={"file_id": "1", "start_index": source.index(text)},
+    )
+
+
+def test_count_tokens() -> None:
+    """Words are split into pieces of four characters, punctuation counts."""
+    assert count_tokens("show_image()") == 5
+    assert count_tokens("  ") == 0
+    assert line_token_offsets("a b\n\nc") == [0, 2, 2, 3]
+
+
+def test_merge_spans() -> None:
+    """Overlapping and adjacent spans are merged."""
+    assert merge_spans([(8, 9), (1, 3), (2, 4), (5, 5)]) == [(1, 5), (8, 9)]
+
+
+def test_pack_context_expands_to_enclosing_definition() -> None:
+    """Chunks are expanded to the innermost function containing them."""
+    file = make_file()
+
+    context = pack_context(
+        [chunk("return os.getpid()"), chunk("return 1")],
+        {"1": file},
+        budget=1000,
+    )
+
+    assert context == (
+        "# scaledp/session.py, lines 5-6\n"
+        "    def start(self):\n"
+        "        return os.getpid()\n"
+        "\n"
+        "# scaledp/session.py, lines 12-13\n"
+        "def helper():\n"
+        "    return 1"
+    )
+
+
+def test_pack_context_respects_budget() -> None:
+    """Chunks are kept as is or skipped when the definition doesn't fit."""
+    file = make_file()
+    docs = [chunk("def stop(self):"), chunk("return os.getpid()")]
+    budget = file.tokens((8, 9)) + file.tokens((6, 6))
+
+    context = pack_context(docs, {"1": file}, budget=budget)
+
+    assert context == (
+        "# scaledp/session.py, lines 6-6\n"
+        "        return os.getpid()\n"
+        "\n"
+        "# scaledp/session.py, lines 8-9\n"
+        "    def stop(self):\n"
+        "        return None"
+    )
+    assert pack_context(docs, {"1": file}, budget=1) == ""
+    assert pack_context(docs, {}, budget=1000) == ""
+
+
+def test_pack_context_symbol_documents() -> None:
+    """Symbol documents are packed with their own line span."""
+    file = make_file()
+    doc = Document(
+        page_content="class scaledp.session.Session",
+        metadata={"file_id": "1", "start_line": 4, "end_line": 9},
+    )
+
+    context = pack_context([doc, chunk("return None")], {"1": file}, budget=1000)
+
+    assert context.startswith("# scaledp/session.py, lines 4-9\nclass Session:")
+    assert context.count("# scaledp/session.py") == 1
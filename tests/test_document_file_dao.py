@@ -0,0 +1,29 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+
+
+@pytest.mark.anyio
+async def test_get_many(dbsession: AsyncSession) -> None:
+    """Files are loaded in the order of their first ID, duplicates skipped."""
+    dao = DocumentFileDAO(dbsession)
+    ids = [
+        await dao.create(
+            content=f"content {index}",
+            filepath=f"file_{index}.py",
+            file_type="python",
+            file_metadata={},
+        )
+        for index in range(3)
+    ]
+    await dbsession.flush()
+
+    files = await dao.get_many(
+        [ids[2], ids[0], uuid.UUID(ids[2]), str(uuid.uuid4()), ids[0]],
+    )
+
+    assert [file.filepath for file in files] == ["file_2.py", "file_0.py"]
+    assert await dao.get_many([]) == []
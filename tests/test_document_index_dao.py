@@ -0,0 +1,185 @@
+import uuid
+from typing import List, Optional
+from unittest.mock import AsyncMock, Mock
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_index_dao import (
+    DocumentIndexDAO,
+    distinct_sources,
+    to_tsquery_text,
+)
+from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.settings import RetrievalMode, settings
+from scaledp_chat.web.api.chat.graph import search_documents
+from scaledp_chat.web.api.chat.timings import Timings
+
+
+async def create_documents(
+    dbsession: AsyncSession,
+    vectors: np.ndarray,
+    contents: Optional[List[str]] = None,
+    files: Optional[int] = None,
+) -> List[str]:
+    """Store one document per vector and return their sources."""
+    sources = []
+    for index, vector in enumerate(vectors):
+        source = f"file_{index % files if files else index}.py"
+        dbsession.add(
+            DocumentIndexModel(
+                langchain_id=uuid.uuid4(),
+                content=contents[index] if contents else f"content {index}",
+                embedding=vector.tolist(),
+                document_id=uuid.uuid4(),
+                langchain_metadata={},
+                source=source,
+                file_id=uuid.uuid4(),
+            ),
+        )
+        sources.append(source)
+    await dbsession.flush()
+    return sources
+
+
+@pytest.mark.anyio
+async def test_similarity_search_batch(dbsession: AsyncSession) -> None:
+    """Batched search returns the top-k documents of every query vector."""
+    rng = np.random.default_rng(42)
+    vectors = rng.random((20, settings.embeddings_vector_size))
+    queries = rng.random((4, settings.embeddings_vector_size))
+    sources = await create_documents(dbsession, vectors)
+
+    results = await DocumentIndexDAO(dbsession).similarity_search_batch(
+        queries.tolist(),
+        k=3,
+    )
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert len(results) == len(queries)
+    for query, docs in zip(queries, results):
+        distances = 1 - normalized @ (query / np.linalg.norm(query))
+        expected = [sources[index] for index in np.argsort(distances)[:3]]
+        assert [doc.metadata["source"] for doc in docs] == expected
+
+
+@pytest.mark.anyio
+async def test_similarity_search_batch_empty(dbsession: AsyncSession) -> None:
+    """Batched search without query vectors does not touch the database."""
+    assert await DocumentIndexDAO(dbsession).similarity_search_batch([], k=3) == []
+
+
+@pytest.mark.anyio
+async def test_similarity_search_batch_distinct_sources(
+    dbsession: AsyncSession,
+) -> None:
+    """Every file is represented by its nearest chunk."""
+    rng = np.random.default_rng(3)
+    query = rng.random(settings.embeddings_vector_size)
+    # Chunks 0, 1 and 2 are the nearest ones, 0 and 2 belong to file_0.py
+    vectors = np.stack(
+        [query, query + 1e-3, query + 2e-3, *rng.random((5, query.size))],
+    )
+    await create_documents(dbsession, vectors, files=2)
+
+    [docs] = await DocumentIndexDAO(dbsession).similarity_search_batch(
+        [query.tolist()],
+        k=2,
+        fetch_k=8,
+    )
+
+    assert [doc.metadata["source"] for doc in docs] == ["file_0.py", "file_1.py"]
+    assert docs[0].page_content == "content 0"
+    assert docs[1].page_content == "content 1"
+    assert isinstance(docs[0].metadata["file_id"], str)
+
+
+def test_distinct_sources() -> None:
+    """The first chunk of every source is kept."""
+    documents = [
+        Document(page_content="a", metadata={"source": "a.py"}),
+        Document(page_content="a2", metadata={"source": "a.py"}),
+        Document(page_content="x", id="1"),
+        Document(page_content="b", metadata={"source": "b.py"}),
+    ]
+
+    assert [doc.page_content for doc in distinct_sources(documents, k=3)] == [
+        "a",
+        "x",
+        "b",
+    ]
+    assert len(distinct_sources(documents, k=1)) == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", [RetrievalMode.BATCHED, RetrievalMode.SEQUENTIAL])
+async def test_search_documents_modes(
+    dbsession: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    mode: RetrievalMode,
+) -> None:
+    """Batched and sequential search both return distinct files."""
+    rng = np.random.default_rng(3)
+    query = rng.random(settings.embeddings_vector_size)
+    vectors = np.stack(
+        [query, query + 1e-3, query + 2e-3, *rng.random((5, query.size))],
+    )
+    sources = await create_documents(dbsession, vectors, files=2)
+
+    async def similarity_search(term: str, k: int) -> List[Document]:
+        # Raw nearest chunks, as returned by the vector store
+        distances = np.linalg.norm(vectors - query, axis=1)
+        return [
+            Document(
+                page_content=f"content {index}",
+                metadata={"source": sources[index]},
+            )
+            for index in np.argsort(distances)[:k]
+        ]
+
+    vector_store = Mock()
+    vector_store.embeddings.aembed_documents = AsyncMock(return_value=[query.tolist()])
+    vector_store.asimilarity_search = AsyncMock(side_effect=similarity_search)
+    monkeypatch.setattr(settings, "retrieval_mode", mode)
+    monkeypatch.setattr(settings, "retrieval_k", 2)
+    monkeypatch.setattr(settings, "retrieval_fetch_k", 8)
+
+    [docs] = await search_documents(["query"], vector_store, dbsession, Timings())
+
+    assert [doc.metadata["source"] for doc in docs] == ["file_0.py", "file_1.py"]
+    assert [doc.page_content for doc in docs] == ["content 0", "content 1"]
+
+
+def test_to_tsquery_text() -> None:
+    """Query words are split like indexed code and matched with OR."""
+    assert to_tsquery_text("How to use df.show_image?") == (
+        "how | to | use | df | show | image"
+    )
+    assert to_tsquery_text("?!") is None
+
+
+@pytest.mark.anyio
+async def test_hybrid_search(dbsession: AsyncSession) -> None:
+    """Full-text and vector rankings are fused into one ranking."""
+    rng = np.random.default_rng(7)
+    vectors = rng.random((10, settings.embeddings_vector_size))
+    contents = [f"content {index}" for index in range(10)]
+    contents[0] = "spark = ScaleDPSession()"
+    contents[5] = "df.show_image(limit=5)"
+    sources = await create_documents(dbsession, vectors, contents)
+
+    docs = await DocumentIndexDAO(dbsession).hybrid_search(
+        "ScaleDPSession and show_image",
+        [vectors[0].tolist()],
+        k=3,
+        fetch_k=2,
+    )
+
+    # Document 0 is the best match of both rankings, document 5 is found by
+    # full-text search only
+    result = [doc.metadata["source"] for doc in docs]
+    assert result[0] == sources[0]
+    assert sources[5] in result
+    assert len(result) == 3
@@ -0,0 +1,73 @@
+from typing import List
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from scaledp_chat.db.dao.chunk_embedding_dao import ChunkEmbeddingDAO
+from scaledp_chat.indexer.changes import content_hash
+from scaledp_chat.indexer.embedding_cache import CachedEmbedder
+from scaledp_chat.settings import settings
+
+
+class CountingEmbeddings:
+    """Embeddings of texts as their length, recording the embedded texts."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, recording the call."""
+        self.calls.append(texts)
+        return [
+            [float(len(text))] + [0.5] * (settings.embeddings_vector_size - 1)
+            for text in texts
+        ]
+
+
+@pytest.mark.anyio
+async def test_cached_embedder(dbsession: AsyncSession) -> None:
+    """Texts are embedded once per model, also across batches and runs."""
+    session_factory = async_sessionmaker(dbsession.bind, expire_on_commit=False)
+    embeddings = CountingEmbeddings()
+    cache = CachedEmbedder(session_factory, embeddings.embed, model="test-model")
+
+    first = await cache.aembed_documents(["import os", "x = 1", "import os"])
+    # Duplicates within the batch are embedded once
+    assert embeddings.calls == [["import os", "x = 1"]]
+    assert first == await embeddings.embed(["import os", "x = 1", "import os"])
+    embeddings.calls.clear()
+
+    second = await cache.aembed_documents(["x = 1", "y = 22"])
+    assert embeddings.calls == [["y = 22"]]
+    assert [vector[0] for vector in second] == [5.0, 6.0]
+
+    # A new run of the indexer embeds nothing
+    rerun = CachedEmbedder(session_factory, embeddings.embed, model="test-model")
+    assert await rerun.aembed_documents(["y = 22", "import os"]) == [
+        second[1],
+        first[0],
+    ]
+    assert embeddings.calls == [["y = 22"]]
+    assert (rerun.stats.texts, rerun.stats.hits, rerun.stats.misses) == (2, 2, 0)
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.duplicates) == (1, 3, 1)
+
+    # Embeddings of other models are separate
+    other = CachedEmbedder(session_factory, embeddings.embed, model="other-model")
+    await other.aembed_documents(["x = 1"])
+    assert embeddings.calls[-1] == ["x = 1"]
+
+
+@pytest.mark.anyio
+async def test_put_many_keeps_cached(dbsession: AsyncSession) -> None:
+    """Storing a cached text again keeps the cached embedding."""
+    dao = ChunkEmbeddingDAO(dbsession)
+    size = settings.embeddings_vector_size
+    text_hash = content_hash("import os")
+
+    await dao.put_many("test-model", {text_hash: [1.0] * size})
+    await dao.put_many("test-model", {text_hash: [2.0] * size})
+
+    assert await dao.get_many("test-model", [text_hash, content_hash("x")]) == {
+        text_hash: [1.0] * size,
+    }
+    assert await dao.get_many("test-model", []) == {}
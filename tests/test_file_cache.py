@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.db.dao.symbol_index_dao import SymbolIndexDAO
+from scaledp_chat.indexer.symbols import extract_symbols
+from scaledp_chat.web.api.chat.file_cache import DocumentFileCache
+from scaledp_chat.web.api.chat.index_version import IndexVersion
+
+SOURCE = "def helper():\n    return 1\n"
+
+
+async def create_file(dbsession: AsyncSession, filepath: str) -> str:
+    """Store a document file with its symbols."""
+    file_id = await DocumentFileDAO(dbsession).create(
+        content=SOURCE,
+        filepath=filepath,
+        file_type="py",
+        file_metadata={},
+    )
+    await SymbolIndexDAO(dbsession).create(file_id, extract_symbols(SOURCE, filepath))
+    await dbsession.flush()
+    return file_id
+
+
+@pytest.mark.anyio
+async def test_index_version(dbsession: AsyncSession) -> None:
+    """Index version starts at zero and is incremented by the indexer."""
+    dao = IndexStateDAO(dbsession)
+    assert await dao.get_version() == 0
+    assert await dao.bump_version() == 1
+    assert await dao.bump_version() == 2
+    assert await dao.get_version() == 2
+
+
+@pytest.mark.anyio
+async def test_file_cache(dbsession: AsyncSession) -> None:
+    """Files are loaded once and dropped when the index version changes."""
+    first = await create_file(dbsession, "a.py")
+    second = await create_file(dbsession, "b.py")
+    cache = DocumentFileCache(
+        maxbytes=1024 * 1024,
+        index_version=IndexVersion(ttl=0),
+    )
+
+    files = await cache.get_many(dbsession, [first])
+    assert files[first].source == "a.py"
+    assert files[first].symbols[0].name == "a.helper"
+
+    files = await cache.get_many(dbsession, [second, first])
+    assert list(files) == [first, second]
+    assert cache.files.stats()["hits"] == 1
+    assert cache.files.stats()["entries"] == 2
+
+    await IndexStateDAO(dbsession).bump_version()
+    await cache.get_many(dbsession, [first])
+    assert cache.files.stats()["entries"] == 1
@@ -0,0 +1,52 @@
+from langchain_core.messages import AIMessage, ChatMessage, HumanMessage
+
+from scaledp_chat.indexer.tokens import count_tokens, truncate_tokens
+from scaledp_chat.web.api.chat.history import (
+    messages_tokens,
+    trim_history,
+    window_messages,
+)
+
+
+def test_truncate_tokens() -> None:
+    """Text is cut after the given number of tokens."""
+    assert truncate_tokens("def helper(): return 1", 3) == "def helper"
+    assert truncate_tokens("short", 10) == "short"
+    assert truncate_tokens("short", 0) == ""
+
+
+def test_trim_history() -> None:
+    """Recent turns are kept verbatim, older ones truncated and dropped."""
+    history = [
+        HumanMessage(content="first question " * 20),
+        AIMessage(content="first answer " * 20),
+        HumanMessage(content="second question"),
+        AIMessage(content="second answer"),
+    ]
+    assert trim_history(history, budget=1000) == history
+
+    budget = messages_tokens(history[2:]) + 10
+    trimmed = trim_history(history, budget=budget)
+    assert trimmed[1:] == history[2:]
+    assert trimmed[0].text().startswith("first")
+    assert trimmed[0].text().endswith(" ...")
+    assert messages_tokens(trimmed) <= budget
+
+    assert trim_history(history, budget=0) == []
+
+
+def test_window_messages() -> None:
+    """The latest turn and the prompt are kept even over the budget."""
+    messages = [
+        ChatMessage(role="user", content=[{"type": "text", "text": "old " * 50}]),
+        AIMessage(content="old answer " * 50),
+        ChatMessage(role="user", content=[{"type": "text", "text": "latest"}]),
+    ]
+    prompt = [HumanMessage(content="context " * 50)]
+
+    window = window_messages(messages, prompt, budget=10)
+    assert window == [messages[-1], *prompt]
+
+    window = window_messages(messages, prompt, budget=10_000)
+    assert window == [*messages, *prompt]
+    assert count_tokens(window[-1].text()) == 100
@@ -0,0 +1,129 @@
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+from git import Actor, Repo
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.db.dao.document_index_dao import DocumentIndexDAO
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.db.models.document_index import DocumentIndexModel
+from scaledp_chat.indexer.changes import (
+    IndexChanges,
+    changed_paths,
+    content_hash,
+    diff_hashes,
+    load_files,
+)
+from scaledp_chat.settings import settings
+
+AUTHOR = Actor("Indexer", "indexer@example.com")
+
+
+def is_python(path: str) -> bool:
+    """Index only python files."""
+    return path.endswith(".py")
+
+
+def commit(repo: Repo, files: Dict[str, Optional[str]]) -> str:
+    """Write or remove files and commit them."""
+    root = Path(repo.working_tree_dir or "")
+    for path, content in files.items():
+        if content is None:
+            repo.index.remove([path], working_tree=True)
+            continue
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+        repo.index.add([path])
+    return repo.index.commit("change", author=AUTHOR, committer=AUTHOR).hexsha
+
+
+def test_diff_hashes() -> None:
+    """Files are compared by their content hashes."""
+    indexed = {"a.py": "1", "b.py": "2", "c.py": "3"}
+    current = {"a.py": "1", "b.py": "changed", "d.py": "4"}
+
+    assert diff_hashes(indexed, current) == IndexChanges(
+        changed=["b.py", "d.py"],
+        removed=["c.py"],
+    )
+    # Only the given paths are compared
+    assert diff_hashes(indexed, {"b.py": "2"}, ["b.py"]) == IndexChanges([], [])
+    assert not diff_hashes(indexed, indexed)
+
+
+def test_changed_paths(tmp_path: Path) -> None:
+    """Files changed since the indexed commit are read from the HEAD."""
+    repo = Repo.init(tmp_path)
+    first = commit(
+        repo,
+        {"pkg/a.py": "a = 1\n", "pkg/b.py": "b = 1\n", "README.md": "readme"},
+    )
+    commit(
+        repo,
+        {"pkg/a.py": "a = 2\n", "pkg/b.py": None, "pkg/c.py": "c = 1\n"},
+    )
+
+    paths = changed_paths(repo, first, is_python)
+
+    assert paths == {"pkg/a.py", "pkg/b.py", "pkg/c.py"}
+    files = {doc.metadata["file_path"]: doc for doc in load_files(repo, is_python)}
+    assert sorted(files) == ["pkg/a.py", "pkg/c.py"]
+    assert files["pkg/a.py"].page_content == "a = 2\n"
+    assert files["pkg/a.py"].metadata["file_type"] == ".py"
+    assert [doc.metadata["source"] for doc in load_files(repo, is_python, paths)] == [
+        "pkg/a.py",
+        "pkg/c.py",
+    ]
+    assert changed_paths(repo, None, is_python) is None
+    assert changed_paths(repo, "0" * 40, is_python) is None
+
+
+@pytest.mark.anyio
+async def test_delete_changed_files(dbsession: AsyncSession) -> None:
+    """Files and chunks of changed files are deleted by their paths."""
+    dao = DocumentFileDAO(dbsession)
+    for path in ("a.py", "b.py"):
+        file_id = await dao.create(
+            content=f"# {path}",
+            filepath=path,
+            file_type=".py",
+            file_metadata={},
+        )
+        dbsession.add(
+            DocumentIndexModel(
+                langchain_id=uuid.uuid4(),
+                content=f"# {path}",
+                embedding=[0.1] * settings.embeddings_vector_size,
+                document_id=uuid.uuid4(),
+                langchain_metadata={},
+                source=path,
+                file_id=file_id,
+            ),
+        )
+    await dbsession.flush()
+
+    assert await dao.get_hashes() == {
+        "a.py": content_hash("# a.py"),
+        "b.py": content_hash("# b.py"),
+    }
+    assert await DocumentIndexDAO(dbsession).delete_sources(["a.py"]) == 1
+    assert await dao.delete_paths(["a.py", "missing.py"]) == 1
+    assert await dao.delete_paths([]) == 0
+    assert list(await dao.get_hashes()) == ["b.py"]
+
+
+@pytest.mark.anyio
+async def test_index_commit(dbsession: AsyncSession) -> None:
+    """Indexed commit is recorded without changing the index version."""
+    dao = IndexStateDAO(dbsession)
+    assert await dao.get_commit() is None
+
+    await dao.set_commit("abc")
+    version = await dao.bump_version()
+    await dao.set_commit("def")
+
+    assert await dao.get_commit() == "def"
+    assert await dao.get_version() == version
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from scaledp_chat.services.loop_monitor.monitor import (
+    LoopStallMonitor,
+    loop_stalled_seconds,
+    loop_stalls,
+)
+
+
+def block_event_loop() -> None:
+    """Blocking call made from a coroutine."""
+    time.sleep(0.3)
+
+
+@pytest.mark.anyio
+async def test_loop_stall_detected() -> None:
+    """Blocking the event loop is counted and its stack is captured."""
+    stalls = loop_stalls.values[()]
+    stalled_seconds = loop_stalled_seconds.values[()]
+    monitor = LoopStallMonitor(threshold=0.1, interval=0.02)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_event_loop()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == 1
+    assert monitor.max_stall >= 0.2
+    assert monitor.last_stack is not None
+    assert "block_event_loop" in monitor.last_stack
+    # Stalls are exported with the metrics of the worker
+    assert loop_stalls.values[()] == stalls + 1
+    assert loop_stalled_seconds.values[()] >= stalled_seconds + 0.2
+
+
+@pytest.mark.anyio
+async def test_loop_without_stalls() -> None:
+    """Awaiting does not count as a stall."""
+    monitor = LoopStallMonitor(threshold=0.1, interval=0.02)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == 0
@@ -0,0 +1,79 @@
+import pytest
+
+from scaledp_chat.metrics import (
+    CallbackMetric,
+    Counter,
+    Histogram,
+    Metric,
+    Registry,
+)
+from scaledp_chat.web.api.chat.timings import Timings, stage_seconds
+
+
+def test_render_metrics() -> None:
+    """Metrics are rendered in the Prometheus text format."""
+    registry = Registry()
+    counter = registry.register(Counter("tokens_total", "Tokens.", ["model"]))
+    histogram = registry.register(
+        Histogram("latency_seconds", "Latency.", buckets=[0.1, 1]),
+    )
+    registry.register(CallbackMetric("entries", "Entries.", lambda: {(): 3}))
+
+    counter.inc(2, model='a"b')
+    counter.inc(model='a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render() == (
+        "# HELP tokens_total Tokens.\n"
+        "# TYPE tokens_total counter\n"
+        'tokens_total{model="a\\"b"} 3\n'
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 1\n'
+        'latency_seconds_bucket{le="1"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 3\n'
+        "latency_seconds_sum 5.55\n"
+        "latency_seconds_count 3\n"
+        "# HELP entries Entries.\n"
+        "# TYPE entries gauge\n"
+        "entries 3\n"
+    )
+
+
+def test_metric_labels() -> None:
+    """Values of all labels must be given."""
+    counter = Counter("tokens_total", "Tokens.", ["model"])
+    with pytest.raises(ValueError, match="Expected labels"):
+        counter.inc()
+
+    registry = Registry()
+    registry.register(counter)
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(counter)
+
+
+def test_metric_samples_abstract() -> None:
+    """Metrics must implement their samples."""
+    with pytest.raises(TypeError, match="abstract"):
+        Metric("metric", "Metric.")  # type: ignore[abstract]
+    # Counters without labels are exposed before their first increment
+    assert Counter("stalls_total", "Stalls.").render().endswith("stalls_total 0\n")
+
+
+def test_timings() -> None:
+    """Stage durations are summed up and observed in the histogram."""
+    count = stage_seconds.values.get(("pack",), ([], 0.0, 0))[2]
+    timings = Timings()
+    timings.record("pack", 0.01)
+    timings.record("pack", 0.02)
+    timings.record_since("llm_ttft", "llm")
+
+    assert timings.server_timing() == "pack;dur=30.0"
+    assert stage_seconds.values[("pack",)][2] == count + 2
+
+    timings.mark("llm")
+    with timings.measure("llm"):
+        timings.record_since("llm_ttft", "llm")
+    assert set(timings.durations) == {"pack", "llm", "llm_ttft"}
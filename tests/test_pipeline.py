@@ -0,0 +1,139 @@
+import asyncio
+from functools import partial
+from typing import List, Optional
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from scaledp_chat.indexer.pipeline import IndexingPipeline, ProcessPoolEmbedder
+
+
+def make_files(count: int) -> List[Document]:
+    """Files with two lines each."""
+    return [
+        Document(page_content=f"file {index}\nline {index}", metadata={"index": index})
+        for index in range(count)
+    ]
+
+
+def split_lines(document: Document) -> List[Document]:
+    """Split a document into its lines."""
+    return [
+        Document(page_content=line, metadata=document.metadata)
+        for line in document.page_content.split("\n")
+    ]
+
+
+async def embed(texts: List[str]) -> List[List[float]]:
+    """Embed a text as its length."""
+    await asyncio.sleep(0)
+    return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.anyio
+async def test_run_pipeline() -> None:
+    """Every chunk is embedded and written once, in batches."""
+    written: List[Document] = []
+    batches: List[int] = []
+
+    async def prepare(file: Document) -> Optional[Document]:
+        return None if file.metadata["index"] == 3 else file
+
+    async def write(chunks: List[Document], vectors: List[List[float]]) -> None:
+        assert vectors == [[float(len(chunk.page_content))] for chunk in chunks]
+        written.extend(chunks)
+        batches.append(len(chunks))
+
+    stats = await IndexingPipeline(
+        prepare=prepare,
+        split=split_lines,
+        embed=embed,
+        write=write,
+        batch_size=4,
+        workers=3,
+    ).run(make_files(10))
+
+    assert sorted(chunk.page_content for chunk in written) == sorted(
+        line
+        for index in range(10)
+        if index != 3
+        for line in (f"file {index}", f"line {index}")
+    )
+    assert max(batches) == 4
+    assert [(stage.name, stage.items) for stage in stats] == [
+        ("load", 10),
+        ("split", 18),
+        ("embed", 18),
+        ("write", 18),
+    ]
+
+
+@pytest.mark.anyio
+async def test_run_pipeline_backpressure() -> None:
+    """A slow writer stops the stages before it from running ahead."""
+    loaded = 0
+    ahead: List[int] = []
+
+    async def prepare(file: Document) -> Document:
+        nonlocal loaded
+        loaded += 1
+        return file
+
+    async def write(chunks: List[Document], vectors: List[List[float]]) -> None:
+        ahead.append(loaded - (chunks[0].metadata["index"] + 1))
+        await asyncio.sleep(0.001)
+
+    await IndexingPipeline(
+        prepare=prepare,
+        split=lambda document: [document],
+        embed=embed,
+        write=write,
+        batch_size=1,
+        workers=1,
+        queue_size=1,
+    ).run(make_files(50))
+
+    assert len(ahead) == 50
+    assert max(ahead) <= 4
+
+
+@pytest.mark.anyio
+async def test_run_pipeline_error() -> None:
+    """A failing stage stops the whole pipeline."""
+
+    async def fail(texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("embedding failed")
+
+    async def prepare(file: Document) -> Document:
+        return file
+
+    async def write(chunks: List[Document], vectors: List[List[float]]) -> None:
+        raise AssertionError("nothing is embedded")
+
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        await asyncio.wait_for(
+            IndexingPipeline(
+                prepare=prepare,
+                split=split_lines,
+                embed=fail,
+                write=write,
+                batch_size=2,
+                workers=2,
+            ).run(make_files(100)),
+            timeout=5,
+        )
+
+
+@pytest.mark.anyio
+async def test_process_pool_embedder() -> None:
+    """Worker processes embed texts with their own model."""
+    factory = partial(DeterministicFakeEmbedding, size=4)
+    texts = ["first", "second", "third"]
+
+    with ProcessPoolEmbedder(factory, workers=2) as embedder:
+        vectors = await embedder.aembed_documents(texts)
+        query = embedder.embed_query("first")
+
+    assert vectors == factory().embed_documents(texts)
+    assert query == vectors[0]
@@ -1,8 +1,13 @@
 import pytest
+from aio_pika.pool import Pool
 from fastapi import FastAPI
 from httpx import AsyncClient
+from langchain_postgres import PGVectorStore
+from sqlalchemy.ext.asyncio import AsyncEngine
 from starlette import status
 
+from scaledp_chat.web.api.monitoring.readiness import rabbit_pool_state
+
 
 @pytest.mark.anyio
 async def test_health(client: AsyncClient, fastapi_app: FastAPI) -> None:
@@ -15,3 +20,119 @@ async def test_health(client: AsyncClient, fastapi_app: FastAPI) -> None:
     url = fastapi_app.url_path_for("health_check")
     response = await client.get(url)
     assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_cache_stats(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks the cache statistics endpoint.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    url = fastapi_app.url_path_for("cache_stats")
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    caches = response.json()
+    assert set(caches) == {"query_embeddings", "document_files", "answers"}
+    assert set(caches["query_embeddings"]) == {
+        "hits",
+        "misses",
+        "entries",
+        "bytes",
+    }
+
+
+@pytest.mark.anyio
+async def test_chat_stream_stats(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks the chat stream statistics endpoint.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    url = fastapi_app.url_path_for("chat_stream_stats")
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()) == {"completed", "aborted", "saved_tokens"}
+
+
+@pytest.mark.anyio
+async def test_metrics(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks the metrics endpoint.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    url = fastapi_app.url_path_for("metrics")
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE chat_stage_seconds histogram" in response.text
+    assert 'cache_entries{cache="answers"}' in response.text
+    assert 'cache_hits_total{cache="query_embeddings"}' in response.text
+    assert "# TYPE event_loop_stalls_total counter" in response.text
+
+
+@pytest.mark.anyio
+async def test_readiness(
+    client: AsyncClient,
+    fastapi_app: FastAPI,
+    _engine: AsyncEngine,
+    vector_store: PGVectorStore,
+) -> None:
+    """
+    Checks the readiness endpoint.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    :param _engine: engine of the test database.
+    :param vector_store: vector store of the test database.
+    """
+    url = fastapi_app.url_path_for("readiness_check")
+    fastapi_app.state.db_engine = _engine
+
+    # The vector store failed to initialize
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["failures"] == ["vector_store: not initialized"]
+
+    fastapi_app.state.vector_store = vector_store
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    ready = response.json()
+    assert ready["ready"]
+    assert set(ready["pools"]) == {"database", "vector_store"}
+    assert ready["pools"]["database"]["saturation"] < 1
+    assert {"query_embeddings", "answers"} <= set(ready["caches"])
+
+
+@pytest.mark.anyio
+async def test_rabbit_pool_state() -> None:
+    """Checks the state of aio-pika pools, also without private attributes."""
+
+    async def create_item() -> object:
+        return object()
+
+    pool: "Pool[object]" = Pool(create_item, max_size=4)
+    async with pool.acquire():
+        state = rabbit_pool_state(pool)
+    assert state == {
+        "closed": False,
+        "created": 1,
+        "idle": 0,
+        "max_size": 4,
+        "saturation": 0.25,
+    }
+
+    class OtherPool:
+        is_closed = False
+
+    assert rabbit_pool_state(OtherPool()) == {  # type: ignore[arg-type]
+        "closed": False,
+        "created": 0,
+        "idle": None,
+        "max_size": None,
+        "saturation": 0.0,
+    }
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import Any, AsyncGenerator, Dict, List
+
+import pytest
+
+from scaledp_chat.indexer.tokens import count_tokens
+from scaledp_chat.web.api.chat import stream
+from scaledp_chat.web.api.chat.stream import (
+    FrameBuffer,
+    StreamPart,
+    StreamStats,
+    encode_part,
+    encode_stream,
+    source_part,
+    stream_stats,
+    text_part,
+)
+
+
+async def generate_parts(
+    parts: List[StreamPart],
+    delay: float = 0,
+) -> AsyncGenerator[StreamPart, None]:
+    """Yield the parts with a pause before each of them."""
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+def test_encode_part() -> None:
+    """Parts are encoded as JSON lines prefixed with their type code."""
+    assert encode_part(text_part('a "b" / c')) == '0:"a \\"b\\" / c"\n'
+    code, value = encode_part(source_part("src/a.py")).split(":", 1)
+    assert code == "h"
+    assert json.loads(value)["url"] == "src/a.py"
+
+
+@pytest.mark.anyio
+async def test_encode_stream_coalesces_text() -> None:
+    """Consecutive text parts are merged into one frame."""
+    parts = [source_part("a.py"), *(text_part(token) for token in "Hello")]
+    chunks = [chunk async for chunk in encode_stream(generate_parts(parts))]
+
+    assert chunks == [encode_part(parts[0]) + encode_part(text_part("Hello"))]
+
+
+@pytest.mark.anyio
+async def test_encode_stream_flushes() -> None:
+    """The buffer is sent when it is full or its first part waited too long."""
+    parts = [text_part("ab"), text_part("cd"), text_part("ef")]
+    chunks = [
+        chunk async for chunk in encode_stream(generate_parts(parts), max_bytes=4)
+    ]
+    assert chunks == ['0:"abcd"\n', '0:"ef"\n']
+
+    chunks = [
+        chunk
+        async for chunk in encode_stream(
+            generate_parts(parts, delay=0.05),
+            max_delay=0.01,
+        )
+    ]
+    assert chunks == ['0:"ab"\n', '0:"cd"\n', '0:"ef"\n']
+
+
+@pytest.mark.anyio
+async def test_encode_stream_without_coalescing() -> None:
+    """Every part is sent on its own when coalescing is disabled."""
+    parts = [text_part("a"), text_part("b")]
+    chunks = [
+        chunk async for chunk in encode_stream(generate_parts(parts), coalesce=False)
+    ]
+    assert chunks == ['0:"a"\n', '0:"b"\n']
+
+
+@pytest.mark.anyio
+async def test_encode_stream_cancels_on_disconnect() -> None:
+    """The parts are cancelled as soon as the client disconnects."""
+    cancelled = asyncio.Event()
+
+    async def slow_parts() -> AsyncGenerator[StreamPart, None]:
+        yield text_part("Hello")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield text_part("never sent")
+
+    async def receive() -> Dict[str, Any]:
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    aborted = stream_stats.aborted
+    chunks = [
+        chunk
+        async for chunk in encode_stream(slow_parts(), max_delay=0, receive=receive)
+    ]
+
+    assert chunks == ['0:"Hello"\n']
+    assert cancelled.is_set()
+    assert stream_stats.aborted == aborted + 1
+
+
+def test_frame_buffer_counts_tokens(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tokens are counted once per merged text, not for every added part."""
+    texts: List[str] = []
+
+    def counting(text: str) -> int:
+        texts.append(text)
+        return count_tokens(text)
+
+    monkeypatch.setattr(stream, "count_tokens", counting)
+    buffer = FrameBuffer()
+    for token in ["Hello", ",", " world"]:
+        buffer.add(text_part(token))
+    assert texts == []
+
+    buffer.add(source_part("a.py"))
+    buffer.add(text_part("!"))
+    buffer.flush()
+
+    assert texts == ["Hello, world", "!"]
+    assert buffer.tokens == count_tokens("Hello, world") + 1
+
+
+def test_stream_stats() -> None:
+    """Saved tokens are estimated from the average completed answer."""
+    stats = StreamStats()
+    stats.record_aborted(5)
+    stats.record_completed(100)
+    stats.record_completed(200)
+    stats.record_aborted(50)
+
+    assert stats.stats() == {"completed": 2, "aborted": 2, "saved_tokens": 100}
@@ -0,0 +1,225 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.dao.document_file_dao import DocumentFileDAO
+from scaledp_chat.db.dao.index_state_dao import IndexStateDAO
+from scaledp_chat.db.dao.symbol_index_dao import SymbolIndexDAO
+from scaledp_chat.indexer.symbols import Symbol, extract_symbols, module_name
+from scaledp_chat.web.api.chat.index_version import IndexVersion
+from scaledp_chat.web.api.chat.symbols import SymbolTable
+
+SOURCE = '''
+class ScaleDPSession:
+    """Spark session."""
+
+    @classmethod
+    def builder(cls):
+        return cls()
+
+
+def show_image(df, limit=5):
+    def render(row):
+        return row
+    return df
+
+
+def read(path):
+    return path
+'''
+
+
+def test_module_name() -> None:
+    """File paths are converted to module names."""
+    assert module_name("scaledp/models/session.py") == "scaledp.models.session"
+    assert module_name("scaledp/models/__init__.py") == "scaledp.models"
+
+
+def test_extract_symbols() -> None:
+    """Classes, functions and methods are extracted with their spans."""
+    symbols = extract_symbols(SOURCE, "scaledp/session.py")
+
+    assert symbols == [
+        Symbol("scaledp.session.ScaleDPSession", "ScaleDPSession", "class", 2, 7),
+        Symbol(
+            "scaledp.session.ScaleDPSession.builder",
+            "builder",
+            "method",
+            5,
+            7,
+        ),
+        Symbol("scaledp.session.show_image", "show_image", "function", 10, 13),
+        Symbol(
+            "scaledp.session.show_image.render",
+            "render",
+            "function",
+            11,
+            12,
+        ),
+        Symbol("scaledp.session.read", "read", "function", 16, 17),
+    ]
+    assert extract_symbols("def broken(:", "broken.py") == []
+
+
+def test_symbol_table_extract() -> None:
+    """Only names written as code are extracted from the question."""
+    table = SymbolTable(IndexVersion(ttl=0))
+    table.build([("scaledp/session.py", SOURCE)])
+
+    question = (
+        "How to read images with ScaleDPSession and df.show_image "
+        "or `read` and render()?"
+    )
+    assert table.extract(question) == [
+        "ScaleDPSession",
+        "show_image",
+        "read",
+        "render",
+    ]
+    assert table.extract("How to read an image?") == []
+
+
+@pytest.mark.anyio
+async def test_symbol_table_load(dbsession: AsyncSession) -> None:
+    """Symbol table is built from stored document files."""
+    table = SymbolTable(IndexVersion(ttl=0))
+    # An empty index is loaded again on the next request
+    await table.aload(dbsession)
+    assert not table.loaded
+
+    await DocumentFileDAO(dbsession).create(
+        content=SOURCE,
+        filepath="scaledp/session.py",
+        file_type="py",
+        file_metadata={},
+    )
+    await dbsession.flush()
+    await table.aload(dbsession)
+
+    assert table.loaded
+    assert "scaledp.session.ScaleDPSession.builder" in table.names
+    assert "show_image" in table.names
+
+
+@pytest.mark.anyio
+async def test_symbol_table_reload(dbsession: AsyncSession) -> None:
+    """Symbol table is rebuilt when the index version changes."""
+    dao = DocumentFileDAO(dbsession)
+    await dao.create(
+        content=SOURCE,
+        filepath="scaledp/session.py",
+        file_type="py",
+        file_metadata={},
+    )
+    await dbsession.flush()
+    table = SymbolTable(IndexVersion(ttl=0))
+    await table.aload(dbsession)
+
+    await dao.delete_paths(["scaledp/session.py"])
+    await dao.create(
+        content="def write(df):\n    return df\n",
+        filepath="scaledp/writer.py",
+        file_type="py",
+        file_metadata={},
+    )
+    await dbsession.flush()
+    # Files are not reparsed while the version is the same
+    await table.aload(dbsession)
+    assert "show_image" in table.names
+
+    await IndexStateDAO(dbsession).bump_version()
+    await table.aload(dbsession)
+    assert "show_image" not in table.names
+    assert "scaledp.writer.write" in table.names
+
+
+@pytest.mark.anyio
+async def test_symbol_index_lookup(dbsession: AsyncSession) -> None:
+    """Symbols are resolved by exact and qualified prefix names."""
+    file_id = await DocumentFileDAO(dbsession).create(
+        content=SOURCE,
+        filepath="scaledp/session.py",
+        file_type="py",
+        file_metadata={},
+    )
+    dao = SymbolIndexDAO(dbsession)
+    await dao.create(file_id, extract_symbols(SOURCE, "scaledp/session.py"))
+    await dbsession.flush()
+
+    results = await dao.lookup(
+        [
+            "ScaleDPSession",
+            "scaledp.session.ScaleDPSession",
+            "scaledp.session.show",
+            "missing",
+        ],
+    )
+
+    assert set(results) == {"ScaleDPSession", "scaledp.session.ScaleDPSession"}
+    assert [doc.metadata["symbol"] for doc in results["ScaleDPSession"]] == [
+        "scaledp.session.ScaleDPSession",
+    ]
+    assert [
+        doc.metadata["symbol"] for doc in results["scaledp.session.ScaleDPSession"]
+    ] == [
+        "scaledp.session.ScaleDPSession",
+        "scaledp.session.ScaleDPSession.builder",
+    ]
+    assert results["ScaleDPSession"][0].metadata == {
+        "source": "scaledp/session.py",
+        "file_id": file_id,
+        "symbol": "scaledp.session.ScaleDPSession",
+        "start_line": 2,
+        "end_line": 7,
+    }
+
+
+@pytest.mark.anyio
+async def test_symbol_index_lookup_limit(dbsession: AsyncSession) -> None:
+    """Every term resolves to a limited number of symbols, best matches first."""
+    file_id = await DocumentFileDAO(dbsession).create(
+        content=SOURCE,
+        filepath="scaledp/session.py",
+        file_type="py",
+        file_metadata={},
+    )
+    dao = SymbolIndexDAO(dbsession)
+    await dao.create(file_id, extract_symbols(SOURCE, "scaledp/session.py"))
+    await dbsession.flush()
+
+    results = await dao.lookup(["scaledp", "scaledp.session.ScaleDPSession"], limit=2)
+
+    # Package members closest to the package come first
+    assert [doc.metadata["symbol"] for doc in results["scaledp"]] == [
+        "scaledp.session.ScaleDPSession",
+        "scaledp.session.read",
+    ]
+    # Exact match ranks before the members of the class
+    results = await dao.lookup(["scaledp.session.ScaleDPSession"], limit=1)
+    assert [
+        doc.metadata["symbol"] for doc in results["scaledp.session.ScaleDPSession"]
+    ] == ["scaledp.session.ScaleDPSession"]
+
+
+@pytest.mark.anyio
+async def test_symbol_index_get_symbols(dbsession: AsyncSession) -> None:
+    """Symbols of several files are loaded by file ID."""
+    file_id = await DocumentFileDAO(dbsession).create(
+        content=SOURCE,
+        filepath="scaledp/session.py",
+        file_type="py",
+        file_metadata={},
+    )
+    symbols = extract_symbols(SOURCE, "scaledp/session.py")
+    dao = SymbolIndexDAO(dbsession)
+    await dao.create(file_id, symbols)
+    await dbsession.flush()
+
+    results = await dao.get_symbols([file_id, file_id, str(uuid.uuid4())])
+
+    assert list(results) == [file_id]
+    assert sorted(results[file_id], key=lambda symbol: symbol.name) == sorted(
+        symbols,
+        key=lambda symbol: symbol.name,
+    )
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scaledp_chat.db.vector_index import (
+    VECTOR_INDEX_NAME,
+    check_vector_index,
+    drop_vector_indexes,
+    ensure_vector_index,
+)
+
+
+@pytest.mark.anyio
+async def test_ensure_vector_index_replaces_mismatched_index(
+    dbsession: AsyncSession,
+) -> None:
+    """Index built for L2 distance is replaced by one serving cosine search."""
+    conn = await dbsession.connection()
+    await conn.execute(
+        text(
+            f"CREATE INDEX {VECTOR_INDEX_NAME} ON document_index "
+            "USING hnsw (embedding vector_l2_ops)",
+        ),
+    )
+
+    check = await check_vector_index(conn)
+    assert not check.matches_strategy
+    assert not check.used_by_search
+
+    assert await ensure_vector_index(conn)
+
+    check = await check_vector_index(conn)
+    assert check.definitions == [
+        f"CREATE INDEX {VECTOR_INDEX_NAME} ON public.document_index "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m='16', ef_construction='64')",
+    ]
+    assert check.matches_strategy
+    assert check.used_by_search
+    assert not await ensure_vector_index(conn)
+
+
+@pytest.mark.anyio
+async def test_drop_vector_indexes(dbsession: AsyncSession) -> None:
+    """Dropped vector index is built again by ensure_vector_index."""
+    conn = await dbsession.connection()
+    await ensure_vector_index(conn)
+
+    assert await drop_vector_indexes(conn) == [VECTOR_INDEX_NAME]
+    assert not (await check_vector_index(conn)).definitions
+    assert await drop_vector_indexes(conn) == []
+
+    assert await ensure_vector_index(conn)
+    assert (await check_vector_index(conn)).used_by_search